@@ -0,0 +1,196 @@
+"""
+API Middleware
+API-key authentication, response compression and slow-request capture in front of the routers
+"""
+
+import zlib
+from typing import Iterable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.profiling import SlowRequestLog
+from app.core.tenants import ApiKeyStore, TenantContext
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+# Content that is already compressed gains nothing from another pass
+UNCOMPRESSIBLE_TYPES = ("image/", "video/", "application/zip", "application/gzip", "application/x-parquet")
+
+
+class ApiKeyMiddleware:
+    """
+    Authenticate requests by ``X-API-Key`` (or ``Authorization: Bearer``).
+
+    Plain ASGI rather than BaseHTTPMiddleware, so streaming responses pass
+    through untouched. The authenticated tenant is put on ``request.state``.
+    """
+
+    def __init__(self, app: ASGIApp, key_store: ApiKeyStore, exempt_paths: Iterable[str] = ()):
+        self.app = app
+        self.key_store = key_store
+        self.exempt_paths = set(exempt_paths)
+
+    @staticmethod
+    def _api_key(scope: Scope):
+        for name, value in scope.get("headers", []):
+            if name == b"x-api-key":
+                return value.decode("latin-1").strip()
+            if name == b"authorization" and value[:7].lower() == b"bearer ":
+                return value[7:].decode("latin-1").strip()
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        # CORS preflight requests carry no credentials
+        if (scope["type"] != "http" or scope["method"] == "OPTIONS"
+                or scope["path"] in self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        tenant = self.key_store.authenticate(self._api_key(scope))
+        if tenant is None:
+            response = JSONResponse(
+                status_code=401,
+                content={"detail": "Missing or invalid API key"},
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+            await response(scope, receive, send)
+            return
+
+        scope.setdefault("state", {})["tenant"] = TenantContext(tenant.tenant_id, tenant, admin=tenant.admin)
+        await self.app(scope, receive, send)
+
+
+class CompressionMiddleware:
+    """
+    Brotli or gzip response compression, chosen from ``Accept-Encoding``.
+
+    Responses below ``minimum_size`` are sent as they are; compressing them
+    costs more than it saves. Streaming responses (exports) are compressed
+    chunk by chunk. Brotli is used only when the ``brotli`` package is
+    installed; it is both smaller and faster than gzip at the low quality
+    levels used here. Already-compressed content (images, encoded responses)
+    passes through.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _encoding(self, scope: Scope) -> Optional[str]:
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accepted = {part.split(";")[0].strip() for part in value.decode("latin-1").lower().split(",")}
+                if BROTLI_AVAILABLE and "br" in accepted:
+                    return "br"
+                if "gzip" in accepted:
+                    return "gzip"
+                return None
+        return None
+
+    def _compressor(self, encoding: str):
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            return compressor.process, compressor.finish
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)  # 31: gzip container
+        return compressor.compress, compressor.flush
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        encoding = self._encoding(scope) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        compress = finish = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start_message, compress, finish, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if "content-encoding" in headers or content_type.startswith(UNCOMPRESSIBLE_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message  # Held until the first body chunk decides
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                headers = MutableHeaders(raw=start_message["headers"])
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "content-length" in headers:
+                    del headers["content-length"]
+                compress, finish = self._compressor(encoding)
+                if not more_body:
+                    compressed = compress(body) + finish()
+                    headers["Content-Length"] = str(len(compressed))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                await send(start_message)
+                start_message = None
+
+            chunk = compress(body)
+            if not more_body:
+                chunk += finish()
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class SlowRequestMiddleware:
+    """
+    Give every request a trace and keep those slower than the threshold.
+
+    Added outermost so the duration covers upload parsing, authentication
+    and compression. Paths under ``exempt_prefixes`` (the profiling
+    endpoints, which are slow on purpose) are not traced.
+    """
+
+    def __init__(self, app: ASGIApp, log: SlowRequestLog, exempt_prefixes: Iterable[str] = ()):
+        self.app = app
+        self.log = log
+        self.exempt_prefixes = tuple(exempt_prefixes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        status_code: Optional[int] = None
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        trace, token = self.log.start(scope["method"], scope["path"])
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            tenant = scope.get("state", {}).get("tenant")
+            tenant_id = tenant.tenant_id if tenant is not None else Headers(scope=scope).get("x-tenant-id")
+            self.log.finish(trace, token, status_code, tenant_id)
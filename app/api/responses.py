@@ -0,0 +1,116 @@
+"""
+API Response Encoding
+Compact JSON rendering with optional MessagePack content negotiation
+"""
+
+import json
+from contextvars import ContextVar
+from typing import Any, Mapping, Optional
+
+from starlette.background import BackgroundTask
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+# Media type the current request asked for; set per request by ContentNegotiationMiddleware
+preferred_media_type: ContextVar[str] = ContextVar("preferred_media_type", default=JSON_MEDIA_TYPE)
+
+
+def encode_json(content: Any) -> bytes:
+    """Compact JSON: orjson when installed, otherwise the standard library without whitespace"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_msgpack(content: Any) -> bytes:
+    return msgpack.packb(content, use_bin_type=True, datetime=False, default=str)
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """
+    Media type for an Accept header: MessagePack when the client lists it
+    ahead of JSON (and msgpack is installed), JSON otherwise
+    """
+    if not accept or not MSGPACK_AVAILABLE:
+        return JSON_MEDIA_TYPE
+    best, best_quality = JSON_MEDIA_TYPE, 0.0
+    for position, part in enumerate(accept.split(",")):
+        media_type, _, parameters = part.strip().partition(";")
+        quality = 1.0
+        for parameter in parameters.split(";"):
+            name, _, value = parameter.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        media_type = media_type.strip().lower()
+        if media_type in MSGPACK_MEDIA_TYPES and quality > best_quality:
+            best, best_quality = MSGPACK_MEDIA_TYPES[0], quality
+        elif media_type in (JSON_MEDIA_TYPE, "*/*") and quality > best_quality:
+            best, best_quality = JSON_MEDIA_TYPE, quality
+    return best
+
+
+class CompactJSONResponse(JSONResponse):
+    """
+    Default response class of the API.
+
+    Renders JSON with orjson (several times faster than ``json.dumps`` on
+    result-heavy responses) and MessagePack when the request negotiated it.
+    Endpoints keep returning models and dicts as before.
+    """
+
+    def __init__(self, content: Any, status_code: int = 200,
+                 headers: Optional[Mapping[str, str]] = None,
+                 media_type: Optional[str] = None,
+                 background: Optional[BackgroundTask] = None):
+        if media_type is None and preferred_media_type.get() != JSON_MEDIA_TYPE:
+            media_type = preferred_media_type.get()
+        super().__init__(content, status_code, headers, media_type, background)
+        if MSGPACK_AVAILABLE:
+            self.headers.setdefault("vary", "Accept")
+
+    def render(self, content: Any) -> bytes:
+        if self.media_type in MSGPACK_MEDIA_TYPES:
+            return encode_msgpack(content)
+        return encode_json(content)
+
+
+class ContentNegotiationMiddleware:
+    """Records the media type each request accepts for CompactJSONResponse"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = None
+        for name, value in scope.get("headers", []):
+            if name == b"accept":
+                accept = value.decode("latin-1")
+                break
+        token = preferred_media_type.set(negotiate(accept))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            preferred_media_type.reset(token)
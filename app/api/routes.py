@@ -2,25 +2,180 @@
 API Routes for Bearing Fault Analysis using Gemini AI
 """
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from fastapi.responses import JSONResponse
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from datetime import datetime
+from typing import Optional, List
+import asyncio
+import hashlib
 import io
+import time
+import numpy as np
 
+from app.core.asset_trends import create_asset_tracker
+from app.core.bearing_catalog import DEFECT_NAMES, create_bearing_catalog
+from app.core.blob_store import DIGEST_PATTERN, create_blob_store, iter_blob, sniff_content_type, thumbnail_sizes
+from app.core.config import settings
+from app.core.exporter import PYARROW_AVAILABLE, stream_arrow, stream_csv
 from app.core.gemini_fault_analyzer import GeminiFaultAnalyzer
+from app.core.history_store import (
+    AnalysisFilters,
+    GROUP_BY_COLUMNS,
+    USAGE_GROUP_BY_COLUMNS,
+    create_history_store
+)
+from app.core.job_manager import create_job_manager
+from app.core.priority_scheduler import create_scheduler, SchedulerOverloaded
+from app.core.profiling import ProfilerBusy, create_profiler, create_slow_request_log, record_stage, stage
+from app.core.tenants import QuotaExceeded, TenantContext, create_api_key_store, create_quota_manager
+from app.core.usage_tracker import create_usage_tracker
+from app.core.vibration import analyze_vibration, iter_signal_chunks, resolve_geometry
+from app.core.webhooks import InvalidCallbackUrl, create_webhook_dispatcher, validate_callback_url
 from app.models.fault_models import (
     AnalysisResponse, 
     HealthResponse, 
-    BearingType
+    BearingType,
+    RequestPriority,
+    JobInfo,
+    JobStatus,
+    BatchStatusResponse,
+    AnalysisRecord,
+    AnalysisListResponse,
+    AnalysisSummaryResponse,
+    UsageReportResponse,
+    VibrationFindings,
+    BearingCatalogEntry,
+    DefectFrequencyRequest,
+    DefectFrequencyResponse,
+    SlowRequestListResponse,
+    AssetStatus,
+    AssetTrendResponse,
+    AssetListResponse
 )
 
 # Initialize routers
 health_router = APIRouter(tags=["Health"])
 analysis_router = APIRouter(tags=["Analysis"])
+history_router = APIRouter(tags=["History"])
+bearing_router = APIRouter(tags=["Bearings"])
+admin_router = APIRouter(tags=["Admin"])
+asset_router = APIRouter(tags=["Assets"])
+
+# Asset ids appear in URL paths: no slashes or spaces
+ASSET_ID_PATTERN = r"^[A-Za-z0-9._:-]+$"
 
 # Initialize the Gemini fault analyzer
 fault_analyzer = GeminiFaultAnalyzer()
 
+# Weighted-fair scheduler shared by every request that reaches the model
+scheduler = create_scheduler()
+
+# Background jobs for clients that submit and poll instead of waiting
+job_manager = create_job_manager()
+
+# Every successful analysis is kept for fleet-level queries
+history_store = create_history_store()
+
+# Token usage per tenant and prompt variant, flushed to the history store
+usage_tracker = create_usage_tracker(history_store)
+
+# Degradation trend per asset, updated as each of its analyses is stored
+asset_tracker = create_asset_tracker(history_store)
+
+# API keys and per-tenant limits, so one busy plant cannot starve the others
+api_key_store = create_api_key_store()
+quota_manager = create_quota_manager(history_store)
+
+# Callback notifications for clients that would rather not poll
+webhook_dispatcher = create_webhook_dispatcher()
+
+# Bearing geometries by designation, for defect frequencies without per-bearing input
+bearing_catalog = create_bearing_catalog()
+
+# Uploaded images, kept (once per distinct image) for re-analysis, audits and the UI
+image_store = create_blob_store()
+
+# On-demand profiles and the last slow requests, for diagnosing latency without a redeploy
+profiler = create_profiler()
+slow_request_log = create_slow_request_log()
+
+def resolve_priority(header_value: Optional[RequestPriority],
+                     form_value: Optional[RequestPriority]) -> RequestPriority:
+    """Pick the request priority from the header, form field or configured default"""
+    if header_value is not None:
+        return header_value
+    if form_value is not None:
+        return form_value
+    try:
+        return RequestPriority(settings.DEFAULT_REQUEST_PRIORITY)
+    except ValueError:
+        return RequestPriority.BATCH
+
+def current_tenant(request: Request,
+                   x_tenant_id: Optional[str] = Header(None, description="Tenant to account usage to "
+                                                                         "(ignored when API keys are required)")
+                   ) -> TenantContext:
+    """
+    Tenant the request runs as
+    
+    With AUTH_ENABLED the API-key middleware has set it. Otherwise the
+    X-Tenant-ID header names it and the caller sees that tenant's data
+    only; quotas apply only to tenants listed in the tenant file. Only an
+    admin API key grants admin access.
+    """
+    tenant = getattr(request.state, "tenant", None)
+    if tenant is not None:
+        return tenant
+    tenant_id = (x_tenant_id or "").strip() or settings.DEFAULT_TENANT
+    return TenantContext(tenant_id, api_key_store.get(tenant_id))
+
+def admit_requests(tenant: TenantContext, count: int = 1):
+    """Apply the tenant's rate and daily-token limits, answering 429 when exceeded"""
+    try:
+        for _ in range(count):
+            quota_manager.admit(tenant.config)
+    except QuotaExceeded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+async def check_callback_url(callback_url: Optional[str]) -> Optional[str]:
+    """Validate an optional callback URL, answering 422 for unusable ones"""
+    if not callback_url:
+        return None
+    if webhook_dispatcher is None:
+        raise HTTPException(status_code=422, detail="Webhooks are disabled on this server")
+    try:
+        # Resolving the host blocks
+        return await asyncio.to_thread(validate_callback_url, callback_url)
+    except InvalidCallbackUrl as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+def job_event(job: JobInfo) -> dict:
+    """Webhook payload for a finished job"""
+    return {
+        "job_id": job.job_id,
+        "batch_id": job.batch_id,
+        "status": job.status.value,
+        "filename": job.filename,
+        "tenant": job.tenant,
+        "analysis_id": job.result.analysis_id if job.result else None,
+        "error": job.error,
+        "result": job.result.model_dump(mode="json") if job.result else None
+    }
+
+def visible_tenant(tenant: TenantContext) -> Optional[str]:
+    """Tenant whose data a caller may see; None means all tenants"""
+    return None if tenant.admin else tenant.tenant_id
+
+def require_admin(tenant: TenantContext = Depends(current_tenant)) -> TenantContext:
+    """403 for non-admin tenants (and for everyone without AUTH_ENABLED)"""
+    if not settings.AUTH_ENABLED or not tenant.admin:
+        raise HTTPException(status_code=403, detail="Admin API key required")
+    return tenant
+
 @health_router.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint"""
@@ -30,12 +185,189 @@ async def health_check():
         api_key_configured=fault_analyzer.api_key_configured
     )
 
+def ensure_analyzer_ready():
+    """Reject requests while the analyzer cannot reach the model"""
+    if not fault_analyzer.is_ready():
+        raise HTTPException(
+            status_code=503,
+            detail="Analysis service not available. Please check API key configuration."
+        )
+
+async def read_image_upload(image: UploadFile) -> bytes:
+    """Validate an uploaded image and return its bytes"""
+    if not image.content_type or not image.content_type.startswith('image/'):
+        raise HTTPException(
+            status_code=400, 
+            detail="File must be an image (JPEG, PNG, etc.)"
+        )
+    
+    image_data = await image.read()
+    
+    if len(image_data) == 0:
+        raise HTTPException(
+            status_code=400,
+            detail="Empty image file"
+        )
+    
+    return image_data
+
+class VibrationForm:
+    """Optional vibration capture and the measurement details it needs"""
+
+    def __init__(
+        self,
+        vibration: Optional[UploadFile] = File(None, description="Vibration capture (.npy or numeric .csv) of the same bearing"),
+        sample_rate_hz: Optional[float] = Form(None, gt=0, description="Sampling rate; inferred from a CSV time column when omitted"),
+        shaft_rpm: Optional[float] = Form(None, gt=0, description="Shaft speed during the capture"),
+        bearing_designation: Optional[str] = Form(None, description="Catalog designation (e.g. 6205-2RS) for the geometry"),
+        rolling_elements: Optional[int] = Form(None, gt=0, description="Number of rolling elements"),
+        element_diameter_mm: Optional[float] = Form(None, gt=0, description="Rolling element diameter"),
+        pitch_diameter_mm: Optional[float] = Form(None, gt=0, description="Pitch diameter"),
+        contact_angle_deg: Optional[float] = Form(None, ge=0, lt=90, description="Contact angle"),
+        signal_column: Optional[int] = Form(None, ge=0, description="Signal column in multi-column captures (default: last)")
+    ):
+        self.vibration = vibration
+        self.sample_rate_hz = sample_rate_hz
+        self.shaft_rpm = shaft_rpm
+        self.bearing_designation = bearing_designation
+        self.rolling_elements = rolling_elements
+        self.element_diameter_mm = element_diameter_mm
+        self.pitch_diameter_mm = pitch_diameter_mm
+        self.contact_angle_deg = contact_angle_deg
+        self.signal_column = signal_column
+
+async def read_vibration_upload(form: VibrationForm,
+                                bearing_type: Optional[BearingType]) -> Optional[VibrationFindings]:
+    """Spectra and defect-frequency matches of an uploaded capture (None without one)"""
+    upload = form.vibration
+    if upload is None or not upload.filename:
+        return None
+    if form.shaft_rpm is None:
+        raise HTTPException(status_code=422, detail="shaft_rpm is required with vibration data")
+    
+    upload.file.seek(0, io.SEEK_END)
+    size = upload.file.tell()
+    upload.file.seek(0)
+    if size == 0:
+        raise HTTPException(status_code=400, detail="Empty vibration file")
+    if size > settings.VIBRATION_MAX_UPLOAD_MB * 1024 * 1024:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Vibration file exceeds {settings.VIBRATION_MAX_UPLOAD_MB} MB"
+        )
+    
+    def analyze() -> VibrationFindings:
+        geometry, source = resolve_geometry(
+            bearing_type.value if bearing_type else None,
+            form.rolling_elements,
+            form.element_diameter_mm,
+            form.pitch_diameter_mm,
+            form.contact_angle_deg,
+            designation=form.bearing_designation,
+            catalog=bearing_catalog
+        )
+        timestamps: List[float] = []
+        chunks = iter_signal_chunks(upload.file, upload.filename, column=form.signal_column, timestamps=timestamps)
+        return analyze_vibration(
+            chunks,
+            sample_rate=form.sample_rate_hz,
+            shaft_speed_hz=form.shaft_rpm / 60.0,
+            geometry=geometry,
+            geometry_source=source,
+            timestamps=timestamps
+        )
+    
+    try:
+        # FFTs release the GIL; keep the event loop free while they run
+        with stage("vibration"):
+            return await asyncio.to_thread(analyze)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid vibration data: {e}")
+
+async def run_analysis(image_data: bytes,
+                       priority: RequestPriority,
+                       bearing_type: Optional[BearingType] = None,
+                       mounted_on_motor: Optional[bool] = None,
+                       application: Optional[str] = None,
+                       additional_context: Optional[str] = None,
+                       tiled: bool = False,
+                       self_consistency: Optional[bool] = None,
+                       job: Optional[JobInfo] = None,
+                       tenant: Optional[TenantContext] = None,
+                       vibration: Optional[VibrationFindings] = None,
+                       asset_id: Optional[str] = None) -> AnalysisResponse:
+    """Run one analysis once the tenant's and the scheduler's slots are granted"""
+    tenant = tenant or TenantContext(settings.DEFAULT_TENANT)
+    image_digest = hashlib.sha256(image_data).hexdigest()
+    if image_store is not None:
+        image_store.put_background(image_data, image_digest)
+    analyze = fault_analyzer.analyze_bearing_image_tiled if tiled else fault_analyzer.analyze_bearing_image
+    # Re-sampling applies to single-call analyses; tiles are merged instead
+    options = {} if tiled else {"self_consistency": self_consistency}
+    # The tenant slot comes first: a tenant over its concurrency waits in its
+    # own queue without taking places in the shared scheduler queue
+    queued = time.perf_counter()
+    async with quota_manager.analysis_slot(tenant.config), scheduler.slot(priority):
+        record_stage("queue_wait", queued)
+        if job is not None:
+            job.status = JobStatus.RUNNING
+        result = await analyze(
+            image_data=image_data,
+            bearing_type=bearing_type.value if bearing_type else None,
+            mounted_on_motor=mounted_on_motor,
+            application=application,
+            additional_context=additional_context,
+            vibration_context=vibration.summary if vibration else None,
+            **options
+        )
+    result.vibration = vibration
+    
+    usage_tracker.record(tenant.tenant_id, result.prompt_variant, result.model_used, result.usage)
+    if result.usage is not None:
+        quota_manager.add_tokens(tenant.config, result.usage.total_tokens)
+    
+    if history_store is not None:
+        try:
+            with stage("history_write"):
+                result.analysis_id = await history_store.record_async(
+                    result,
+                    image_digest=image_digest,
+                    bearing_type=bearing_type.value if bearing_type else None,
+                    mounted_on_motor=mounted_on_motor,
+                    application=application,
+                    tenant=tenant.tenant_id,
+                    asset_id=asset_id
+                )
+        except Exception as e:
+            print(f"⚠️  Failed to record analysis history: {e}")
+    
+    if asset_tracker is not None and asset_id and result.analysis_id is not None:
+        try:
+            with stage("asset_trend"):
+                result.asset_trend = await asset_tracker.record_async(
+                    result.analysis, tenant.tenant_id, asset_id, result.timestamp, result.analysis_id
+                )
+        except Exception as e:
+            print(f"⚠️  Failed to update asset trend: {e}")
+    
+    return result
+
 @analysis_router.post("/analyze-image", response_model=AnalysisResponse)
 async def analyze_bearing_image(
     image: UploadFile = File(..., description="Bearing image to analyze"),
     bearing_type: Optional[BearingType] = Form(None, description="Type of bearing"),
+    mounted_on_motor: Optional[bool] = Form(None, description="Whether the bearing is mounted on a motor"),
     application: Optional[str] = Form(None, description="Application context"),
-    additional_context: Optional[str] = Form(None, description="Additional context")
+    additional_context: Optional[str] = Form(None, description="Additional context"),
+    tiled: bool = Form(False, description="Analyze large images tile by tile at full resolution"),
+    self_consistency: Optional[bool] = Form(None, description="Re-sample low-confidence answers until two agree"),
+    priority: Optional[RequestPriority] = Form(None, description="Scheduling priority (interactive or batch)"),
+    x_request_priority: Optional[RequestPriority] = Header(None, description="Scheduling priority header"),
+    callback_url: Optional[str] = Form(None, description="URL notified with the result (analysis.completed)"),
+    asset_id: Optional[str] = Form(None, max_length=128, pattern=ASSET_ID_PATTERN,
+                                   description="Machine or bearing position the image shows; tracks its degradation trend"),
+    vibration_form: VibrationForm = Depends(),
+    tenant: TenantContext = Depends(current_tenant)
 ):
     """
     Analyze bearing image using Gemini AI for fault diagnosis
@@ -45,54 +377,539 @@ async def analyze_bearing_image(
     - Failure mode identification
     - Root cause analysis
     - Technical recommendations
-    """
     
-    # Validate file type
-    if not image.content_type.startswith('image/'):
-        raise HTTPException(
-            status_code=400, 
-            detail="File must be an image (JPEG, PNG, etc.)"
-        )
+    Interactive requests (``X-Request-Priority: interactive``) are scheduled
+    ahead of batch traffic; batch requests are rejected with 429 when the
+    batch queue is full. Tenants over their request or token quota get 429
+    as well.
     
-    # Check if analyzer is ready
-    if not fault_analyzer.is_ready():
-        raise HTTPException(
-            status_code=503,
-            detail="Analysis service not available. Please check API key configuration."
-        )
+    An optional ``vibration`` capture of the same bearing (with ``shaft_rpm``)
+    adds envelope-spectrum defect-frequency matches to the response and to
+    the model prompt as corroborating evidence.
+    
+    With an ``asset_id``, the result also updates that asset's degradation
+    trend, returned as ``asset_trend`` (see ``GET /assets/{asset_id}/trend``).
+    """
+    
+    image_data = await read_image_upload(image)
+    ensure_analyzer_ready()
+    callback_url = await check_callback_url(callback_url)
+    # Quota before the vibration capture's FFTs, as in /analyze-vibration
+    admit_requests(tenant)
+    vibration = await read_vibration_upload(vibration_form, bearing_type)
     
     try:
-        # Read image data
-        image_data = await image.read()
-        
-        if len(image_data) == 0:
-            raise HTTPException(
-                status_code=400,
-                detail="Empty image file"
-            )
-        
-        # Perform analysis
-        result = await fault_analyzer.analyze_bearing_image(
+        result = await run_analysis(
             image_data=image_data,
-            bearing_type=bearing_type.value if bearing_type else None,
+            priority=resolve_priority(x_request_priority, priority),
+            bearing_type=bearing_type,
+            mounted_on_motor=mounted_on_motor,
             application=application,
-            additional_context=additional_context
+            additional_context=additional_context,
+            tiled=tiled,
+            self_consistency=self_consistency,
+            tenant=tenant,
+            vibration=vibration,
+            asset_id=asset_id
         )
         
-        return result
-        
+    except SchedulerOverloaded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Analysis queue is full: {str(e)}",
+            headers={"Retry-After": "5"}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Analysis failed: {str(e)}"
         )
+    
+    if callback_url:
+        await webhook_dispatcher.enqueue(callback_url, "analysis.completed", {
+            "status": JobStatus.COMPLETED.value,
+            "filename": image.filename,
+            "tenant": tenant.tenant_id,
+            "analysis_id": result.analysis_id,
+            "result": result.model_dump(mode="json")
+        })
+    return result
+
+@analysis_router.post("/analyze-vibration", response_model=VibrationFindings)
+async def analyze_vibration_capture(
+    bearing_type: Optional[BearingType] = Form(None, description="Type of bearing (selects the default geometry)"),
+    vibration_form: VibrationForm = Depends(),
+    tenant: TenantContext = Depends(current_tenant)
+):
+    """
+    Analyze a vibration capture on its own
+    
+    Returns the statistics, dominant envelope peaks and BPFO/BPFI/BSF/FTF
+    matches without calling the model. Give the bearing geometry, or a
+    ``bearing_type`` to use typical proportions for that type.
+    """
+    
+    if vibration_form.vibration is None:
+        raise HTTPException(status_code=422, detail="A vibration file is required")
+    # Quota first: the FFT and envelope analysis are the expensive part
+    admit_requests(tenant)
+    return await read_vibration_upload(vibration_form, bearing_type)
+
+@analysis_router.post("/jobs", response_model=BatchStatusResponse, status_code=202)
+async def submit_analysis_jobs(
+    images: List[UploadFile] = File(..., description="One or more bearing images to analyze"),
+    bearing_type: Optional[BearingType] = Form(None, description="Type of bearing"),
+    mounted_on_motor: Optional[bool] = Form(None, description="Whether the bearing is mounted on a motor"),
+    application: Optional[str] = Form(None, description="Application context"),
+    additional_context: Optional[str] = Form(None, description="Additional context"),
+    tiled: bool = Form(False, description="Analyze large images tile by tile at full resolution"),
+    self_consistency: Optional[bool] = Form(None, description="Re-sample low-confidence answers until two agree"),
+    priority: Optional[RequestPriority] = Form(None, description="Scheduling priority (interactive or batch)"),
+    x_request_priority: Optional[RequestPriority] = Header(None, description="Scheduling priority header"),
+    callback_url: Optional[str] = Form(None, description="URL notified as each job and the batch finish"),
+    asset_id: Optional[str] = Form(None, max_length=128, pattern=ASSET_ID_PATTERN,
+                                   description="Machine or bearing position the image shows; tracks its degradation trend"),
+    tenant: TenantContext = Depends(current_tenant)
+):
+    """
+    Submit images for asynchronous analysis
+    
+    Returns immediately with one job per image, all sharing a batch id.
+    Poll ``GET /jobs/{job_id}`` or ``GET /batches/{batch_id}`` for results,
+    or pass ``callback_url`` to be sent an ``analysis.completed`` (or
+    ``analysis.failed``) event per job and ``batch.completed`` at the end.
+    """
+    
+    uploads = [(image.filename, await read_image_upload(image)) for image in images]
+    ensure_analyzer_ready()
+    callback_url = await check_callback_url(callback_url)
+    admit_requests(tenant, count=len(uploads))
+    
+    request_priority = resolve_priority(x_request_priority, priority)
+    batch_id = None
+    jobs = []
+    remaining = [len(uploads)]
+    
+    async def notify(job: JobInfo):
+        event_type = "analysis.completed" if job.status == JobStatus.COMPLETED else "analysis.failed"
+        await webhook_dispatcher.enqueue(callback_url, event_type, job_event(job))
+        remaining[0] -= 1
+        if remaining[0] == 0:
+            summary = batch_status(job.batch_id, jobs)
+            await webhook_dispatcher.enqueue(callback_url, "batch.completed", {
+                "batch_id": summary.batch_id,
+                "tenant": job.tenant,
+                "total": summary.total,
+                "completed": summary.completed,
+                "failed": summary.failed,
+                "job_ids": [batch_job.job_id for batch_job in jobs]
+            })
+    
+    for filename, image_data in uploads:
+        async def run(job: JobInfo, image_data: bytes = image_data) -> AnalysisResponse:
+            return await run_analysis(
+                image_data=image_data,
+                priority=request_priority,
+                bearing_type=bearing_type,
+                mounted_on_motor=mounted_on_motor,
+                application=application,
+                additional_context=additional_context,
+                tiled=tiled,
+                self_consistency=self_consistency,
+                job=job,
+                tenant=tenant,
+                asset_id=asset_id
+            )
+        
+        job = job_manager.submit(
+            run,
+            filename=filename,
+            batch_id=batch_id,
+            tenant=tenant.tenant_id,
+            callback_url=callback_url,
+            on_finished=notify if callback_url else None
+        )
+        batch_id = job.batch_id
+        jobs.append(job)
+    
+    return batch_status(batch_id, jobs)
+
+def batch_status(batch_id: str, jobs: List[JobInfo]) -> BatchStatusResponse:
+    """Summarize the jobs of one batch"""
+    return BatchStatusResponse(
+        batch_id=batch_id,
+        total=len(jobs),
+        completed=sum(1 for job in jobs if job.status == JobStatus.COMPLETED),
+        failed=sum(1 for job in jobs if job.status == JobStatus.FAILED),
+        jobs=jobs
+    )
+
+@analysis_router.get("/jobs/{job_id}", response_model=JobInfo)
+async def get_analysis_job(job_id: str, tenant: TenantContext = Depends(current_tenant)):
+    """Get the status and, once finished, the result of an analysis job"""
+    job = job_manager.get(job_id)
+    if job is None or visible_tenant(tenant) not in (None, job.tenant):
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+@analysis_router.get("/batches/{batch_id}", response_model=BatchStatusResponse)
+async def get_analysis_batch(batch_id: str, tenant: TenantContext = Depends(current_tenant)):
+    """Get the status of every job submitted in one batch"""
+    jobs = job_manager.get_batch(batch_id)
+    if not jobs or visible_tenant(tenant) not in (None, jobs[0].tenant):
+        raise HTTPException(status_code=404, detail="Batch not found or expired")
+    return batch_status(batch_id, jobs)
+
+def ensure_history_enabled():
+    """Reject history queries when the store is disabled"""
+    if history_store is None:
+        raise HTTPException(status_code=404, detail="Analysis history is disabled")
+
+def history_filters(tenant: TenantContext = Depends(current_tenant),
+                    bearing_type: Optional[BearingType] = Query(None, description="Bearing type"),
+                    mounted_on_motor: Optional[bool] = Query(None, description="Motor mounting"),
+                    application: Optional[str] = Query(None, description="Exact application"),
+                    failure_mode: Optional[str] = Query(None, description="Text contained in the failure mode"),
+                    failure_mode_code: Optional[str] = Query(None, description="Canonical failure mode code"),
+                    model_used: Optional[str] = Query(None, description="Model that produced the result"),
+                    image_digest: Optional[str] = Query(None, description="SHA-256 of the image"),
+                    since: Optional[datetime] = Query(None, description="Analyses at or after this time"),
+                    until: Optional[datetime] = Query(None, description="Analyses before this time"),
+                    min_confidence: Optional[float] = Query(None, ge=0.0, le=1.0,
+                                                            description="Minimum confidence score"),
+                    asset_id: Optional[str] = Query(None, description="Only analyses of this asset"),
+                    tenant_id: Optional[str] = Query(None, alias="tenant",
+                                                     description="Only this tenant (admins)")) -> AnalysisFilters:
+    """Collect history filter query parameters; non-admin tenants only see their own analyses"""
+    return AnalysisFilters(
+        bearing_type=bearing_type.value if bearing_type else None,
+        mounted_on_motor=mounted_on_motor,
+        application=application,
+        failure_mode=failure_mode,
+        failure_mode_code=failure_mode_code,
+        model_used=model_used,
+        image_digest=image_digest,
+        since=since,
+        until=until,
+        min_confidence=min_confidence,
+        tenant=visible_tenant(tenant) or tenant_id,
+        asset_id=asset_id
+    )
+
+@history_router.get("/analyses", response_model=AnalysisListResponse)
+async def list_analyses(filters: AnalysisFilters = Depends(history_filters),
+                        limit: int = Query(50, ge=1, le=500, description="Page size"),
+                        cursor: Optional[int] = Query(None, description="next_cursor from the previous page")):
+    """List stored analyses newest first, filtered and paginated by cursor"""
+    ensure_history_enabled()
+    items, next_cursor = await history_store.query_async(filters, limit=limit, cursor=cursor)
+    return AnalysisListResponse(items=items, next_cursor=next_cursor, limit=limit)
+
+@history_router.get("/analyses/summary", response_model=AnalysisSummaryResponse)
+async def summarize_analyses(filters: AnalysisFilters = Depends(history_filters),
+                             group_by: str = Query("failure_mode", description=f"One of {', '.join(GROUP_BY_COLUMNS)}"),
+                             limit: int = Query(100, ge=1, le=1000, description="Maximum groups")):
+    """
+    Count stored analyses per group
+    
+    For example, contamination failures on motor-mounted roller bearings
+    this quarter: ``?bearing_type=roller_bearing&mounted_on_motor=true
+    &since=2024-07-01&failure_mode=contamination``
+    """
+    ensure_history_enabled()
+    if group_by not in GROUP_BY_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {', '.join(GROUP_BY_COLUMNS)}")
+    total, groups = await history_store.summarize_async(filters, group_by=group_by, limit=limit)
+    return AnalysisSummaryResponse(group_by=group_by, total=total, groups=groups)
+
+@history_router.get("/analyses/export")
+def export_analyses(filters: AnalysisFilters = Depends(history_filters),
+                    format: Optional[str] = Query(None, description="arrow or csv; arrow when pyarrow is installed"),
+                    batch_size: int = Query(10000, ge=100, le=100000, description="Rows per streamed chunk")):
+    """
+    Stream stored analyses for notebooks and fleet analytics
+    
+    Arrow responses use the IPC stream format, readable with
+    ``pyarrow.ipc.open_stream`` or ``pandas.read_feather``-style tooling.
+    Rows are read and sent in chunks, so exports of any size use constant memory.
+    """
+    ensure_history_enabled()
+    export_format = format or ("arrow" if PYARROW_AVAILABLE else "csv")
+    if export_format == "arrow":
+        if not PYARROW_AVAILABLE:
+            raise HTTPException(status_code=400, detail="pyarrow is not installed; use format=csv")
+        return StreamingResponse(
+            stream_arrow(history_store, filters, batch_size),
+            media_type="application/vnd.apache.arrow.stream",
+            headers={"Content-Disposition": "attachment; filename=analyses.arrows"}
+        )
+    if export_format == "csv":
+        return StreamingResponse(
+            stream_csv(history_store, filters, batch_size),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=analyses.csv"}
+        )
+    raise HTTPException(status_code=400, detail="format must be arrow or csv")
+
+@history_router.get("/analyses/{analysis_id}", response_model=AnalysisRecord)
+async def get_analysis(analysis_id: int, tenant: TenantContext = Depends(current_tenant)):
+    """Get one stored analysis"""
+    ensure_history_enabled()
+    record = await history_store.get_async(analysis_id)
+    if record is None or visible_tenant(tenant) not in (None, record.tenant):
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return record
+
+async def check_image_access(digest: str, tenant: TenantContext):
+    """404 unless the image is stored and, for non-admin tenants, one of theirs"""
+    if image_store is None or not DIGEST_PATTERN.match(digest):
+        raise HTTPException(status_code=404, detail="Image not found")
+    owner = visible_tenant(tenant)
+    if owner is not None:
+        if history_store is None:
+            raise HTTPException(status_code=404, detail="Image not found")
+        records, _ = await history_store.query_async(AnalysisFilters(image_digest=digest, tenant=owner), limit=1)
+        if not records:
+            raise HTTPException(status_code=404, detail="Image not found")
+
+def blob_response(blob, media_type: str, etag: str) -> StreamingResponse:
+    """Stream a stored blob; content-addressed, so it can be cached forever"""
+    return StreamingResponse(
+        iter_blob(blob),
+        media_type=media_type,
+        headers={
+            "Content-Length": str(len(blob)),
+            "ETag": etag,
+            "Cache-Control": "private, max-age=31536000, immutable"
+        }
+    )
+
+@history_router.get("/images/{digest}")
+async def get_image(digest: str, request: Request, tenant: TenantContext = Depends(current_tenant)):
+    """
+    Original uploaded image by SHA-256 digest (``image_digest`` of an analysis)
+    
+    Non-admin tenants can fetch images of their own analyses only.
+    """
+    await check_image_access(digest, tenant)
+    etag = f'"{digest}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    blob = await asyncio.to_thread(image_store.get, digest)
+    if blob is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return blob_response(blob, sniff_content_type(blob[:16]), etag)
+
+@history_router.get("/images/{digest}/thumbnail")
+async def get_image_thumbnail(digest: str, request: Request,
+                              size: int = Query(256, description="Longest side in pixels; one of THUMBNAIL_SIZES"),
+                              tenant: TenantContext = Depends(current_tenant)):
+    """JPEG thumbnail of a stored image, generated on first request and cached"""
+    if size not in thumbnail_sizes():
+        raise HTTPException(status_code=422, detail=f"size must be one of {', '.join(map(str, thumbnail_sizes()))}")
+    await check_image_access(digest, tenant)
+    etag = f'"{digest}-{size}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    try:
+        blob = await image_store.thumbnail(digest, size)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Cannot make a thumbnail of this image: {e}")
+    if blob is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return blob_response(blob, "image/jpeg", etag)
+
+@history_router.get("/usage", response_model=UsageReportResponse)
+async def get_usage(group_by: str = Query("tenant", description=f"One of {', '.join(USAGE_GROUP_BY_COLUMNS)}"),
+                    since: Optional[datetime] = Query(None, description="Usage at or after this time"),
+                    until: Optional[datetime] = Query(None, description="Usage before this time"),
+                    tenant_id: Optional[str] = Query(None, alias="tenant", description="Only this tenant (admins)"),
+                    tenant: TenantContext = Depends(current_tenant)):
+    """
+    Token usage and estimated cost per tenant, prompt variant, model or period
+    
+    Usage is counted in hourly buckets, so since/until are rounded to the hour.
+    Non-admin tenants only see their own usage.
+    """
+    if group_by not in USAGE_GROUP_BY_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {', '.join(USAGE_GROUP_BY_COLUMNS)}")
+    groups = await usage_tracker.report_async(group_by, since=since, until=until,
+                                              tenant=visible_tenant(tenant) or tenant_id)
+    return UsageReportResponse(group_by=group_by, since=since, until=until, groups=groups)
+
+def ensure_asset_trends_enabled():
+    """Reject trend queries when trends (or the history they need) are disabled"""
+    if asset_tracker is None:
+        raise HTTPException(status_code=404, detail="Asset trends are disabled")
+
+@asset_router.get("/assets", response_model=AssetListResponse)
+async def list_assets(status: Optional[AssetStatus] = Query(None, description="Only assets with this status"),
+                      limit: int = Query(100, ge=1, le=10000, description="Maximum assets"),
+                      tenant_id: Optional[str] = Query(None, alias="tenant", description="Only this tenant (admins)"),
+                      tenant: TenantContext = Depends(current_tenant)):
+    """
+    Tracked assets, most degraded first
+    
+    Served from the in-memory trend states. Non-admin tenants only see
+    their own assets.
+    """
+    ensure_asset_trends_enabled()
+    total, items = asset_tracker.assets(tenant=visible_tenant(tenant) or tenant_id, status=status, limit=limit)
+    return AssetListResponse(total=total, items=items)
+
+@asset_router.get("/assets/{asset_id}/trend", response_model=AssetTrendResponse)
+async def get_asset_trend(asset_id: str,
+                          points: int = Query(50, ge=0, le=1000, description="Latest timeline points to include"),
+                          tenant_id: Optional[str] = Query(None, alias="tenant",
+                                                           description="Tenant owning the asset (admins)"),
+                          tenant: TenantContext = Depends(current_tenant)):
+    """
+    Degradation trend of one asset
+    
+    The index, status, fitted trend and projected days to critical are kept
+    up to date as each analysis sent with this ``asset_id`` is stored, so
+    this is a lookup whatever the asset's history. ``points`` adds the
+    latest timeline entries, oldest first.
+    """
+    ensure_asset_trends_enabled()
+    owner = visible_tenant(tenant) or tenant_id or tenant.tenant_id
+    trend = asset_tracker.trend(owner, asset_id)
+    if trend is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    timeline = await asset_tracker.points_async(owner, asset_id, points) if points else []
+    return AssetTrendResponse(trend=trend, points=timeline)
 
 @analysis_router.get("/status")
-async def get_analyzer_status():
+async def get_analyzer_status(tenant: TenantContext = Depends(current_tenant)):
     """Get current analyzer status and configuration"""
     return {
         "analyzer_ready": fault_analyzer.is_ready(),
         "api_key_configured": fault_analyzer.api_key_configured,
         "model_available": fault_analyzer.model is not None,
-        "model_name": fault_analyzer.model.name if fault_analyzer.model else None
-    } 
\ No newline at end of file
+        "model_name": fault_analyzer.model.model_name if fault_analyzer.model else None,
+        "scheduler": scheduler.stats(),
+        "triage": fault_analyzer.triage.stats(),
+        "coalescing": fault_analyzer.single_flight.stats(),
+        "self_consistency": fault_analyzer.consistency_stats(),
+        "jobs": job_manager.stats(),
+        "usage": usage_tracker.stats(),
+        "webhooks": webhook_dispatcher.stats() if webhook_dispatcher else None,
+        "images": image_store.stats() if image_store else None,
+        "slow_requests": slow_request_log.stats() if slow_request_log else None,
+        "asset_trends": asset_tracker.stats() if asset_tracker else None,
+        "tenants": quota_manager.stats(visible_tenant(tenant))
+    }
+
+@bearing_router.get("/bearings", response_model=List[BearingCatalogEntry])
+async def list_bearings(prefix: Optional[str] = Query(None, description="Designation prefix, e.g. 62 or NU2"),
+                        bearing_type: Optional[BearingType] = Query(None, description="Only this bearing type"),
+                        limit: int = Query(100, ge=1, le=5000)):
+    """Catalog bearings with their geometry and defect orders"""
+    return [bearing_catalog.entry(row) for row in bearing_catalog.search(prefix, bearing_type, limit)]
+
+@bearing_router.get("/bearings/{designation}", response_model=BearingCatalogEntry)
+async def get_bearing(designation: str):
+    """One catalog bearing; seal and clearance suffixes are ignored"""
+    row = bearing_catalog.resolve(designation)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Unknown bearing designation: {designation}")
+    return bearing_catalog.entry(row)
+
+@bearing_router.post("/defect-frequencies", response_model=DefectFrequencyResponse)
+async def compute_defect_frequencies(request: DefectFrequencyRequest):
+    """
+    BPFO, BPFI, BSF and FTF for many bearings at many shaft speeds
+    
+    Every bearing is evaluated at every speed (``frequencies_hz[defect][bearing][speed]``),
+    or with ``pairwise`` each bearing at its own speed (``frequencies_hz[defect][bearing]``).
+    Unknown designations are listed under ``unknown`` and left out of the results.
+    """
+    if any(rpm <= 0 for rpm in request.shaft_rpm):
+        raise HTTPException(status_code=422, detail="Shaft speeds must be positive")
+    if request.pairwise and len(request.shaft_rpm) != len(request.designations):
+        raise HTTPException(status_code=422, detail="Pairwise requests need one shaft speed per designation")
+    
+    rows = bearing_catalog.lookup(request.designations)
+    found = rows >= 0
+    speeds = len(request.shaft_rpm) if not request.pairwise else 1
+    if int(found.sum()) * speeds * len(DEFECT_NAMES) > settings.DEFECT_FREQUENCY_MAX_VALUES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Request exceeds {settings.DEFECT_FREQUENCY_MAX_VALUES} values; split it into smaller batches"
+        )
+    
+    shaft_hz = np.asarray(request.shaft_rpm, dtype=np.float64) / 60.0
+    if request.pairwise:
+        shaft_hz = shaft_hz[found]
+    frequencies = bearing_catalog.frequencies(rows[found], shaft_hz, pairwise=request.pairwise).round(4)
+    
+    return DefectFrequencyResponse(
+        designations=[name for name, known in zip(request.designations, found) if known],
+        catalog_designations=bearing_catalog.designations[rows[found]].tolist(),
+        bearing_types=[bearing_catalog.bearing_type(row) for row in rows[found]],
+        shaft_rpm=request.shaft_rpm,
+        pairwise=request.pairwise,
+        frequencies_hz={name: frequencies[..., column].tolist() for column, name in enumerate(DEFECT_NAMES)},
+        unknown=[name for name, known in zip(request.designations, found) if not known]
+    )
+
+@admin_router.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_server(seconds: float = Query(10.0, gt=0, le=settings.PROFILING_MAX_SECONDS,
+                                                description="How long to sample"),
+                         interval_ms: float = Query(settings.PROFILING_INTERVAL_MS, ge=1.0, le=1000.0,
+                                                    description="Sampling interval"),
+                         format: str = Query("speedscope", description="speedscope or collapsed")):
+    """
+    Sample the call stacks of every thread of this server process
+    
+    Blocks for ``seconds`` while the server keeps serving. ``speedscope``
+    JSON opens in https://www.speedscope.app; ``collapsed`` stacks feed
+    flamegraph.pl. Only one profile runs at a time (409 otherwise); with
+    several workers, each request profiles the worker that receives it.
+    """
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profiling is disabled on this server")
+    if format not in ("speedscope", "collapsed"):
+        raise HTTPException(status_code=400, detail="format must be speedscope or collapsed")
+    try:
+        profile = await asyncio.to_thread(profiler.profile, seconds, interval_ms / 1000.0)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    if format == "collapsed":
+        return Response(
+            content=profile.collapsed(),
+            media_type="text/plain",
+            headers={"Content-Disposition": f'attachment; filename="profile-{stamp}.txt"'}
+        )
+    return JSONResponse(
+        content=profile.speedscope(f"bearing-fault-api {stamp} ({profile.samples} samples)"),
+        headers={"Content-Disposition": f'attachment; filename="profile-{stamp}.speedscope.json"'}
+    )
+
+@admin_router.get("/admin/slow-requests", response_model=SlowRequestListResponse,
+                  dependencies=[Depends(require_admin)])
+async def list_slow_requests(limit: int = Query(50, ge=1, le=1000),
+                             path: Optional[str] = Query(None, description="Only this path, e.g. /api/v1/analyze-image")):
+    """
+    Requests slower than SLOW_REQUEST_THRESHOLD_MS, newest first
+    
+    Each capture has the request's stage timings (queue wait, triage, model
+    calls, parsing, history write) and the raw model responses, truncated.
+    """
+    if slow_request_log is None:
+        raise HTTPException(status_code=404, detail="Slow-request capture is disabled on this server")
+    return SlowRequestListResponse(
+        threshold_ms=slow_request_log.threshold_ms,
+        captured=slow_request_log.counts["captured"],
+        items=slow_request_log.recent(limit, path)
+    )
+
+@admin_router.delete("/admin/slow-requests", dependencies=[Depends(require_admin)])
+async def clear_slow_requests():
+    """Empty the slow-request buffer"""
+    if slow_request_log is None:
+        raise HTTPException(status_code=404, detail="Slow-request capture is disabled on this server")
+    slow_request_log.clear()
+    return {"cleared": True}
@@ -0,0 +1,330 @@
+"""
+Asset Degradation Trends
+Incrementally scored degradation index and trend of each monitored asset
+"""
+
+import asyncio
+import heapq
+import json
+import re
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.history_store import AnalysisFilters, AnalysisHistoryStore
+from app.core.taxonomy import normalize_failure_mode
+from app.models.fault_models import AssetStatus, AssetTrend, AssetTrendPoint, BearingAnalysisResult
+
+# How far each failure mode is from a healthy bearing, 0 to 1. Codes not
+# listed (not_bearing, undetermined, other) say nothing about the asset and
+# leave its index unchanged.
+SEVERITY: Dict[str, float] = {
+    "no_damage": 0.0,
+    "lubrication": 0.3,
+    "contamination": 0.35,
+    "false_brinelling": 0.35,
+    "corrosion": 0.4,
+    "mounting": 0.4,
+    "misalignment": 0.45,
+    "abrasion": 0.45,
+    "electrical_erosion": 0.55,
+    "adhesive_wear": 0.55,
+    "overheating": 0.65,
+    "fatigue": 0.7,
+    "overload": 0.75,
+    "fracture": 1.0
+}
+
+# Words of the damage description that tell how far damage has spread;
+# the strongest one found wins
+EXTENT_TERMS: Dict[str, float] = {
+    **dict.fromkeys(["minor", "slight", "slightly", "light", "small", "early", "initial", "incipient",
+                     "isolated", "superficial", "fine"], 0.25),
+    **dict.fromkeys(["moderate", "multiple", "several", "numerous", "patches", "scattered"], 0.5),
+    **dict.fromkeys(["widespread", "advanced", "large", "deep", "heavy", "heavily", "significant",
+                     "pronounced"], 0.7),
+    **dict.fromkeys(["severe", "severely", "extensive", "extensively", "entire", "complete",
+                     "catastrophic", "seized"], 0.9)
+}
+_EXTENT_PATTERN = re.compile(r"\b(" + "|".join(EXTENT_TERMS) + r")\b", re.IGNORECASE)
+_SIZE_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*mm\b", re.IGNORECASE)
+
+# Defects this large (mm) count as full extent
+FULL_EXTENT_MM = 10.0
+# Extent of each image region (location hint) the damage was found in
+EXTENT_PER_REGION = 0.2
+# Extent when the description gives nothing to go on
+DEFAULT_EXTENT = 0.5
+
+# Lowest degradation index of each status, highest first
+STATUS_THRESHOLDS: List[Tuple[float, AssetStatus]] = [
+    (0.75, AssetStatus.CRITICAL),
+    (0.5, AssetStatus.WARNING),
+    (0.25, AssetStatus.WATCH)
+]
+CRITICAL_INDEX = STATUS_THRESHOLDS[0][0]
+
+# Scores spread over less time than this give no trend (a burst of uploads is not a trend)
+MIN_TREND_SPAN_DAYS = 1.0
+
+SECONDS_PER_DAY = 86400.0
+
+
+def damage_extent(result: BearingAnalysisResult) -> float:
+    """How far the damage has spread, 0 to 1, from the description, defect sizes and affected regions"""
+    text = result.observed_damage or ""
+    signals = [EXTENT_TERMS[match.lower()] for match in _EXTENT_PATTERN.findall(text)]
+    sizes = [float(size) for size in _SIZE_PATTERN.findall(text)]
+    if sizes:
+        signals.append(min(1.0, max(sizes) / FULL_EXTENT_MM))
+    if result.location_hints:
+        signals.append(min(1.0, EXTENT_PER_REGION * len(result.location_hints)))
+    return max(signals) if signals else DEFAULT_EXTENT
+
+
+def failure_code(result: BearingAnalysisResult) -> str:
+    return result.failure_mode_code or normalize_failure_mode(result.failure_mode)
+
+
+def damage_score(code: str, extent: float) -> Optional[float]:
+    """Severity of the failure mode scaled by extent; None for codes that are not scored"""
+    severity = SEVERITY.get(code)
+    if severity is None:
+        return None
+    return severity * (0.5 + 0.5 * extent)
+
+
+class DegradationState:
+    """
+    Running degradation state of one asset.
+
+    ``update`` folds in one analysis in constant time. The index is an
+    exponential moving average of damage scores in which each analysis
+    moves it by smoothing x confidence. The trend is a weighted least-squares
+    line through the scores, kept as five running sums whose weights halve
+    every half_life_days, so old analyses fade without being revisited.
+    """
+
+    def __init__(self, tenant: str, asset_id: str):
+        self.tenant = tenant
+        self.asset_id = asset_id
+        self.analyses = 0
+        self.scored_analyses = 0
+        self.first_seen: Optional[float] = None
+        self.last_seen: Optional[float] = None
+        self.index = 0.0
+        self.peak_index = 0.0
+        self.last_failure_mode_code: Optional[str] = None
+        self.last_analysis_id: Optional[int] = None
+        # Trend regression: origin (epoch seconds), time of the newest score,
+        # and sums of w, w*t, w*t^2, w*y, w*t*y with t in days since the origin
+        self.origin: Optional[float] = None
+        self.latest: Optional[float] = None
+        self.sums = [0.0, 0.0, 0.0, 0.0, 0.0]
+
+    def update(self, created_at: float, code: str, confidence: float, score: Optional[float],
+               smoothing: float, half_life_days: float, analysis_id: Optional[int] = None):
+        self.analyses += 1
+        self.first_seen = created_at if self.first_seen is None else min(self.first_seen, created_at)
+        self.last_seen = created_at if self.last_seen is None else max(self.last_seen, created_at)
+        self.last_failure_mode_code = code
+        self.last_analysis_id = analysis_id
+        if score is None:
+            return
+
+        if self.scored_analyses == 0:
+            self.index = score
+        else:
+            self.index += min(1.0, smoothing * confidence) * (score - self.index)
+        self.scored_analyses += 1
+        self.peak_index = max(self.peak_index, self.index)
+
+        if self.origin is None:
+            self.origin = self.latest = created_at
+        weight = max(confidence, 1e-3)
+        age_days = (self.latest - created_at) / SECONDS_PER_DAY
+        if age_days >= 0:
+            # Arrived late: it enters already faded
+            weight *= 0.5 ** (age_days / half_life_days)
+        else:
+            decay = 0.5 ** (-age_days / half_life_days)
+            self.sums = [total * decay for total in self.sums]
+            self.latest = created_at
+        t = (created_at - self.origin) / SECONDS_PER_DAY
+        for position, term in enumerate((1.0, t, t * t, score, t * score)):
+            self.sums[position] += weight * term
+
+    @property
+    def slope_per_day(self) -> Optional[float]:
+        if self.scored_analyses < 2:
+            return None
+        w, wt, wtt, wy, wty = self.sums
+        denominator = w * wtt - wt * wt
+        # Weighted variance of the times; two equal scores a span apart have (span / 2)^2
+        if denominator < w * w * (MIN_TREND_SPAN_DAYS / 2) ** 2:
+            return None
+        return (w * wty - wt * wy) / denominator
+
+    @property
+    def status(self) -> AssetStatus:
+        for threshold, status in STATUS_THRESHOLDS:
+            if self.index >= threshold:
+                return status
+        return AssetStatus.HEALTHY
+
+    def summary(self) -> AssetTrend:
+        slope = self.slope_per_day
+        days_to_critical = None
+        if slope is not None and slope > 0 and self.index < CRITICAL_INDEX:
+            days_to_critical = round((CRITICAL_INDEX - self.index) / slope, 1)
+        return AssetTrend(
+            asset_id=self.asset_id,
+            tenant=self.tenant,
+            status=self.status,
+            degradation_index=round(self.index, 4),
+            peak_index=round(self.peak_index, 4),
+            trend_per_30_days=None if slope is None else round(slope * 30.0, 4),
+            days_to_critical=days_to_critical,
+            analyses=self.analyses,
+            scored_analyses=self.scored_analyses,
+            first_seen=datetime.fromtimestamp(self.first_seen),
+            last_seen=datetime.fromtimestamp(self.last_seen),
+            last_failure_mode_code=self.last_failure_mode_code,
+            last_analysis_id=self.last_analysis_id
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DegradationState":
+        state = cls(data["tenant"], data["asset_id"])
+        state.__dict__.update(data)
+        return state
+
+
+class AssetTrendTracker:
+    """
+    Degradation trends of every asset, held in memory.
+
+    Each analysis sent with an ``asset_id`` updates that asset's state in
+    constant time and writes the new point and state through to the history
+    store, so a trend read is a dictionary lookup rather than a scan of the
+    asset's history. States are loaded from the store at startup.
+    """
+
+    def __init__(self, store: AnalysisHistoryStore, smoothing: float = 0.5, half_life_days: float = 180.0):
+        self.store = store
+        self.smoothing = smoothing
+        self.half_life_days = half_life_days
+        self._lock = threading.Lock()
+        self._states: Dict[Tuple[str, str], DegradationState] = {}
+        for data in store.asset_trend_states():
+            state = DegradationState.from_dict(data)
+            self._states[(state.tenant, state.asset_id)] = state
+
+    def _apply(self, tenant: str, asset_id: str, result: BearingAnalysisResult, created_at: float,
+               analysis_id: Optional[int]) -> Tuple[DegradationState, Tuple]:
+        """Fold one analysis into its asset's state; returns the state and the timeline row"""
+        state = self._states.get((tenant, asset_id))
+        if state is None:
+            state = self._states[(tenant, asset_id)] = DegradationState(tenant, asset_id)
+        code = failure_code(result)
+        extent = damage_extent(result)
+        score = damage_score(code, extent)
+        state.update(created_at, code, result.confidence_score, score,
+                     self.smoothing, self.half_life_days, analysis_id)
+        event = (analysis_id, tenant, asset_id, created_at, code, result.confidence_score,
+                 round(extent, 4), None if score is None else round(score, 4),
+                 None if score is None else round(state.index, 4))
+        return state, event
+
+    def record(self, result: BearingAnalysisResult, tenant: str, asset_id: str,
+               created_at: datetime, analysis_id: int) -> AssetTrend:
+        """Add one stored analysis to its asset's trend and return the updated trend"""
+        with self._lock:
+            state, event = self._apply(tenant, asset_id, result, created_at.timestamp(), analysis_id)
+            self.store.record_asset_event(event, state.to_dict())
+            return state.summary()
+
+    async def record_async(self, *args, **kwargs) -> AssetTrend:
+        return await asyncio.to_thread(self.record, *args, **kwargs)
+
+    def trend(self, tenant: str, asset_id: str) -> Optional[AssetTrend]:
+        with self._lock:
+            state = self._states.get((tenant, asset_id))
+            return state.summary() if state else None
+
+    def points(self, tenant: str, asset_id: str, limit: int = 100) -> List[AssetTrendPoint]:
+        """Latest timeline points of one asset, oldest first"""
+        return [
+            AssetTrendPoint(
+                analysis_id=row["analysis_id"],
+                created_at=datetime.fromtimestamp(row["created_at"]),
+                failure_mode_code=row["failure_mode_code"],
+                confidence_score=row["confidence_score"],
+                damage_extent=row["damage_extent"],
+                damage_score=row["damage_score"],
+                degradation_index=row["degradation_index"]
+            )
+            for row in self.store.asset_events(tenant, asset_id, limit)
+        ]
+
+    async def points_async(self, *args, **kwargs) -> List[AssetTrendPoint]:
+        return await asyncio.to_thread(self.points, *args, **kwargs)
+
+    def assets(self, tenant: Optional[str] = None, status: Optional[AssetStatus] = None,
+               limit: int = 100) -> Tuple[int, List[AssetTrend]]:
+        """
+        Tracked assets, most degraded first
+
+        Returns:
+            (assets matching the filters, the first limit of them)
+        """
+        with self._lock:
+            states = [state for state in self._states.values()
+                      if (tenant is None or state.tenant == tenant) and (status is None or state.status == status)]
+            worst = heapq.nlargest(limit, states, key=lambda state: (state.index, state.last_seen))
+            return len(states), [state.summary() for state in worst]
+
+    def rebuild(self, batch_size: int = 5000) -> int:
+        """
+        Replay every stored analysis with an asset id, oldest first
+
+        Run after the scoring changes or to backfill trends; replaces all
+        saved timelines and states.
+
+        Returns:
+            Number of analyses replayed
+        """
+        with self._lock:
+            self._states = {}
+            events = []
+            for rows in self.store.iter_batches(AnalysisFilters(), batch_size):
+                for row in rows:
+                    if row["asset_id"] is None:
+                        continue
+                    result = BearingAnalysisResult(**json.loads(row["result_json"]))
+                    _, event = self._apply(row["tenant"] or settings.DEFAULT_TENANT, row["asset_id"], result,
+                                           row["created_at"], row["id"])
+                    events.append(event)
+            self.store.replace_asset_trends(events, [state.to_dict() for state in self._states.values()])
+            return len(events)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            statuses = Counter(state.status.value for state in self._states.values())
+        return {"assets": sum(statuses.values()), "by_status": dict(statuses)}
+
+
+def create_asset_tracker(store: Optional[AnalysisHistoryStore]) -> Optional[AssetTrendTracker]:
+    """Asset trend tracker on the history store; None when trends or history are disabled"""
+    if store is None or not settings.ASSET_TRENDS_ENABLED:
+        return None
+    try:
+        return AssetTrendTracker(store, settings.ASSET_TREND_SMOOTHING, settings.ASSET_TREND_HALF_LIFE_DAYS)
+    except Exception as e:
+        print(f"⚠️  Failed to load asset trends: {e}")
+        return None
@@ -0,0 +1,217 @@
+"""
+Bearing Geometry Catalog
+Array-backed bearing geometries by designation and vectorized defect frequencies for fleets
+"""
+
+import csv
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.fault_models import BearingType
+
+DEFECT_NAMES = ["BPFO", "BPFI", "BSF", "FTF"]
+
+BEARING_TYPES = list(BearingType)
+
+BUNDLED_CATALOG = Path(__file__).resolve().parent.parent / "data" / "bearing_catalog.csv"
+
+# Separators after which designations carry seal, clearance or cage suffixes
+SUFFIX_SEPARATORS = ("-", "/", " ")
+
+# Seal, shield, snap-ring, clearance, cage, bore and precision suffixes that
+# may follow the base designation directly ("6205ZZ", "NU205ECP", "22205K");
+# none of them changes the rolling-element geometry
+DESIGNATION_SUFFIXES = (
+    "2RS1", "2RSH", "2RSR", "2RSL", "2RS", "RS1", "RSH", "RS", "2RZ", "RZ", "2Z", "ZZ", "Z",
+    "LLU", "LLB", "DDU", "VV", "DD", "NR", "N",
+    "C2", "C3", "C4", "C5", "CN",
+    "ECML", "ECM", "ECJ", "ECP", "EC", "E", "TN9", "TNH", "TN", "MA", "MB", "M", "JN", "J",
+    "K", "P6", "P5", "P4"
+)
+
+
+def defect_orders(rolling_elements, element_diameter_mm, pitch_diameter_mm,
+                  contact_angle_deg) -> np.ndarray:
+    """
+    Defect frequencies per shaft revolution, one row per bearing
+
+    Columns follow DEFECT_NAMES; multiply by the shaft speed in Hz for
+    frequencies. Assumes a stationary outer ring. Scalars give one row.
+    """
+    n = np.asarray(rolling_elements, dtype=np.float64)
+    ball = np.asarray(element_diameter_mm, dtype=np.float64)
+    pitch = np.asarray(pitch_diameter_mm, dtype=np.float64)
+    ratio = ball / pitch * np.cos(np.radians(np.asarray(contact_angle_deg, dtype=np.float64)))
+    return np.stack([
+        n / 2.0 * (1.0 - ratio),
+        n / 2.0 * (1.0 + ratio),
+        pitch / (2.0 * ball) * (1.0 - ratio ** 2),
+        0.5 * (1.0 - ratio)
+    ], axis=-1)
+
+
+def normalize_designation(designation: str) -> str:
+    return designation.strip().upper()
+
+
+class BearingCatalog:
+    """
+    Bearing geometries held as parallel NumPy arrays, one row per designation.
+
+    Defect orders for every row are computed once at load, so fleet queries
+    are an index lookup and one broadcast multiply by the shaft speeds.
+    """
+
+    def __init__(self, designations: Sequence[str], bearing_types: Sequence[Union[BearingType, str]],
+                 rolling_elements: Sequence[int], element_diameter_mm: Sequence[float],
+                 pitch_diameter_mm: Sequence[float], contact_angle_deg: Sequence[float],
+                 sources: Optional[Sequence[str]] = None):
+        self.designations = np.array([normalize_designation(name) for name in designations], dtype=str)
+        self.type_codes = np.array([BEARING_TYPES.index(BearingType(value)) for value in bearing_types], dtype=np.int8)
+        self.rolling_elements = np.asarray(rolling_elements, dtype=np.int32)
+        self.element_diameter_mm = np.asarray(element_diameter_mm, dtype=np.float64)
+        self.pitch_diameter_mm = np.asarray(pitch_diameter_mm, dtype=np.float64)
+        self.contact_angle_deg = np.asarray(contact_angle_deg, dtype=np.float64)
+        self.sources = np.array(sources if sources is not None else ["provided"] * len(self.designations), dtype=str)
+
+        invalid = ((self.rolling_elements < 1) | (self.element_diameter_mm <= 0)
+                   | (self.pitch_diameter_mm <= self.element_diameter_mm)
+                   | (self.contact_angle_deg < 0) | (self.contact_angle_deg > 90))
+        if invalid.any():
+            raise ValueError(f"Invalid bearing geometry for: {', '.join(self.designations[invalid][:10])}")
+
+        self.index: Dict[str, int] = {name: row for row, name in enumerate(self.designations.tolist())}
+        if len(self.index) != len(self.designations):
+            raise ValueError("Bearing designations must be unique")
+        self.orders = defect_orders(self.rolling_elements, self.element_diameter_mm,
+                                    self.pitch_diameter_mm, self.contact_angle_deg)
+
+    @classmethod
+    def from_csv(cls, paths: Iterable[Path]) -> "BearingCatalog":
+        """
+        Load catalog files in order; rows of later files replace earlier ones
+        with the same designation. Lines starting with ``#`` are comments.
+        """
+        rows: Dict[str, Dict[str, str]] = {}
+        for path in paths:
+            with open(path, newline="", encoding="utf-8") as handle:
+                reader = csv.DictReader(line for line in handle if line.strip() and not line.startswith("#"))
+                for row in reader:
+                    rows[normalize_designation(row["designation"])] = row
+        values = list(rows.values())
+        return cls(
+            designations=list(rows),
+            bearing_types=[row["bearing_type"] for row in values],
+            rolling_elements=[int(row["rolling_elements"]) for row in values],
+            element_diameter_mm=[float(row["element_diameter_mm"]) for row in values],
+            pitch_diameter_mm=[float(row["pitch_diameter_mm"]) for row in values],
+            contact_angle_deg=[float(row.get("contact_angle_deg") or 0.0) for row in values],
+            sources=[row.get("source") or "provided" for row in values]
+        )
+
+    def __len__(self) -> int:
+        return len(self.designations)
+
+    def __contains__(self, designation: str) -> bool:
+        return self.resolve(designation) is not None
+
+    def resolve(self, designation: str) -> Optional[int]:
+        """
+        Row of a designation, ignoring case and seal, shield or clearance
+        suffixes ("6205-2RS C3", "6205ZZ" and "NU205ECP" find the base rows)
+
+        Only known suffixes are removed: a designation whose base is not in
+        the catalog ("63005") is unknown rather than a shorter bearing's row.
+        """
+        name = normalize_designation(designation)
+        row = self.index.get(name)
+        if row is not None:
+            return row
+        for separator in SUFFIX_SEPARATORS:
+            name = name.split(separator, 1)[0]
+        # Shortest suffix chains first; each base is tried once
+        candidates = [name]
+        seen = {name}
+        for name in candidates:
+            row = self.index.get(name)
+            if row is not None:
+                return row
+            for suffix in DESIGNATION_SUFFIXES:
+                base = name[:-len(suffix)]
+                if name.endswith(suffix) and base and base not in seen:
+                    seen.add(base)
+                    candidates.append(base)
+        return None
+
+    def lookup(self, designations: Sequence[str]) -> np.ndarray:
+        """Rows of many designations, -1 where a designation is unknown"""
+        rows = np.fromiter((self.index.get(normalize_designation(name), -1) for name in designations),
+                           dtype=np.int64, count=len(designations))
+        for position in np.flatnonzero(rows < 0):
+            row = self.resolve(designations[position])
+            rows[position] = -1 if row is None else row
+        return rows
+
+    def frequencies(self, rows: np.ndarray, shaft_hz: Union[float, Sequence[float]],
+                    pairwise: bool = False) -> np.ndarray:
+        """
+        Defect frequencies in Hz of catalog rows
+
+        Args:
+            rows: Catalog rows, e.g. from lookup (no -1 entries)
+            shaft_hz: Shaft speeds in Hz
+            pairwise: Pair rows[i] with shaft_hz[i] instead of every speed for every row
+
+        Returns:
+            (rows, 4) when pairwise, otherwise (rows, speeds, 4); the last
+            axis follows DEFECT_NAMES
+        """
+        orders = self.orders[np.asarray(rows, dtype=np.int64)]
+        speeds = np.atleast_1d(np.asarray(shaft_hz, dtype=np.float64))
+        if pairwise:
+            if speeds.shape[0] != orders.shape[0]:
+                raise ValueError("Pairwise frequencies need one shaft speed per bearing")
+            return orders * speeds[:, None]
+        return orders[:, None, :] * speeds[None, :, None]
+
+    def search(self, prefix: Optional[str] = None, bearing_type: Optional[BearingType] = None,
+               limit: Optional[int] = None) -> np.ndarray:
+        """Rows whose designation starts with a prefix and/or of one bearing type"""
+        mask = np.ones(len(self), dtype=bool)
+        if prefix:
+            mask &= np.char.startswith(self.designations, normalize_designation(prefix))
+        if bearing_type is not None:
+            mask &= self.type_codes == BEARING_TYPES.index(BearingType(bearing_type))
+        rows = np.flatnonzero(mask)
+        return rows[:limit] if limit is not None else rows
+
+    def bearing_type(self, row: int) -> BearingType:
+        return BEARING_TYPES[self.type_codes[row]]
+
+    def entry(self, row: int) -> Dict:
+        """One row as plain values, with its defect orders"""
+        return {
+            "designation": str(self.designations[row]),
+            "bearing_type": self.bearing_type(row),
+            "rolling_elements": int(self.rolling_elements[row]),
+            "element_diameter_mm": float(self.element_diameter_mm[row]),
+            "pitch_diameter_mm": float(self.pitch_diameter_mm[row]),
+            "contact_angle_deg": float(self.contact_angle_deg[row]),
+            "source": str(self.sources[row]),
+            "defect_orders": {name: round(float(order), 5) for name, order in zip(DEFECT_NAMES, self.orders[row])}
+        }
+
+
+def create_bearing_catalog() -> BearingCatalog:
+    """Load the bundled catalog, overridden by BEARING_CATALOG_PATH when set"""
+    paths: List[Path] = [BUNDLED_CATALOG]
+    if settings.BEARING_CATALOG_PATH:
+        extra = Path(settings.BEARING_CATALOG_PATH)
+        if extra.exists():
+            paths.append(extra)
+        else:
+            print(f"⚠️  Bearing catalog {extra} not found, using the bundled catalog only")
+    return BearingCatalog.from_csv(paths)
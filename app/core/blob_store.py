@@ -0,0 +1,323 @@
+"""
+Content-Addressed Image Store
+Deduplicated image blobs keyed by SHA-256, with lazily generated and cached thumbnails
+"""
+
+import asyncio
+import hashlib
+import io
+import mmap
+import os
+import re
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Union
+
+from PIL import Image
+
+from app.core.config import settings
+from app.core.single_flight import SingleFlight
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+    BOTO3_AVAILABLE = True
+except ImportError:
+    boto3 = None
+    ClientError = Exception
+    BOTO3_AVAILABLE = False
+
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF8", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff")
+]
+
+# Bytes-like blob: a read-only memory map for local files, bytes otherwise
+Blob = Union[mmap.mmap, bytes]
+
+
+def sniff_content_type(head: bytes) -> str:
+    """Image media type from the leading bytes of a blob"""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return "application/octet-stream"
+
+
+def image_key(digest: str) -> str:
+    """Object key of an image, sharded by the first two digest bytes"""
+    return f"images/{digest[:2]}/{digest[2:4]}/{digest}"
+
+
+def thumbnail_key(digest: str, size: int) -> str:
+    return f"thumbnails/{size}/{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+
+
+def iter_blob(blob: Blob, chunk_size: int = 256 * 1024) -> Iterator[bytes]:
+    """Stream a blob in chunks, closing a memory map at the end"""
+    view = memoryview(blob)
+    try:
+        for start in range(0, len(view), chunk_size):
+            yield bytes(view[start:start + chunk_size])
+    finally:
+        view.release()
+        if isinstance(blob, mmap.mmap):
+            blob.close()
+
+
+class BlobStore:
+    """
+    Content-addressed store of uploaded images.
+
+    Keys are SHA-256 digests of the bytes, so an image uploaded many times
+    is stored once. Backends provide S3-style object calls (``_head``,
+    ``_put``, ``_get``, ``_delete``); deduplication, background writes and
+    thumbnails are shared.
+    """
+
+    def __init__(self, write_concurrency: int = 4, thumbnail_quality: int = 85):
+        self.write_concurrency = write_concurrency
+        self.thumbnail_quality = thumbnail_quality
+        self.counts = Counter()
+        self._pending: Set[asyncio.Task] = set()
+        self._writing: Set[str] = set()
+        self._write_slots: Optional[asyncio.Semaphore] = None
+        self._thumbnails = SingleFlight(enabled=True)
+
+    def _head(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def _put(self, key: str, data: bytes, content_type: str):
+        raise NotImplementedError
+
+    def _get(self, key: str) -> Optional[Blob]:
+        raise NotImplementedError
+
+    def _delete(self, key: str):
+        raise NotImplementedError
+
+    def put(self, data: bytes, digest: Optional[str] = None) -> str:
+        """Store an image unless it is already there; returns its digest"""
+        actual = hashlib.sha256(data).hexdigest()
+        if digest is not None and digest != actual:
+            # Never file bytes under a key they do not hash to
+            raise ValueError(f"Digest {digest[:12]} does not match the image ({actual[:12]})")
+        digest = actual
+        key = image_key(digest)
+        if self._head(key):
+            self.counts["deduplicated"] += 1
+            return digest
+        self._put(key, data, sniff_content_type(data[:16]))
+        self.counts["stored"] += 1
+        self.counts["bytes_stored"] += len(data)
+        return digest
+
+    def put_background(self, data: bytes, digest: Optional[str] = None) -> str:
+        """Store an image off the request path; returns its digest right away"""
+        digest = digest or hashlib.sha256(data).hexdigest()
+        if digest in self._writing:
+            # The same image is already on its way to the store
+            self.counts["deduplicated"] += 1
+            return digest
+        self._writing.add(digest)
+        task = asyncio.get_running_loop().create_task(self._put_later(data, digest))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return digest
+
+    async def _put_later(self, data: bytes, digest: str):
+        if self._write_slots is None:
+            self._write_slots = asyncio.Semaphore(self.write_concurrency)
+        async with self._write_slots:
+            try:
+                await asyncio.to_thread(self.put, data, digest)
+            except Exception as e:
+                self.counts["failed"] += 1
+                print(f"⚠️  Failed to store image {digest[:12]}: {e}")
+            finally:
+                self._writing.discard(digest)
+
+    async def flush(self):
+        """Wait for background writes, e.g. at shutdown"""
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    def exists(self, digest: str) -> bool:
+        return self._head(image_key(digest))
+
+    def get(self, digest: str) -> Optional[Blob]:
+        """Image bytes, or None if the image is not stored"""
+        return self._get(image_key(digest))
+
+    def delete(self, digest: str, thumbnail_sizes: List[int] = ()):
+        """Remove an image and its thumbnails of the given sizes"""
+        self._delete(image_key(digest))
+        for size in thumbnail_sizes:
+            self._delete(thumbnail_key(digest, size))
+
+    def _make_thumbnail(self, digest: str, size: int) -> Optional[bytes]:
+        """Generate and store a thumbnail; None if the image is not stored"""
+        original = self._get(image_key(digest))
+        if original is None:
+            return None
+        try:
+            with Image.open(io.BytesIO(original) if isinstance(original, bytes) else original) as image:
+                # JPEG decodes straight to a reduced scale
+                image.draft("RGB", (size, size))
+                image.thumbnail((size, size))
+                buffer = io.BytesIO()
+                image.convert("RGB").save(buffer, "JPEG", quality=self.thumbnail_quality, optimize=True)
+        finally:
+            if isinstance(original, mmap.mmap):
+                original.close()
+
+        data = buffer.getvalue()
+        self._put(thumbnail_key(digest, size), data, "image/jpeg")
+        self.counts["thumbnails_generated"] += 1
+        return data
+
+    async def thumbnail(self, digest: str, size: int) -> Optional[Blob]:
+        """JPEG thumbnail fitting in size x size; concurrent first requests generate it once"""
+        cached = await asyncio.to_thread(self._get, thumbnail_key(digest, size))
+        if cached is not None:
+            self.counts["thumbnail_hits"] += 1
+            return cached
+        result, _ = await self._thumbnails.do(
+            f"{digest}:{size}", lambda: asyncio.to_thread(self._make_thumbnail, digest, size)
+        )
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self).__name__,
+            "pending_writes": len(self._pending),
+            **{name: self.counts[name] for name in
+               ("stored", "deduplicated", "failed", "bytes_stored", "thumbnails_generated", "thumbnail_hits")}
+        }
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Blobs as files under a root directory, in sharded sub-directories.
+
+    Writes go to a temporary file renamed into place, so readers never see
+    a partial image. Reads are memory-mapped.
+    """
+
+    def __init__(self, root: str, **kwargs):
+        super().__init__(**kwargs)
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def _head(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def _put(self, key: str, data: bytes, content_type: str):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(temporary, path)
+        except BaseException:
+            Path(temporary).unlink(missing_ok=True)
+            raise
+
+    def _get(self, key: str) -> Optional[Blob]:
+        try:
+            with open(self._path(key), "rb") as handle:
+                if os.fstat(handle.fileno()).st_size == 0:
+                    return b""
+                return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+
+    def _delete(self, key: str):
+        self._path(key).unlink(missing_ok=True)
+
+
+class S3BlobStore(BlobStore):
+    """
+    Blobs as objects in an S3 bucket or an S3-compatible service (MinIO,
+    Ceph, LocalStack). Pass ``client`` to use a preconfigured or stand-in
+    client.
+    """
+
+    MISSING_CODES = ("404", "NoSuchKey", "NotFound")
+
+    def __init__(self, bucket: str, prefix: str = "", client: Any = None,
+                 endpoint_url: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        if client is None:
+            if not BOTO3_AVAILABLE:
+                raise RuntimeError("boto3 is required for the S3 image store (pip install boto3)")
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+
+    def _missing(self, error: Exception) -> bool:
+        code = str(getattr(error, "response", {}).get("Error", {}).get("Code", ""))
+        return code in self.MISSING_CODES
+
+    def _head(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+            return True
+        except ClientError as e:
+            if self._missing(e):
+                return False
+            raise
+
+    def _put(self, key: str, data: bytes, content_type: str):
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=bytes(data),
+                               ContentType=content_type)
+
+    def _get(self, key: str) -> Optional[Blob]:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)["Body"].read()
+        except ClientError as e:
+            if self._missing(e):
+                return None
+            raise
+
+    def _delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+
+def thumbnail_sizes() -> List[int]:
+    """Thumbnail sizes clients may ask for (THUMBNAIL_SIZES setting)"""
+    return sorted(int(size) for size in settings.THUMBNAIL_SIZES.split(",") if size.strip())
+
+
+def create_blob_store() -> Optional[BlobStore]:
+    """Build the image store from settings; None when storage is disabled"""
+    if not settings.IMAGE_STORE_ENABLED:
+        return None
+    options = {
+        "write_concurrency": settings.IMAGE_STORE_WRITE_CONCURRENCY,
+        "thumbnail_quality": settings.THUMBNAIL_QUALITY
+    }
+    try:
+        if settings.IMAGE_STORE_BACKEND == "s3":
+            if not settings.IMAGE_STORE_S3_BUCKET:
+                raise ValueError("IMAGE_STORE_S3_BUCKET is not set")
+            return S3BlobStore(settings.IMAGE_STORE_S3_BUCKET, settings.IMAGE_STORE_S3_PREFIX,
+                               endpoint_url=settings.IMAGE_STORE_S3_ENDPOINT_URL, **options)
+        return LocalBlobStore(settings.IMAGE_STORE_PATH, **options)
+    except Exception as e:
+        print(f"⚠️  Image store disabled: {e}")
+        return None
@@ -12,6 +12,120 @@ class Settings(BaseSettings):
     
     # Model Configuration
     GEMINI_MODEL: str = "models/gemini-2.5-flash"
+    MODEL_BACKEND: str = "gemini"  # "gemini" or "fake" for load tests without API calls
+    PROMPT_VARIANT: str = "expert-v1"  # See GeminiFaultAnalyzer.PROMPT_VARIANTS
+    FAKE_MODEL_LATENCY_MS: int = 1500
+    FAKE_MODEL_JITTER_MS: int = 500
+    FAKE_MODEL_MS_PER_OUTPUT_TOKEN: float = 0.0  # Simulated decoding time, to compare output lengths
+    COALESCE_IDENTICAL_REQUESTS: bool = True  # Concurrent identical analyses share one model call
+    
+    # Self-Consistency Configuration
+    SELF_CONSISTENCY_ENABLED: bool = False  # Default for requests that do not set self_consistency
+    SELF_CONSISTENCY_THRESHOLD: float = 0.6  # Answers below this confidence are re-sampled
+    SELF_CONSISTENCY_MAX_SAMPLES: int = 3  # Model answers per image at most, the first included
+    SELF_CONSISTENCY_TEMPERATURE: float = 0.8  # Sampling temperature of the extra answers
+    
+    # Request Scheduling Configuration
+    MAX_CONCURRENT_ANALYSES: int = 8
+    INTERACTIVE_RESERVED_SLOTS: int = 2  # Slots batch traffic can never occupy
+    INTERACTIVE_WEIGHT: int = 4
+    BATCH_WEIGHT: int = 1
+    INTERACTIVE_QUEUE_LIMIT: int = 100
+    BATCH_QUEUE_LIMIT: int = 32  # Batch requests beyond this are shed with 429
+    DEFAULT_REQUEST_PRIORITY: str = "batch"  # Used when a request names no priority
+    
+    # High-Resolution Tiling Configuration
+    TILE_SIZE: int = 1024
+    TILE_OVERLAP: int = 128
+    TILE_MIN_ENTROPY: float = 3.0  # Bits; flatter tiles are treated as background
+    TILE_MIN_VARIANCE: float = 25.0
+    TILE_MAX_TILES: int = 24
+    TILE_CONCURRENCY: int = 6  # Concurrent model calls per tiled analysis
+    
+    # Local Triage Configuration
+    TRIAGE_MODEL_PATH: Optional[str] = None  # JSON or pickled classifier; triage is off when unset
+    TRIAGE_CONFIDENCE_THRESHOLD: float = 0.9
+    TRIAGE_LATENCY_BUDGET_MS: float = 8.0
+    TRIAGE_IMAGE_SIZE: int = 192
+    
+    # Vibration Analysis Configuration
+    VIBRATION_SEGMENT_SIZE: int = 16384  # FFT length; resolution is sample rate / segment size
+    VIBRATION_OVERLAP: float = 0.5
+    VIBRATION_HARMONICS: int = 3  # Harmonics checked per defect frequency
+    VIBRATION_DEFECT_TOLERANCE: float = 0.03  # Relative search window around each defect frequency (slip)
+    VIBRATION_SNR_THRESHOLD_DB: float = 6.0  # Peak height over the local median that counts as a match
+    VIBRATION_MAX_UPLOAD_MB: int = 512
+    
+    # Image Store Configuration
+    IMAGE_STORE_ENABLED: bool = True  # Keep uploaded images (deduplicated) for re-analysis, audits and the UI
+    IMAGE_STORE_BACKEND: str = "local"  # "local" or "s3" (AWS or any S3-compatible service)
+    IMAGE_STORE_PATH: str = "data/images"
+    IMAGE_STORE_S3_BUCKET: Optional[str] = None
+    IMAGE_STORE_S3_PREFIX: str = ""
+    IMAGE_STORE_S3_ENDPOINT_URL: Optional[str] = None  # e.g. a MinIO server; AWS when unset
+    IMAGE_STORE_WRITE_CONCURRENCY: int = 4
+    THUMBNAIL_SIZES: str = "128,256,512"  # Sizes served; each is generated once and cached
+    THUMBNAIL_QUALITY: int = 85
+    
+    # Bearing Catalog Configuration
+    BEARING_CATALOG_PATH: Optional[str] = None  # Fleet geometry CSV; its rows override the bundled catalog
+    DEFECT_FREQUENCY_MAX_VALUES: int = 2_000_000  # Largest bearings x speeds x 4 result per request
+    
+    # Analysis History Configuration
+    HISTORY_ENABLED: bool = True
+    HISTORY_DB_PATH: str = "data/analysis_history.db"
+    
+    # Authentication and Tenant Quota Configuration
+    AUTH_ENABLED: bool = False  # Require an API key (X-API-Key) on every endpoint except health and docs
+    TENANTS_FILE: str = "data/tenants.json"  # Managed with tenant_admin.py
+    DEFAULT_TENANT_RPM: int = 60  # Limits for tenants that set none; 0 means unlimited
+    DEFAULT_TENANT_MAX_CONCURRENT: int = 4
+    DEFAULT_TENANT_DAILY_TOKENS: int = 0
+    CORS_ALLOW_ORIGINS: str = "*"  # Comma-separated origins
+    
+    # Response Encoding Configuration
+    COMPRESSION_ENABLED: bool = True  # Brotli (when installed) or gzip, per Accept-Encoding
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # Smaller responses are sent uncompressed
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    
+    # Usage Accounting Configuration
+    USAGE_FLUSH_INTERVAL_SECONDS: float = 30.0  # In-memory counters are written to the history store this often
+    DEFAULT_TENANT: str = "anonymous"  # Tenant for requests without X-Tenant-ID
+    PRICE_INPUT_PER_MTOK: float = 0.0  # USD per million prompt and image tokens; 0 disables cost estimates
+    PRICE_OUTPUT_PER_MTOK: float = 0.0
+    
+    # Webhook Configuration
+    WEBHOOKS_ENABLED: bool = True  # Accept callback_url on submissions
+    WEBHOOK_OUTBOX_PATH: str = "data/webhook_outbox.db"
+    WEBHOOK_SECRET: Optional[str] = None  # Signs payloads (X-Webhook-Signature) when set
+    WEBHOOK_ALLOWED_HOSTS: str = ""  # Comma-separated callback hosts; empty allows any public host
+    WEBHOOK_ALLOW_PRIVATE_ADDRESSES: bool = False  # Also deliver to loopback, private and link-local addresses
+    WEBHOOK_BATCH_SIZE: int = 20  # Events per POST to one URL
+    WEBHOOK_CONCURRENCY: int = 16  # Pooled connections
+    WEBHOOK_TIMEOUT_SECONDS: float = 10.0
+    WEBHOOK_MAX_ATTEMPTS: int = 8
+    WEBHOOK_BACKOFF_BASE_SECONDS: float = 2.0  # Doubled after each failed attempt
+    WEBHOOK_BACKOFF_MAX_SECONDS: float = 600.0
+    WEBHOOK_POLL_INTERVAL_SECONDS: float = 5.0  # Idle check for due retries
+    WEBHOOK_RETENTION_HOURS: float = 168.0  # Delivered events are purged after this
+    
+    # Async Job Configuration
+    JOB_RESULT_TTL_SECONDS: int = 3600  # Finished jobs are forgotten after this
+    JOB_MAX_RETAINED: int = 10000
+    
+    # Profiling Configuration
+    PROFILING_ENABLED: bool = False  # Admin-only sampling profiles at /api/v1/admin/profile (needs AUTH_ENABLED)
+    PROFILING_MAX_SECONDS: float = 60.0  # Longest profile a request may ask for
+    PROFILING_INTERVAL_MS: float = 5.0  # Default sampling interval
+    SLOW_REQUEST_THRESHOLD_MS: float = 5000.0  # Requests at least this slow are captured with stage timings
+    SLOW_REQUEST_BUFFER_SIZE: int = 200  # Captures kept, oldest dropped first; 0 disables capture
+    SLOW_REQUEST_RESPONSE_CHARS: int = 0  # Raw model response characters kept in captures; 0 keeps none
+    
+    # Asset Trend Configuration
+    ASSET_TRENDS_ENABLED: bool = True  # Per-asset degradation trends for analyses sent with an asset_id (needs history)
+    ASSET_TREND_SMOOTHING: float = 0.5  # Weight of a fully confident analysis in the degradation index
+    ASSET_TREND_HALF_LIFE_DAYS: float = 180.0  # Age at which an analysis counts half in the trend slope
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,338 @@
+"""
+Columnar Export of Analysis History
+Streams stored analyses as Arrow/Parquet (or CSV) in constant memory
+"""
+
+import csv
+import io
+import json
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.history_store import AnalysisFilters, AnalysisHistoryStore
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa = None
+    pq = None
+    PYARROW_AVAILABLE = False
+
+EXPORT_COLUMNS = [
+    "id",
+    "created_at",
+    "date",
+    "image_digest",
+    "bearing_type",
+    "mounted_on_motor",
+    "application",
+    "model_used",
+    "tenant",
+    "asset_id",
+    "failure_mode",
+    "failure_mode_code",
+    "primary_root_cause",
+    "root_causes",
+    "root_cause_codes",
+    "confidence_score",
+    "processing_time",
+    "observed_damage",
+    "recommendations"
+]
+
+# Low-cardinality text columns stored as dictionary indices
+DICTIONARY_COLUMNS = {
+    "bearing_type", "application", "model_used", "tenant", "failure_mode", "failure_mode_code", "primary_root_cause"
+}
+
+# Hive-style directory partitioning; the keys live in the paths, not the files
+PARTITION_COLUMNS = ["date", "bearing_type"]
+
+UNKNOWN_PARTITION = "unknown"
+
+
+def flatten_row(row) -> Dict[str, Any]:
+    """Turn one history row into a flat export record"""
+    analysis = json.loads(row["result_json"])
+    root_causes = analysis.get("root_cause_analysis") or []
+    created_at = datetime.fromtimestamp(row["created_at"])
+    return {
+        "id": row["id"],
+        "created_at": created_at,
+        "date": created_at.strftime("%Y-%m-%d"),
+        "image_digest": row["image_digest"],
+        "bearing_type": row["bearing_type"],
+        "mounted_on_motor": None if row["mounted_on_motor"] is None else bool(row["mounted_on_motor"]),
+        "application": row["application"],
+        "model_used": row["model_used"],
+        "tenant": row["tenant"],
+        "asset_id": row["asset_id"],
+        "failure_mode": row["failure_mode"],
+        "failure_mode_code": row["failure_mode_code"],
+        "primary_root_cause": root_causes[0] if root_causes else None,
+        "root_causes": root_causes,
+        "root_cause_codes": analysis.get("root_cause_codes") or [],
+        "confidence_score": row["confidence_score"],
+        "processing_time": row["processing_time"],
+        "observed_damage": analysis.get("observed_damage"),
+        "recommendations": analysis.get("recommendations") or []
+    }
+
+
+def arrow_schema(exclude: Optional[List[str]] = None) -> "pa.Schema":
+    """Arrow schema of the export, optionally without some columns"""
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    fields = {
+        "id": pa.int64(),
+        "created_at": pa.timestamp("ms"),
+        "date": pa.string(),
+        "image_digest": pa.string(),
+        "bearing_type": dictionary,
+        "mounted_on_motor": pa.bool_(),
+        "application": dictionary,
+        "model_used": dictionary,
+        "tenant": dictionary,
+        "asset_id": pa.string(),
+        "failure_mode": dictionary,
+        "failure_mode_code": dictionary,
+        "primary_root_cause": dictionary,
+        "root_causes": pa.list_(pa.string()),
+        "root_cause_codes": pa.list_(pa.string()),
+        "confidence_score": pa.float64(),
+        "processing_time": pa.float64(),
+        "observed_damage": pa.string(),
+        "recommendations": pa.list_(pa.string())
+    }
+    return pa.schema([pa.field(name, fields[name]) for name in EXPORT_COLUMNS if name not in (exclude or [])])
+
+
+def records_to_batch(records: List[Dict[str, Any]], schema: "pa.Schema") -> "pa.RecordBatch":
+    """Build a record batch column by column"""
+    arrays = []
+    for field in schema:
+        values = [record[field.name] for record in records]
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def csv_cells(record: Dict[str, Any], columns: List[str]) -> List[Any]:
+    """CSV cells for one record; list columns are joined with '; '"""
+    cells = []
+    for name in columns:
+        value = record[name]
+        if isinstance(value, list):
+            value = "; ".join(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        cells.append("" if value is None else value)
+    return cells
+
+
+def iter_records(store: AnalysisHistoryStore, filters: AnalysisFilters,
+                 batch_size: int = 10000) -> Iterator[List[Dict[str, Any]]]:
+    """Flattened export records in batches, oldest first"""
+    for rows in store.iter_batches(filters, batch_size):
+        yield [flatten_row(row) for row in rows]
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back in chunks"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_arrow(store: AnalysisHistoryStore, filters: AnalysisFilters,
+                 batch_size: int = 10000) -> Iterator[bytes]:
+    """
+    Stream matching analyses in the Arrow IPC stream format
+
+    Each history batch becomes one record batch that is sent as soon as it
+    is written, so memory is bounded by the batch size.
+    """
+    schema = arrow_schema()
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+    yield sink.drain()
+    for records in iter_records(store, filters, batch_size):
+        writer.write_batch(records_to_batch(records, schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def stream_csv(store: AnalysisHistoryStore, filters: AnalysisFilters,
+               batch_size: int = 10000) -> Iterator[bytes]:
+    """Stream matching analyses as CSV, one chunk per history batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for records in iter_records(store, filters, batch_size):
+        writer.writerows(csv_cells(record, EXPORT_COLUMNS) for record in records)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def partition_values(record: Dict[str, Any]) -> tuple:
+    return tuple(record[name] or UNKNOWN_PARTITION for name in PARTITION_COLUMNS)
+
+
+class PartitionedExporter(ABC):
+    """
+    Writes a hive-partitioned dataset: ``date=YYYY-MM-DD/bearing_type=X/part-N``
+
+    Rows arrive oldest first, so only a few partitions are active at once.
+    At most ``max_open_files`` writers stay open; the least recently used one
+    is closed and a later row for its partition starts a new part file.
+    Subclasses provide the file format through the three writer hooks.
+    """
+
+    suffix = ""
+
+    def __init__(self, output_dir: Path, max_open_files: int = 32):
+        self.output_dir = Path(output_dir)
+        self.max_open_files = max_open_files
+        self.columns = [name for name in EXPORT_COLUMNS if name not in PARTITION_COLUMNS]
+        self._writers: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._parts: Dict[tuple, int] = {}
+        self.rows_written = 0
+        self.files_written = 0
+
+    def _path(self, partition: tuple) -> Path:
+        directory = self.output_dir.joinpath(
+            *(f"{name}={value}" for name, value in zip(PARTITION_COLUMNS, partition))
+        )
+        directory.mkdir(parents=True, exist_ok=True)
+        part = self._parts.get(partition, 0)
+        self._parts[partition] = part + 1
+        self.files_written += 1
+        return directory / f"part-{part:05d}{self.suffix}"
+
+    def _writer(self, partition: tuple):
+        writer = self._writers.get(partition)
+        if writer is not None:
+            self._writers.move_to_end(partition)
+            return writer
+        if len(self._writers) >= self.max_open_files:
+            _, oldest = self._writers.popitem(last=False)
+            self._close_writer(oldest)
+        writer = self._open_writer(self._path(partition))
+        self._writers[partition] = writer
+        return writer
+
+    def write(self, records: List[Dict[str, Any]]):
+        """Append one batch of records to their partitions"""
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for record in records:
+            groups.setdefault(partition_values(record), []).append(record)
+        for partition, group in groups.items():
+            self._write_group(self._writer(partition), group)
+            self.rows_written += len(group)
+
+    def close(self):
+        while self._writers:
+            _, writer = self._writers.popitem(last=False)
+            self._close_writer(writer)
+
+    @abstractmethod
+    def _open_writer(self, path: Path):
+        """Start a part file and return its writer"""
+
+    @abstractmethod
+    def _write_group(self, writer, records: List[Dict[str, Any]]):
+        """Append records of one partition"""
+
+    @abstractmethod
+    def _close_writer(self, writer):
+        """Finish a part file"""
+
+
+class ParquetExporter(PartitionedExporter):
+    """Partitioned Parquet with dictionary-encoded text columns"""
+
+    suffix = ".parquet"
+
+    def __init__(self, output_dir: Path, max_open_files: int = 32, compression: str = "zstd"):
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("pyarrow is required for Parquet export")
+        super().__init__(output_dir, max_open_files)
+        self.compression = compression
+        self.schema = arrow_schema(exclude=PARTITION_COLUMNS)
+
+    def _open_writer(self, path: Path):
+        return pq.ParquetWriter(str(path), self.schema, compression=self.compression,
+                                use_dictionary=sorted(DICTIONARY_COLUMNS - set(PARTITION_COLUMNS)))
+
+    def _write_group(self, writer, records: List[Dict[str, Any]]):
+        writer.write_batch(records_to_batch(records, self.schema))
+
+    def _close_writer(self, writer):
+        writer.close()
+
+
+class CsvExporter(PartitionedExporter):
+    """Partitioned CSV for environments without pyarrow"""
+
+    suffix = ".csv"
+
+    def _open_writer(self, path: Path):
+        handle = open(path, "w", newline="", encoding="utf-8")
+        writer = csv.writer(handle)
+        writer.writerow(self.columns)
+        return handle, writer
+
+    def _write_group(self, writer, records: List[Dict[str, Any]]):
+        writer[1].writerows(csv_cells(record, self.columns) for record in records)
+
+    def _close_writer(self, writer):
+        writer[0].close()
+
+
+def export_dataset(store: AnalysisHistoryStore, filters: AnalysisFilters, output_dir: Path,
+                   export_format: str = "parquet", batch_size: int = 10000,
+                   max_open_files: int = 32) -> PartitionedExporter:
+    """
+    Export matching analyses to a partitioned dataset on disk
+
+    Returns:
+        The finished exporter, with rows_written and files_written
+    """
+    if export_format == "parquet":
+        exporter = ParquetExporter(output_dir, max_open_files)
+    elif export_format == "csv":
+        exporter = CsvExporter(output_dir, max_open_files)
+    else:
+        raise ValueError(f"Unknown export format: {export_format}")
+
+    try:
+        for records in iter_records(store, filters, batch_size):
+            exporter.write(records)
+    finally:
+        exporter.close()
+    return exporter
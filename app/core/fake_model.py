@@ -0,0 +1,168 @@
+"""
+Fake Generative Model Backend
+Stands in for Gemini during load tests and offline benchmarks
+"""
+
+import asyncio
+import hashlib
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from PIL import Image
+
+from app.core.recommendations import CODES_ONLY_INSTRUCTION
+from app.core.taxonomy import normalize_failure_mode, normalize_root_causes
+from app.core.usage_tracker import estimate_image_tokens
+
+# Canned answers in the layout the expert prompt asks for
+FAKE_RESPONSES = [
+    {
+        "damage": "- Spalling on inner raceway along the load zone\n- Flaked areas 2-4 mm wide with sharp edges",
+        "mode": "Rolling contact fatigue (subsurface initiated)",
+        "causes": "- Overloading beyond rated dynamic capacity\n- Extended service beyond L10 life",
+        "confidence": 82,
+        "recommendations": "- Verify applied load against rating\n- Replace bearing and inspect shaft\n- Trend vibration monthly"
+    },
+    {
+        "damage": "- Fine indentations spread across the raceway\n- Dull matte finish with scattered dents",
+        "mode": "Abrasive wear from contamination",
+        "causes": "- Contamination ingress through damaged seal",
+        "confidence": 74,
+        "recommendations": "- Replace seals with contact type\n- Filter and flush lubricant\n- Clean housing before refit"
+    },
+    {
+        "damage": "- Evenly spaced axial fluting on outer raceway\n- Grey frosted band across the load zone",
+        "mode": "Electrical erosion (fluting)",
+        "causes": "- Shaft currents from VFD without grounding",
+        "confidence": 88,
+        "recommendations": "- Install shaft grounding ring\n- Use insulated or hybrid bearing\n- Check motor earthing"
+    },
+    {
+        "damage": "- Shallow depressions at rolling element pitch\n- Polished marks without material loss",
+        "mode": "False brinelling",
+        "causes": "- Vibration while stationary during transport",
+        "confidence": 61,
+        "recommendations": "- Lock shaft during transport\n- Isolate standby machines\n- Rotate idle shafts weekly"
+    },
+    {
+        "damage": "- No visible surface damage on the raceway\n- Uniform running track with original finish",
+        "mode": "No failure mode identified",
+        "causes": "- No root cause evident from the image",
+        "confidence": 45,
+        "recommendations": "- Continue routine monitoring\n- Capture closer raceway image\n- Check lubrication schedule"
+    }
+]
+
+
+class FakeUsageMetadata:
+    """Token counts shaped like the SDK's usage metadata"""
+
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeResponse:
+    """Minimal stand-in for a GenerateContentResponse"""
+
+    def __init__(self, text: str, usage_metadata: FakeUsageMetadata):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class FakeGenerativeModel:
+    """
+    Deterministic Gemini replacement with configurable latency.
+
+    The same image and prompt always produce the same canned answer, so
+    load tests and benchmarks against it are repeatable. Requests with a
+    sampling temperature above zero keep that answer only most of the time,
+    like a real model sampled repeatedly on an ambiguous image.
+
+    Answers follow the layout the prompt asks for (full text or codes only),
+    and ``ms_per_output_token`` adds generation time per output token.
+    """
+
+    def __init__(self, model_name: str = "fake", latency_ms: int = 1500, jitter_ms: int = 500,
+                 ms_per_output_token: float = 0.0):
+        self.model_name = model_name
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.ms_per_output_token = ms_per_output_token
+
+    def _fingerprint(self, contents: List[Any]) -> bytes:
+        """Hash the prompt text and a coarse image signature"""
+        digest = hashlib.sha256()
+        for part in contents:
+            if isinstance(part, Image.Image):
+                digest.update(str(part.size).encode())
+                digest.update(part.convert("L").resize((8, 8)).tobytes())
+            else:
+                digest.update(str(part).encode())
+        return digest.digest()
+
+    def _respond(self, contents: List[Any], generation_config: Optional[Dict[str, Any]] = None) -> FakeResponse:
+        """Build the canned response for a request"""
+        fingerprint = self._fingerprint(contents)
+        choice = fingerprint[0] % len(FAKE_RESPONSES)
+        temperature = (generation_config or {}).get("temperature", 0.0)
+        if temperature > 0 and random.random() < min(0.9, 0.5 * temperature):
+            choice = random.randrange(len(FAKE_RESPONSES))
+        canned = FAKE_RESPONSES[choice]
+        if any(isinstance(part, str) and CODES_ONLY_INSTRUCTION in part for part in contents):
+            causes = normalize_root_causes(canned["causes"].splitlines())
+            text = f"""🔍 1. Observed Damage:
+{canned["damage"].splitlines()[0]}
+
+⚙️ 2. Failure Mode:
+{normalize_failure_mode(canned["mode"])}
+
+🧠 3. Root Cause Analysis:
+{chr(10).join("- " + code for code in causes)}
+
+🔢 4. Confidence Score:
+Confidence: {canned["confidence"]}%
+"""
+        else:
+            text = f"""🔍 1. Observed Damage:
+{canned["damage"]}
+
+⚙️ 2. Failure Mode:
+{canned["mode"]}
+
+🧠 3. Root Cause Analysis:
+{canned["causes"]}
+
+🔢 4. Confidence Score:
+Confidence: {canned["confidence"]}%
+
+💡 5. Brief Recommendations:
+{canned["recommendations"]}
+"""
+        prompt_chars = sum(len(part) for part in contents if isinstance(part, str))
+        image_tokens = sum(estimate_image_tokens(part.size) for part in contents if isinstance(part, Image.Image))
+        usage = FakeUsageMetadata(
+            prompt_token_count=prompt_chars // 4 + image_tokens,
+            candidates_token_count=len(text) // 4
+        )
+        return FakeResponse(text, usage)
+
+    def _latency(self, response: FakeResponse) -> float:
+        """Simulated generation time in seconds"""
+        jitter = random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        decoding = self.ms_per_output_token * response.usage_metadata.candidates_token_count
+        return max(0.0, self.latency_ms + jitter + decoding) / 1000.0
+
+    def generate_content(self, contents: List[Any], **kwargs) -> FakeResponse:
+        """Blocking variant matching GenerativeModel.generate_content"""
+        response = self._respond(contents, kwargs.get("generation_config"))
+        time.sleep(self._latency(response))
+        return response
+
+    async def generate_content_async(self, contents: List[Any], **kwargs) -> FakeResponse:
+        """Async variant matching GenerativeModel.generate_content_async"""
+        response = self._respond(contents, kwargs.get("generation_config"))
+        await asyncio.sleep(self._latency(response))
+        return response
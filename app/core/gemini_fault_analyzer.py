@@ -4,8 +4,10 @@ Uses Google's Gemini 1.5 Flash for specialist-level bearing failure analysis
 """
 
 import asyncio
+import hashlib
 import time
-from typing import Optional, Dict, Any
+from collections import Counter
+from typing import Optional, Dict, Any, List, Tuple
 import google.generativeai as genai
 from PIL import Image
 import io
@@ -13,20 +15,62 @@ import base64
 import re
 
 from app.core.config import settings
-from app.models.fault_models import BearingAnalysisResult, AnalysisResponse
+from app.core.fake_model import FakeGenerativeModel
+from app.core.profiling import annotate, stage
+from app.core.recommendations import CODES_ONLY_INSTRUCTION, DIAGNOSIS_CODES, expand_codes
+from app.core.single_flight import SingleFlight
+from app.core.taxonomy import normalize_result
+from app.core.usage_tracker import extract_usage
+from app.core.triage import create_triage_classifier
+from app.core.image_pipeline import (
+    ImageData,
+    ImageTile,
+    decode_image,
+    open_image,
+    split_into_tiles,
+    select_informative_tiles,
+    location_hint
+)
+from app.models.fault_models import BearingAnalysisResult, AnalysisResponse, SelfConsistency, TokenUsage
 
 class GeminiFaultAnalyzer:
     """Bearing fault analyzer using Google's Gemini AI"""
     
+    # Prompt variant name -> builder method; all variants share the section
+    # layout that _parse_gemini_response expects. Bump the version suffix
+    # when a variant's wording changes meaningfully.
+    PROMPT_VARIANTS = {
+        "expert-v1": "_create_expert_prompt",
+        "concise-v1": "_create_concise_prompt",
+        "codes-v1": "_create_codes_prompt"
+    }
+    
+    # Variants whose answers carry codes only; recommendations come from
+    # the local library (app.core.recommendations)
+    CODES_ONLY_VARIANTS = {"codes-v1"}
+    
     def __init__(self):
         self.model = None
         self.api_key_configured = False
+        self._models: Dict[str, Any] = {}
         self._initialize_gemini()
+        self.triage = create_triage_classifier()
+        self.single_flight = SingleFlight(enabled=settings.COALESCE_IDENTICAL_REQUESTS)
+        self.consistency_counts = Counter()
     
     def _initialize_gemini(self):
         """Initialize Gemini with API key"""
         try:
-            if settings.GOOGLE_API_KEY:
+            if settings.MODEL_BACKEND == "fake":
+                self.model = FakeGenerativeModel(
+                    model_name=settings.GEMINI_MODEL,
+                    latency_ms=settings.FAKE_MODEL_LATENCY_MS,
+                    jitter_ms=settings.FAKE_MODEL_JITTER_MS,
+                    ms_per_output_token=settings.FAKE_MODEL_MS_PER_OUTPUT_TOKEN
+                )
+                self.api_key_configured = True
+                print("🧪 Fake model backend enabled (no Gemini API calls)")
+            elif settings.GOOGLE_API_KEY:
                 genai.configure(api_key=settings.GOOGLE_API_KEY)
                 self.model = genai.GenerativeModel(model_name=settings.GEMINI_MODEL)
                 self.api_key_configured = True
@@ -36,10 +80,47 @@ class GeminiFaultAnalyzer:
         except Exception as e:
             print(f"❌ Failed to initialize Gemini: {e}")
     
+    def get_model(self, model_name: Optional[str] = None) -> Any:
+        """
+        Model client for a model name, created once and reused
+        
+        The configured GEMINI_MODEL is the default; other names are used by
+        the evaluation harness to compare models on the same backend.
+        """
+        if not model_name or model_name == settings.GEMINI_MODEL:
+            return self.model
+        if not self.api_key_configured:
+            raise ValueError("Google API key not configured")
+        if model_name not in self._models:
+            if settings.MODEL_BACKEND == "fake":
+                self._models[model_name] = FakeGenerativeModel(
+                    model_name=model_name,
+                    latency_ms=settings.FAKE_MODEL_LATENCY_MS,
+                    jitter_ms=settings.FAKE_MODEL_JITTER_MS,
+                    ms_per_output_token=settings.FAKE_MODEL_MS_PER_OUTPUT_TOKEN
+                )
+            else:
+                self._models[model_name] = genai.GenerativeModel(model_name=model_name)
+        return self._models[model_name]
+    
+    def build_prompt(self, variant: Optional[str] = None,
+                     bearing_type: Optional[str] = None,
+                     mounted_on_motor: Optional[bool] = None,
+                     application: Optional[str] = None,
+                     additional_context: Optional[str] = None,
+                     vibration_context: Optional[str] = None) -> str:
+        """Build the prompt for a registered variant (default: PROMPT_VARIANT setting)"""
+        variant = variant or settings.PROMPT_VARIANT
+        if variant not in self.PROMPT_VARIANTS:
+            raise ValueError(f"Unknown prompt variant: {variant}")
+        builder = getattr(self, self.PROMPT_VARIANTS[variant])
+        return builder(bearing_type, mounted_on_motor, application, additional_context, vibration_context)
+    
     def _create_expert_prompt(self, bearing_type: Optional[str] = None, 
                              mounted_on_motor: Optional[bool] = None,
                              application: Optional[str] = None,
-                             additional_context: Optional[str] = None) -> str:
+                             additional_context: Optional[str] = None,
+                             vibration_context: Optional[str] = None) -> str:
         """Create the expert prompt for bearing analysis"""
 
         context_info = ""
@@ -52,6 +133,10 @@ class GeminiFaultAnalyzer:
             context_info += f"\nApplication: {application}"
         if additional_context:
             context_info += f"\nAdditional Context: {additional_context}"
+        if vibration_context:
+            context_info += (f"\nVibration Measurement (same bearing): {vibration_context}"
+                             f"\n(Use it to corroborate or question the visual findings; where the two disagree, "
+                             f"say so and keep the image as the primary evidence.)")
         
         # Electrical erosion logic
         electrical_note = ""
@@ -120,6 +205,103 @@ If a bearing is present, analyze the attached image of a bearing ring (inner or
 """
         return prompt
     
+    def _create_concise_prompt(self, bearing_type: Optional[str] = None,
+                               mounted_on_motor: Optional[bool] = None,
+                               application: Optional[str] = None,
+                               additional_context: Optional[str] = None,
+                               vibration_context: Optional[str] = None) -> str:
+        """Shorter prompt with the same answer layout, for fewer input tokens"""
+        context_lines = []
+        if bearing_type:
+            context_lines.append(f"Bearing type: {bearing_type}")
+        if mounted_on_motor is not None:
+            context_lines.append("Mounted on a motor: consider electrical erosion only if fluting or EDM pits are visible"
+                                 if mounted_on_motor else "Not mounted on a motor: do not consider electrical erosion")
+        if application:
+            context_lines.append(f"Application: {application}")
+        if additional_context:
+            context_lines.append(f"Context: {additional_context}")
+        if vibration_context:
+            context_lines.append(f"Vibration (corroborating evidence only): {vibration_context}")
+        context_info = "\n".join(context_lines)
+        
+        return f"""
+You are a bearing failure analysis expert. If the image does not clearly show a bearing, answer only:
+"No bearing detected or image unclear. Please upload a clear bearing image."
+
+Judge only visible surface evidence.
+{context_info}
+
+Answer in exactly this layout:
+
+🔍 1. Observed Damage:
+- Bullets: damage type, shape, size, location
+
+⚙️ 2. Failure Mode:
+One mechanism (fatigue, abrasion, lubrication failure, contamination, electrical erosion, improper mounting, misalignment, false brinelling, corrosion)
+
+🧠 3. Root Cause Analysis:
+- 1-2 bullets justified by the image
+
+🔢 4. Confidence Score:
+Confidence: XX%
+
+💡 5. Brief Recommendations:
+- Exactly 3 bullets, under 8 words each
+"""
+    
+    def _create_codes_prompt(self, bearing_type: Optional[str] = None,
+                             mounted_on_motor: Optional[bool] = None,
+                             application: Optional[str] = None,
+                             additional_context: Optional[str] = None,
+                             vibration_context: Optional[str] = None) -> str:
+        """Diagnosis codes only, for the fewest output tokens; recommendations are filled in locally"""
+        context_lines = []
+        if bearing_type:
+            context_lines.append(f"Bearing type: {bearing_type}")
+        if mounted_on_motor is not None:
+            context_lines.append("Mounted on a motor: use electrical_erosion only if fluting or EDM pits are visible"
+                                 if mounted_on_motor else "Not mounted on a motor: never use electrical_erosion")
+        if application:
+            context_lines.append(f"Application: {application}")
+        if additional_context:
+            context_lines.append(f"Context: {additional_context}")
+        if vibration_context:
+            context_lines.append(f"Vibration (corroborating evidence only): {vibration_context}")
+        context_info = "\n".join(context_lines)
+        
+        return f"""
+You are a bearing failure analysis expert. If the image does not clearly show a bearing, answer only:
+"No bearing detected or image unclear. Please upload a clear bearing image."
+
+Judge only visible surface evidence.
+{context_info}
+
+{CODES_ONLY_INSTRUCTION}
+Codes: {", ".join(DIAGNOSIS_CODES)}
+
+Answer in exactly this layout and nothing else:
+
+🔍 1. Observed Damage:
+- One line, under 12 words
+
+⚙️ 2. Failure Mode:
+One code
+
+🧠 3. Root Cause Analysis:
+- One code per line, 1-2 lines
+
+🔢 4. Confidence Score:
+Confidence: XX%
+"""
+    
+    def parse_answer(self, response_text: str, variant: Optional[str] = None) -> BearingAnalysisResult:
+        """Parse and normalize a model answer to a variant's prompt (default: PROMPT_VARIANT setting)"""
+        result = normalize_result(self._parse_gemini_response(response_text))
+        if (variant or settings.PROMPT_VARIANT) in self.CODES_ONLY_VARIANTS:
+            expand_codes(result)
+        return result
+    
     def _parse_gemini_response(self, response_text: str) -> BearingAnalysisResult:
         """Parse Gemini response into structured format"""
         try:
@@ -243,6 +425,11 @@ If a bearing is present, analyze the attached image of a bearing ring (inner or
                     rec = rec[:40].rsplit(' ', 1)[0] + "..."
                 final_recommendations.append(rec)
             
+            # The prompt's refusal for non-bearing images has no sections to parse
+            if not observed_damage and not failure_mode and "no bearing detected" in response_text.lower():
+                observed_damage = "No bearing detected or image unclear. Please upload a clear bearing image."
+                failure_mode = "No bearing detected"
+            
             # Debug output
             print(f"\n PARSED RESULTS:")
             print(f"Observed Damage: '{observed_damage}'")
@@ -312,78 +499,402 @@ If a bearing is present, analyze the attached image of a bearing ring (inner or
         
         return line.strip()
     
+    def _error_result(self, error: Exception) -> BearingAnalysisResult:
+        """Build the result returned when an analysis fails"""
+        return normalize_result(BearingAnalysisResult(
+            observed_damage="Analysis failed due to technical error",
+            failure_mode="Unable to determine",
+            root_cause_analysis=["Technical error occurred during analysis"],
+            confidence_score=0.0,
+            technical_notes=f"Error: {str(error)}",
+            recommendations=[
+                "Check system connectivity",
+                "Verify image format and size",
+                "Ensure API key is valid and has sufficient quota"
+            ]
+        ))
+    
+    def _triage(self, image_data: ImageData, start_time: float) -> Optional[AnalysisResponse]:
+        """Answer confidently classified images locally, without a model call"""
+        if not self.triage.enabled:
+            return None
+        
+        try:
+            with stage("triage"):
+                decision = self.triage.classify(open_image(image_data))
+        except Exception as e:
+            print(f"⚠️  Local triage failed, falling back to Gemini: {e}")
+            return None
+        
+        if decision is None or not decision.short_circuit:
+            return None
+        
+        return AnalysisResponse(
+            analysis=normalize_result(decision.to_result()),
+            processing_time=time.time() - start_time,
+            model_used="local-triage",
+            usage=TokenUsage()
+        )
+    
+    def _request_key(self, mode: str, image_data: ImageData, prompt: str) -> str:
+        """Identity of an analysis: image digest plus a fingerprint of everything sent with it"""
+        image_digest = hashlib.sha256(image_data).hexdigest()
+        fingerprint = hashlib.sha256(
+            f"{mode}\0{settings.GEMINI_MODEL}\0{settings.PROMPT_VARIANT}\0{prompt}".encode("utf-8")
+        ).hexdigest()
+        return f"{image_digest}:{fingerprint}"
+    
+    async def _coalesced(self, key: str, analyze) -> AnalysisResponse:
+        """
+        Run an analysis, or join the identical one already in flight
+        
+        Every caller gets its own copy of the response. Only the caller that
+        ran the model call carries its token usage, so usage is not counted
+        twice for one upstream call.
+        """
+        response, shared = await self.single_flight.do(key, analyze)
+        copy = response.model_copy(deep=True)
+        if shared:
+            copy.usage = TokenUsage()
+        return copy
+    
+    async def _generate_analysis(self, image: Image.Image, prompt: str,
+                                 generation_config: Optional[Dict[str, Any]] = None) -> Tuple[BearingAnalysisResult, TokenUsage]:
+        """Send one image and prompt to the model, parse the answer and report token usage"""
+        # Generate analysis using Gemini without blocking the event loop
+        with stage("model_call"):
+            if generation_config is None:
+                response = await self.model.generate_content_async([prompt, image])
+            else:
+                response = await self.model.generate_content_async([prompt, image], generation_config=generation_config)
+        annotate("model_response", response.text)
+        
+        # Parse the response and map the free text onto taxonomy codes
+        with stage("parse"):
+            result = self.parse_answer(response.text)
+        return result, extract_usage(response, [image])
+    
+    @staticmethod
+    def _vote(result: BearingAnalysisResult) -> str:
+        """What samples have to share to agree: the normalized failure mode"""
+        return result.failure_mode_code or result.failure_mode.strip().lower()
+    
+    async def _generate_consistent(self, image: Image.Image,
+                                   prompt: str) -> Tuple[BearingAnalysisResult, TokenUsage, Optional[SelfConsistency]]:
+        """
+        One model call, re-sampled only when the answer is unsure
+        
+        Answers below SELF_CONSISTENCY_THRESHOLD confidence get up to
+        SELF_CONSISTENCY_MAX_SAMPLES - 1 more samples, run concurrently. As
+        soon as two answers share a failure mode the remaining samples are
+        cancelled, and the agreeing answer with the highest confidence is
+        returned. Without agreement the most voted (then most confident)
+        answer is returned with its low agreement.
+        """
+        first, usage = await self._generate_analysis(image, prompt)
+        self.consistency_counts["analyses"] += 1
+        extra_samples = settings.SELF_CONSISTENCY_MAX_SAMPLES - 1
+        if first.confidence_score >= settings.SELF_CONSISTENCY_THRESHOLD or extra_samples < 1:
+            return first, usage, None
+        
+        self.consistency_counts["resampled"] += 1
+        samples = [first]
+        votes = Counter([self._vote(first)])
+        generation_config = {"temperature": settings.SELF_CONSISTENCY_TEMPERATURE}
+        tasks = [
+            asyncio.ensure_future(self._generate_analysis(image, prompt, generation_config))
+            for _ in range(extra_samples)
+        ]
+        try:
+            for next_sample in asyncio.as_completed(tasks):
+                try:
+                    result, sample_usage = await next_sample
+                except Exception as e:
+                    print(f"⚠️  Self-consistency sample failed: {e}")
+                    continue
+                usage.add(sample_usage)
+                samples.append(result)
+                votes[self._vote(result)] += 1
+                if max(votes.values()) >= 2:
+                    break
+        finally:
+            # Samples still in flight once two agree are not needed
+            for task in tasks:
+                task.cancel()
+        
+        self.consistency_counts["extra_calls"] += len(samples) - 1
+        winner = max(votes, key=lambda vote: (votes[vote], max(
+            sample.confidence_score for sample in samples if self._vote(sample) == vote)))
+        if votes[winner] >= 2:
+            self.consistency_counts["agreed"] += 1
+        chosen = max((sample for sample in samples if self._vote(sample) == winner),
+                     key=lambda sample: sample.confidence_score)
+        return chosen, usage, SelfConsistency(
+            samples=len(samples),
+            agreement=round(votes[winner] / len(samples), 3),
+            votes=dict(votes),
+            stopped_early=votes[winner] >= 2 and len(samples) < settings.SELF_CONSISTENCY_MAX_SAMPLES
+        )
+    
+    def consistency_stats(self) -> Dict[str, Any]:
+        """Re-sampling counters, with the model calls spent per analysis"""
+        analyses = self.consistency_counts["analyses"]
+        return {
+            "enabled_by_default": settings.SELF_CONSISTENCY_ENABLED,
+            "threshold": settings.SELF_CONSISTENCY_THRESHOLD,
+            "analyses": analyses,
+            "resampled": self.consistency_counts["resampled"],
+            "agreed": self.consistency_counts["agreed"],
+            "extra_calls": self.consistency_counts["extra_calls"],
+            "calls_per_analysis": round((analyses + self.consistency_counts["extra_calls"]) / analyses, 3) if analyses else None
+        }
+    
     async def analyze_bearing_image(self, 
-                                  image_data: bytes,
+                                  image_data: ImageData,
                                   bearing_type: Optional[str] = None,
                                   mounted_on_motor: Optional[bool] = None,
                                   application: Optional[str] = None,
-                                  additional_context: Optional[str] = None) -> AnalysisResponse:
+                                  additional_context: Optional[str] = None,
+                                  vibration_context: Optional[str] = None,
+                                  self_consistency: Optional[bool] = None) -> AnalysisResponse:
         """
         Analyze bearing image using Gemini AI
         
         Args:
-            image_data: Raw image bytes
+            image_data: Raw image bytes, or a buffer such as a packed archive slice
             bearing_type: Type of bearing (optional)
             mounted_on_motor: Whether bearing is mounted on motor (optional)
             application: Application context (optional)
             additional_context: Additional context (optional)
+            vibration_context: Vibration findings of the same bearing (optional)
+            self_consistency: Re-sample low-confidence answers (default: SELF_CONSISTENCY_ENABLED)
             
         Returns:
             AnalysisResponse with detailed results
-        """
-        start_time = time.time()
         
+        Concurrent calls with the same image and prompt share one model call.
+        """
         if not self.api_key_configured:
             raise ValueError("Google API key not configured")
         
         if not self.model:
             raise ValueError("Gemini model not initialized")
         
+        # Create expert prompt
+        prompt = self.build_prompt(None, bearing_type, mounted_on_motor, application, additional_context,
+                                   vibration_context)
+        if self_consistency is None:
+            self_consistency = settings.SELF_CONSISTENCY_ENABLED
+        return await self._coalesced(
+            self._request_key("consistent" if self_consistency else "single", image_data, prompt),
+            lambda: self._analyze_single(image_data, prompt, self_consistency)
+        )
+    
+    async def _analyze_single(self, image_data: ImageData, prompt: str,
+                              self_consistency: bool = False) -> AnalysisResponse:
+        """Analyze the whole image with one model call"""
+        start_time = time.time()
+        
         try:
-            # Convert bytes to PIL Image
-            image = Image.open(io.BytesIO(image_data))
+            # Obvious non-bearing and undamaged images never reach Gemini
+            triaged = self._triage(image_data, start_time)
+            if triaged is not None:
+                return triaged
             
-            # Create expert prompt
-            prompt = self._create_expert_prompt(bearing_type, mounted_on_motor, application, additional_context)
-            
-            # Generate analysis using Gemini
-            response = self.model.generate_content([prompt, image])
+            # Convert bytes to PIL Image
+            image = open_image(image_data)
             
-            # Parse the response
-            analysis_result = self._parse_gemini_response(response.text)
+            consistency = None
+            if self_consistency:
+                analysis_result, usage, consistency = await self._generate_consistent(image, prompt)
+            else:
+                analysis_result, usage = await self._generate_analysis(image, prompt)
             
             processing_time = time.time() - start_time
             
             return AnalysisResponse(
                 analysis=analysis_result,
                 processing_time=processing_time,
-                model_used=settings.GEMINI_MODEL
+                model_used=settings.GEMINI_MODEL,
+                prompt_variant=settings.PROMPT_VARIANT,
+                usage=usage,
+                self_consistency=consistency
             )
             
         except Exception as e:
             processing_time = time.time() - start_time
             print(f"Error in bearing analysis: {e}")
             
-            # Return error response
-            error_result = BearingAnalysisResult(
-                observed_damage="Analysis failed due to technical error",
-                failure_mode="Unable to determine",
-                root_cause_analysis=["Technical error occurred during analysis"],
-                confidence_score=0.0,
-                technical_notes=f"Error: {str(e)}",
-                recommendations=[
-                    "Check system connectivity",
-                    "Verify image format and size",
-                    "Ensure API key is valid and has sufficient quota"
-                ]
+            return AnalysisResponse(
+                analysis=self._error_result(e),
+                processing_time=processing_time,
+                model_used=settings.GEMINI_MODEL
+            )
+    
+    async def analyze_bearing_image_tiled(self,
+                                          image_data: ImageData,
+                                          bearing_type: Optional[str] = None,
+                                          mounted_on_motor: Optional[bool] = None,
+                                          application: Optional[str] = None,
+                                          additional_context: Optional[str] = None,
+                                          vibration_context: Optional[str] = None) -> AnalysisResponse:
+        """
+        Analyze a high-resolution image tile by tile
+        
+        The image is split into overlapping tiles at full resolution so fine
+        pitting and fluting survive, flat background tiles are skipped, and
+        the remaining tiles are analyzed concurrently. Images that fit in a
+        single tile are analyzed normally.
+        
+        Args:
+            image_data: Raw image bytes, or a buffer such as a packed archive slice
+            bearing_type: Type of bearing (optional)
+            mounted_on_motor: Whether bearing is mounted on motor (optional)
+            application: Application context (optional)
+            additional_context: Additional context (optional)
+            vibration_context: Vibration findings of the same bearing (optional)
+            
+        Returns:
+            AnalysisResponse merging the per-tile findings with location hints
+        
+        Concurrent calls with the same image and prompt share one analysis.
+        """
+        if not self.api_key_configured:
+            raise ValueError("Google API key not configured")
+        
+        if not self.model:
+            raise ValueError("Gemini model not initialized")
+        
+        prompt = self.build_prompt(None, bearing_type, mounted_on_motor, application, additional_context,
+                                   vibration_context)
+        return await self._coalesced(
+            self._request_key("tiled", image_data, prompt),
+            lambda: self._analyze_tiled(image_data, bearing_type, mounted_on_motor, application,
+                                        additional_context, vibration_context)
+        )
+    
+    async def _analyze_tiled(self,
+                             image_data: ImageData,
+                             bearing_type: Optional[str],
+                             mounted_on_motor: Optional[bool],
+                             application: Optional[str],
+                             additional_context: Optional[str],
+                             vibration_context: Optional[str]) -> AnalysisResponse:
+        """Split, select and analyze tiles, then merge their findings"""
+        start_time = time.time()
+        
+        try:
+            # Decoding and tiling a 20 MP upload takes hundreds of milliseconds; keep the event loop free
+            image = await asyncio.to_thread(decode_image, image_data)
+            width, height = image.size
+            if max(width, height) <= settings.TILE_SIZE:
+                return await self.analyze_bearing_image(
+                    image_data, bearing_type, mounted_on_motor, application, additional_context, vibration_context
+                )
+            
+            triaged = self._triage(image_data, start_time)
+            if triaged is not None:
+                return triaged
+            
+            tiles = await asyncio.to_thread(split_into_tiles, image, settings.TILE_SIZE, settings.TILE_OVERLAP)
+            kept, skipped = select_informative_tiles(
+                tiles,
+                min_entropy=settings.TILE_MIN_ENTROPY,
+                min_variance=settings.TILE_MIN_VARIANCE,
+                max_tiles=settings.TILE_MAX_TILES
             )
+            if not kept:
+                return await self.analyze_bearing_image(
+                    image_data, bearing_type, mounted_on_motor, application, additional_context, vibration_context
+                )
+            
+            # Wall-clock time is bounded by the tile concurrency, not the tile count
+            semaphore = asyncio.Semaphore(settings.TILE_CONCURRENCY)
+            
+            async def analyze_tile(tile: ImageTile) -> Tuple[BearingAnalysisResult, TokenUsage]:
+                hint = location_hint(tile, image.size)
+                tile_context = (f"This image is a full-resolution tile covering the {hint} "
+                                f"of a larger bearing photo. Report only damage visible in this tile.")
+                if additional_context:
+                    tile_context = f"{additional_context}\n{tile_context}"
+                prompt = self.build_prompt(None, bearing_type, mounted_on_motor, application, tile_context,
+                                           vibration_context)
+                async with semaphore:
+                    return await self._generate_analysis(tile.image, prompt)
+            
+            results = await asyncio.gather(*(analyze_tile(tile) for tile in kept), return_exceptions=True)
+            
+            tile_results = []
+            usage = TokenUsage()
+            for tile, result in zip(kept, results):
+                if isinstance(result, Exception):
+                    print(f"Error analyzing tile r{tile.row}c{tile.col}: {result}")
+                    continue
+                tile_result, tile_usage = result
+                usage.add(tile_usage)
+                tile_results.append((location_hint(tile, image.size), tile_result))
+            
+            if not tile_results:
+                raise RuntimeError("All tile analyses failed")
+            
+            analysis_result = self._merge_tile_results(tile_results, len(tiles), len(skipped))
             
             return AnalysisResponse(
-                analysis=error_result,
+                analysis=analysis_result,
+                processing_time=time.time() - start_time,
+                model_used=settings.GEMINI_MODEL,
+                prompt_variant=settings.PROMPT_VARIANT,
+                usage=usage
+            )
+            
+        except Exception as e:
+            processing_time = time.time() - start_time
+            print(f"Error in tiled bearing analysis: {e}")
+            
+            return AnalysisResponse(
+                analysis=self._error_result(e),
                 processing_time=processing_time,
                 model_used=settings.GEMINI_MODEL
             )
     
+    def _merge_tile_results(self,
+                            tile_results: List[Tuple[str, BearingAnalysisResult]],
+                            total_tiles: int,
+                            skipped_tiles: int) -> BearingAnalysisResult:
+        """Combine per-tile findings into one result, strongest evidence first"""
+        # Tiles without damage or with failed parsing carry no evidence
+        uninformative = ("no visible damage", "no bearing detected", "unable to determine", "analysis failed")
+        evidence = [(hint, result) for hint, result in tile_results
+                    if result.confidence_score > 0.0
+                    and not any(marker in result.observed_damage.lower() for marker in uninformative)
+                    and not any(marker in result.failure_mode.lower() for marker in uninformative)]
+        ranked = sorted(evidence or tile_results, key=lambda item: item[1].confidence_score, reverse=True)
+        primary_hint, primary = ranked[0]
+        
+        observed_damage = " ".join(f"[{hint}] {result.observed_damage}" for hint, result in ranked[:4])
+        
+        root_causes: List[str] = []
+        recommendations: List[str] = []
+        for _, result in ranked:
+            for cause in result.root_cause_analysis:
+                if cause not in root_causes and len(root_causes) < 2:
+                    root_causes.append(cause)
+            for recommendation in result.recommendations:
+                if recommendation not in recommendations and len(recommendations) < 4:
+                    recommendations.append(recommendation)
+        
+        return normalize_result(BearingAnalysisResult(
+            observed_damage=observed_damage,
+            failure_mode=primary.failure_mode,
+            root_cause_analysis=root_causes or primary.root_cause_analysis,
+            confidence_score=primary.confidence_score,
+            technical_notes=(f"Tiled analysis: {len(tile_results)} of {total_tiles} tiles analyzed "
+                             f"({skipped_tiles} skipped as low-information); "
+                             f"strongest evidence in the {primary_hint}"),
+            recommendations=recommendations or primary.recommendations,
+            location_hints=[hint for hint, _ in ranked[:4]] if evidence else []
+        ))
+    
     def is_ready(self) -> bool:
         """Check if the analyzer is ready for use"""
-        return self.api_key_configured and self.model is not None 
\ No newline at end of file
+        return self.api_key_configured and self.model is not None
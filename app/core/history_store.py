@@ -0,0 +1,571 @@
+"""
+Analysis History Store
+Persists every analysis with its inputs in an indexed SQLite database
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.taxonomy import normalize_fields
+from app.models.fault_models import (
+    AnalysisRecord,
+    AnalysisResponse,
+    BearingAnalysisResult
+)
+
+# Indexes carry failure_mode and confidence_score so the common summaries
+# are answered from the index alone, without touching the table rows
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    image_digest TEXT NOT NULL,
+    bearing_type TEXT,
+    mounted_on_motor INTEGER,
+    application TEXT,
+    model_used TEXT NOT NULL,
+    failure_mode TEXT NOT NULL,
+    confidence_score REAL NOT NULL,
+    processing_time REAL NOT NULL,
+    result_json TEXT NOT NULL,
+    failure_mode_code TEXT,
+    tenant TEXT,
+    asset_id TEXT,
+    created_day TEXT,
+    created_month TEXT
+);
+CREATE TABLE IF NOT EXISTS usage (
+    bucket_start REAL NOT NULL,
+    tenant TEXT NOT NULL,
+    prompt_variant TEXT NOT NULL,
+    model TEXT NOT NULL,
+    requests INTEGER NOT NULL,
+    model_calls INTEGER NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    image_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    PRIMARY KEY (bucket_start, tenant, prompt_variant, model)
+);
+CREATE TABLE IF NOT EXISTS asset_events (
+    analysis_id INTEGER PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    asset_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    failure_mode_code TEXT,
+    confidence_score REAL NOT NULL,
+    damage_extent REAL,
+    damage_score REAL,
+    degradation_index REAL
+);
+CREATE TABLE IF NOT EXISTS asset_trends (
+    tenant TEXT NOT NULL,
+    asset_id TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    state_json TEXT NOT NULL,
+    PRIMARY KEY (tenant, asset_id)
+);
+"""
+
+# Created after migrations, since they may index columns added there
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_analyses_created
+    ON analyses (created_at, failure_mode, confidence_score);
+CREATE INDEX IF NOT EXISTS idx_analyses_type_motor_created
+    ON analyses (bearing_type, mounted_on_motor, created_at, failure_mode, confidence_score);
+CREATE INDEX IF NOT EXISTS idx_analyses_failure_created
+    ON analyses (failure_mode, created_at, confidence_score);
+CREATE INDEX IF NOT EXISTS idx_analyses_digest
+    ON analyses (image_digest);
+CREATE INDEX IF NOT EXISTS idx_analyses_code_created
+    ON analyses (failure_mode_code, created_at, confidence_score);
+CREATE INDEX IF NOT EXISTS idx_analyses_tenant_created
+    ON analyses (tenant, created_at, failure_mode, confidence_score);
+CREATE INDEX IF NOT EXISTS idx_analyses_code_type_created
+    ON analyses (failure_mode_code, bearing_type, created_at, confidence_score);
+CREATE INDEX IF NOT EXISTS idx_analyses_code_month
+    ON analyses (failure_mode_code, created_month, confidence_score);
+CREATE INDEX IF NOT EXISTS idx_analyses_day
+    ON analyses (created_day, created_at, confidence_score);
+CREATE INDEX IF NOT EXISTS idx_analyses_month
+    ON analyses (created_month, created_at, confidence_score);
+CREATE INDEX IF NOT EXISTS idx_analyses_asset_created
+    ON analyses (tenant, asset_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_asset_events_asset_created
+    ON asset_events (tenant, asset_id, created_at);
+"""
+
+# Columns added after the first release: name -> SQL type
+MIGRATIONS = {
+    "failure_mode_code": "TEXT",
+    "tenant": "TEXT",
+    "asset_id": "TEXT",
+    "created_day": "TEXT",
+    "created_month": "TEXT"
+}
+
+# Values of migrated columns for existing rows: name -> SQL expression
+BACKFILLS = {
+    "created_day": "date(created_at, 'unixepoch')",
+    "created_month": "strftime('%Y-%m', created_at, 'unixepoch')"
+}
+
+# Data migrations, run once per database in order; PRAGMA user_version counts
+# those applied. Statements may use :default_tenant.
+DATA_MIGRATIONS = [
+    # Rows from before tenants join the default tenant configured at the time
+    "UPDATE analyses SET tenant = :default_tenant WHERE tenant IS NULL"
+]
+
+# Columns the summary endpoint may group by, mapped to SQL expressions
+GROUP_BY_COLUMNS = {
+    "failure_mode": "failure_mode",
+    "failure_mode_code": "failure_mode_code",
+    "bearing_type": "bearing_type",
+    "mounted_on_motor": "mounted_on_motor",
+    "model_used": "model_used",
+    "tenant": "tenant",
+    "asset_id": "asset_id",
+    "day": "created_day",
+    "month": "created_month"
+}
+
+
+# Fields the usage report may group by, mapped to SQL expressions
+USAGE_GROUP_BY_COLUMNS = {
+    "tenant": "tenant",
+    "prompt_variant": "prompt_variant",
+    "model": "model",
+    "day": "date(bucket_start, 'unixepoch')",
+    "hour": "strftime('%Y-%m-%d %H:00', bucket_start, 'unixepoch')"
+}
+
+
+class AnalysisFilters:
+    """Filter criteria shared by the list, summary and export queries"""
+
+    def __init__(self,
+                 bearing_type: Optional[str] = None,
+                 mounted_on_motor: Optional[bool] = None,
+                 application: Optional[str] = None,
+                 failure_mode: Optional[str] = None,
+                 failure_mode_code: Optional[str] = None,
+                 model_used: Optional[str] = None,
+                 image_digest: Optional[str] = None,
+                 since: Optional[datetime] = None,
+                 until: Optional[datetime] = None,
+                 min_confidence: Optional[float] = None,
+                 tenant: Optional[str] = None,
+                 asset_id: Optional[str] = None):
+        self.bearing_type = bearing_type
+        self.mounted_on_motor = mounted_on_motor
+        self.application = application
+        self.failure_mode = failure_mode
+        self.failure_mode_code = failure_mode_code
+        self.model_used = model_used
+        self.image_digest = image_digest
+        self.since = since
+        self.until = until
+        self.min_confidence = min_confidence
+        self.tenant = tenant
+        self.asset_id = asset_id
+
+    def to_sql(self) -> Tuple[str, List[Any]]:
+        """Build a WHERE clause (without the keyword) and its parameters"""
+        clauses, params = [], []
+        if self.bearing_type is not None:
+            clauses.append("bearing_type = ?")
+            params.append(self.bearing_type)
+        if self.mounted_on_motor is not None:
+            clauses.append("mounted_on_motor = ?")
+            params.append(int(self.mounted_on_motor))
+        if self.application is not None:
+            clauses.append("application = ?")
+            params.append(self.application)
+        if self.failure_mode is not None:
+            clauses.append("failure_mode LIKE ?")
+            params.append(f"%{self.failure_mode}%")
+        if self.failure_mode_code is not None:
+            clauses.append("failure_mode_code = ?")
+            params.append(self.failure_mode_code)
+        if self.model_used is not None:
+            clauses.append("model_used = ?")
+            params.append(self.model_used)
+        if self.image_digest is not None:
+            clauses.append("image_digest = ?")
+            params.append(self.image_digest)
+        if self.since is not None:
+            clauses.append("created_at >= ?")
+            params.append(self.since.timestamp())
+        if self.until is not None:
+            clauses.append("created_at < ?")
+            params.append(self.until.timestamp())
+        if self.min_confidence is not None:
+            clauses.append("confidence_score >= ?")
+            params.append(self.min_confidence)
+        if self.tenant is not None:
+            clauses.append("tenant = ?")
+            params.append(self.tenant)
+        if self.asset_id is not None:
+            clauses.append("asset_id = ?")
+            params.append(self.asset_id)
+        return (" AND ".join(clauses) or "1 = 1"), params
+
+
+def is_failed_result(result: BearingAnalysisResult) -> bool:
+    """Technical failures are not diagnoses and are kept out of the history"""
+    notes = result.technical_notes or ""
+    return result.confidence_score == 0.0 and notes.startswith(("Error:", "Parsing error:"))
+
+
+class AnalysisHistoryStore:
+    """
+    SQLite-backed history of analysis results.
+
+    Writes go through one locked connection; reads use a connection per
+    thread, which WAL mode lets run alongside writes. The async helpers
+    run queries in worker threads so the event loop never waits on disk.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._writer = self._open()
+        self._writer.executescript(SCHEMA)
+        self._migrate()
+        self._writer.executescript(INDEXES)
+        self._writer.commit()
+
+    def _migrate(self):
+        """Add columns missing from databases created by older versions"""
+        existing = {row["name"] for row in self._writer.execute("PRAGMA table_info(analyses)")}
+        for column, column_type in MIGRATIONS.items():
+            if column not in existing:
+                self._writer.execute(f"ALTER TABLE analyses ADD COLUMN {column} {column_type}")
+                if column in BACKFILLS:
+                    self._writer.execute(f"UPDATE analyses SET {column} = {BACKFILLS[column]}")
+                print(f"✅ History store migrated: added {column}")
+        version = self._writer.execute("PRAGMA user_version").fetchone()[0]
+        for number, statement in enumerate(DATA_MIGRATIONS[version:], start=version + 1):
+            with self._writer:
+                self._writer.execute(statement, {"default_tenant": settings.DEFAULT_TENANT})
+                self._writer.execute(f"PRAGMA user_version = {number}")
+            print(f"✅ History store migrated: data version {number}")
+
+    def _open(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _reader(self) -> sqlite3.Connection:
+        """Connection for the calling thread"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._open()
+            self._local.connection = connection
+        return connection
+
+    def record(self,
+               response: AnalysisResponse,
+               image_digest: str,
+               bearing_type: Optional[str] = None,
+               mounted_on_motor: Optional[bool] = None,
+               application: Optional[str] = None,
+               tenant: Optional[str] = None,
+               asset_id: Optional[str] = None) -> Optional[int]:
+        """
+        Store one analysis and return its id
+
+        Failed analyses are skipped and return None.
+        """
+        if is_failed_result(response.analysis):
+            return None
+
+        created_at = response.timestamp.timestamp()
+        # Grouping keys are UTC dates, stored so summaries group on an index
+        created_utc = datetime.fromtimestamp(created_at, timezone.utc)
+        with self._write_lock:
+            cursor = self._writer.execute(
+                """INSERT INTO analyses (created_at, image_digest, bearing_type, mounted_on_motor,
+                   application, model_used, failure_mode, confidence_score, processing_time, result_json,
+                   failure_mode_code, tenant, asset_id, created_day, created_month)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    created_at,
+                    image_digest,
+                    bearing_type,
+                    None if mounted_on_motor is None else int(mounted_on_motor),
+                    application,
+                    response.model_used,
+                    response.analysis.failure_mode,
+                    response.analysis.confidence_score,
+                    response.processing_time,
+                    response.analysis.model_dump_json(),
+                    response.analysis.failure_mode_code,
+                    tenant or settings.DEFAULT_TENANT,
+                    asset_id,
+                    created_utc.strftime("%Y-%m-%d"),
+                    created_utc.strftime("%Y-%m")
+                )
+            )
+            self._writer.commit()
+            return cursor.lastrowid
+
+    async def record_async(self, *args, **kwargs) -> Optional[int]:
+        return await asyncio.to_thread(self.record, *args, **kwargs)
+
+    def _to_record(self, row: sqlite3.Row) -> AnalysisRecord:
+        return AnalysisRecord(
+            id=row["id"],
+            created_at=datetime.fromtimestamp(row["created_at"]),
+            image_digest=row["image_digest"],
+            bearing_type=row["bearing_type"],
+            mounted_on_motor=None if row["mounted_on_motor"] is None else bool(row["mounted_on_motor"]),
+            application=row["application"],
+            tenant=row["tenant"],
+            asset_id=row["asset_id"],
+            model_used=row["model_used"],
+            processing_time=row["processing_time"],
+            analysis=BearingAnalysisResult(**json.loads(row["result_json"]))
+        )
+
+    def get(self, analysis_id: int) -> Optional[AnalysisRecord]:
+        """Fetch one stored analysis"""
+        row = self._reader().execute("SELECT * FROM analyses WHERE id = ?", (analysis_id,)).fetchone()
+        return self._to_record(row) if row else None
+
+    def query(self, filters: AnalysisFilters, limit: int = 50,
+              cursor: Optional[int] = None) -> Tuple[List[AnalysisRecord], Optional[int]]:
+        """
+        List analyses newest first with keyset pagination
+
+        Args:
+            filters: Filter criteria
+            limit: Page size
+            cursor: Return analyses with ids below this (from the previous page)
+
+        Returns:
+            (records, next_cursor); next_cursor is None on the last page
+        """
+        where, params = filters.to_sql()
+        if cursor is not None:
+            where += " AND id < ?"
+            params.append(cursor)
+        rows = self._reader().execute(
+            f"SELECT * FROM analyses WHERE {where} ORDER BY id DESC LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+
+        records = [self._to_record(row) for row in rows[:limit]]
+        next_cursor = records[-1].id if len(rows) > limit else None
+        return records, next_cursor
+
+    def summarize(self, filters: AnalysisFilters, group_by: str = "failure_mode",
+                  limit: int = 100) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Count analyses per group
+
+        Returns:
+            (total matching analyses, groups ordered by count)
+        """
+        if group_by not in GROUP_BY_COLUMNS:
+            raise ValueError(f"Cannot group by {group_by}")
+        column = GROUP_BY_COLUMNS[group_by]
+        where, params = filters.to_sql()
+
+        rows = self._reader().execute(
+            f"""SELECT {column} AS key, COUNT(*) AS count, AVG(confidence_score) AS mean_confidence
+                FROM analyses WHERE {where}
+                GROUP BY key ORDER BY count DESC LIMIT ?""",
+            params + [limit]
+        ).fetchall()
+        total = self._reader().execute(f"SELECT COUNT(*) FROM analyses WHERE {where}", params).fetchone()[0]
+
+        groups = [{
+            "key": None if row["key"] is None else str(row["key"]),
+            "count": row["count"],
+            "mean_confidence": round(row["mean_confidence"], 4)
+        } for row in rows]
+        return total, groups
+
+    def iter_batches(self, filters: AnalysisFilters, batch_size: int = 10000) -> Iterator[List[sqlite3.Row]]:
+        """
+        Yield matching rows oldest first in fixed-size batches
+
+        Uses keyset pagination on the id, so memory stays constant and each
+        batch is an index seek however large the export is. A streaming
+        response may resume the generator on any thread, so it uses its own
+        connection rather than a thread-local one.
+        """
+        where, params = filters.to_sql()
+        last_id = 0
+        connection = self._open()
+        try:
+            while True:
+                rows = connection.execute(
+                    f"SELECT * FROM analyses WHERE {where} AND id > ? ORDER BY id LIMIT ?",
+                    params + [last_id, batch_size]
+                ).fetchall()
+                if not rows:
+                    return
+                yield rows
+                last_id = rows[-1]["id"]
+        finally:
+            connection.close()
+
+    def renormalize(self, batch_size: int = 5000) -> int:
+        """
+        Recompute taxonomy codes of every stored analysis
+
+        Run after the taxonomy changes or to backfill rows stored before
+        codes existed. Works on the raw JSON in batches, one transaction
+        per batch.
+
+        Returns:
+            Number of rows updated
+        """
+        updated = 0
+        for rows in self.iter_batches(AnalysisFilters(), batch_size):
+            changes = []
+            for row in rows:
+                analysis = json.loads(row["result_json"])
+                code, root_cause_codes = normalize_fields(
+                    analysis.get("failure_mode", ""), analysis.get("root_cause_analysis") or []
+                )
+                if code == row["failure_mode_code"] and root_cause_codes == analysis.get("root_cause_codes"):
+                    continue
+                analysis["failure_mode_code"] = code
+                analysis["root_cause_codes"] = root_cause_codes
+                changes.append((code, json.dumps(analysis), row["id"]))
+            if changes:
+                with self._write_lock:
+                    self._writer.executemany(
+                        "UPDATE analyses SET failure_mode_code = ?, result_json = ? WHERE id = ?", changes
+                    )
+                    self._writer.commit()
+                updated += len(changes)
+        return updated
+
+    def add_usage(self, rows: List[Tuple]):
+        """
+        Add usage counters, summing into existing rows
+
+        Args:
+            rows: (bucket_start, tenant, prompt_variant, model, requests,
+                model_calls, prompt_tokens, image_tokens, output_tokens)
+        """
+        with self._write_lock:
+            self._writer.executemany(
+                """INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (bucket_start, tenant, prompt_variant, model) DO UPDATE SET
+                       requests = requests + excluded.requests,
+                       model_calls = model_calls + excluded.model_calls,
+                       prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                       image_tokens = image_tokens + excluded.image_tokens,
+                       output_tokens = output_tokens + excluded.output_tokens""",
+                rows
+            )
+            self._writer.commit()
+
+    def usage_summary(self, group_by: str = "tenant",
+                      since: Optional[datetime] = None,
+                      until: Optional[datetime] = None,
+                      tenant: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Sum stored usage counters per group"""
+        if group_by not in USAGE_GROUP_BY_COLUMNS:
+            raise ValueError(f"Cannot group usage by {group_by}")
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("bucket_start >= ?")
+            params.append(since.timestamp())
+        if until is not None:
+            clauses.append("bucket_start < ?")
+            params.append(until.timestamp())
+        if tenant is not None:
+            clauses.append("tenant = ?")
+            params.append(tenant)
+        where = " AND ".join(clauses) or "1 = 1"
+
+        rows = self._reader().execute(
+            f"""SELECT {USAGE_GROUP_BY_COLUMNS[group_by]} AS key, SUM(requests) AS requests,
+                       SUM(model_calls) AS model_calls, SUM(prompt_tokens) AS prompt_tokens,
+                       SUM(image_tokens) AS image_tokens, SUM(output_tokens) AS output_tokens
+                FROM usage WHERE {where} GROUP BY key""",
+            params
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def record_asset_event(self, event: Tuple, state: Dict[str, Any]):
+        """
+        Append one point to an asset's timeline and save its trend state, in one transaction
+
+        Args:
+            event: (analysis_id, tenant, asset_id, created_at, failure_mode_code,
+                confidence_score, damage_extent, damage_score, degradation_index)
+            state: The asset's trend state after the event (JSON-serializable)
+        """
+        with self._write_lock:
+            self._writer.execute("INSERT OR REPLACE INTO asset_events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", event)
+            self._writer.execute(
+                "INSERT OR REPLACE INTO asset_trends VALUES (?, ?, ?, ?)",
+                (state["tenant"], state["asset_id"], time.time(), json.dumps(state))
+            )
+            self._writer.commit()
+
+    def replace_asset_trends(self, events: List[Tuple], states: List[Dict[str, Any]]):
+        """Replace every asset timeline and trend state, e.g. after replaying the history"""
+        now = time.time()
+        with self._write_lock:
+            self._writer.execute("DELETE FROM asset_events")
+            self._writer.execute("DELETE FROM asset_trends")
+            self._writer.executemany("INSERT INTO asset_events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", events)
+            self._writer.executemany(
+                "INSERT INTO asset_trends VALUES (?, ?, ?, ?)",
+                [(state["tenant"], state["asset_id"], now, json.dumps(state)) for state in states]
+            )
+            self._writer.commit()
+
+    def asset_trend_states(self) -> List[Dict[str, Any]]:
+        """Saved trend state of every asset"""
+        rows = self._reader().execute("SELECT state_json FROM asset_trends").fetchall()
+        return [json.loads(row["state_json"]) for row in rows]
+
+    def asset_events(self, tenant: str, asset_id: str, limit: int = 100) -> List[sqlite3.Row]:
+        """Latest timeline points of one asset, oldest first"""
+        rows = self._reader().execute(
+            """SELECT * FROM asset_events WHERE tenant = ? AND asset_id = ?
+               ORDER BY created_at DESC, analysis_id DESC LIMIT ?""",
+            (tenant, asset_id, limit)
+        ).fetchall()
+        return rows[::-1]
+
+    async def get_async(self, *args, **kwargs):
+        return await asyncio.to_thread(self.get, *args, **kwargs)
+
+    async def query_async(self, *args, **kwargs):
+        return await asyncio.to_thread(self.query, *args, **kwargs)
+
+    async def summarize_async(self, *args, **kwargs):
+        return await asyncio.to_thread(self.summarize, *args, **kwargs)
+
+
+def create_history_store() -> Optional[AnalysisHistoryStore]:
+    """Open the history store from settings; None when history is disabled"""
+    if not settings.HISTORY_ENABLED:
+        return None
+    try:
+        return AnalysisHistoryStore(settings.HISTORY_DB_PATH)
+    except Exception as e:
+        print(f"⚠️  Failed to open analysis history store: {e}")
+        return None
@@ -0,0 +1,272 @@
+"""
+Packed Image Archive
+Append-only data file of images with a sorted digest index, read through a memory map
+
+An archive ``images.pack`` is three files:
+
+    images.pack             MAGIC, then the image files back to back
+    images.pack.journal     one JSON line per image: digest, offset, length and
+                            its metadata (path, label, bearing_type, ...)
+    images.pack.idx         NumPy array of (key, digest, offset, length, record)
+                            sorted by digest, written when the writer closes
+
+Bulk runs open three files instead of one per image, and the reader hands
+out ``memoryview`` slices of the mapped data file that PIL decodes in place.
+The journal is written after each image's bytes, so the index can always
+be rebuilt from it and a writer reopened after a crash cuts both files
+back to the last complete journal line.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+MAGIC = b"BRGPACK\x01"
+
+INDEX_DTYPE = np.dtype([
+    ("key", "<u8"),           # First 8 digest bytes, big-endian: sorts like the digest
+    ("digest", "u1", (32,)),
+    ("offset", "<u8"),
+    ("length", "<u8"),
+    ("record", "<u4")         # Line of the image's entry in the journal
+])
+
+
+def archive_paths(path: Union[str, Path]) -> Tuple[Path, Path, Path]:
+    """(data, journal, index) files of an archive"""
+    path = Path(path)
+    return path, path.with_name(path.name + ".journal"), path.with_name(path.name + ".idx")
+
+
+def _scan_journal(path: Path) -> Tuple[List[Dict[str, Any]], int]:
+    """Complete journal entries in write order, and the bytes they take up"""
+    entries: List[Dict[str, Any]] = []
+    end = 0
+    if not path.exists():
+        return entries, end
+    with open(path, "rb") as handle:
+        for line in handle:
+            # A line without its newline was cut short by a crash
+            if not line.endswith(b"\n"):
+                break
+            try:
+                entries.append(json.loads(line))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                break
+            end += len(line)
+    return entries, end
+
+
+def _read_journal(path: Path) -> List[Dict[str, Any]]:
+    """Journal entries in write order, ignoring a last line cut short by a crash"""
+    return _scan_journal(path)[0]
+
+
+def build_index(entries: List[Dict[str, Any]]) -> np.ndarray:
+    """Index of journal entries, sorted by digest"""
+    index = np.zeros(len(entries), dtype=INDEX_DTYPE)
+    if entries:
+        digests = np.frombuffer(b"".join(bytes.fromhex(entry["digest"]) for entry in entries),
+                                dtype=np.uint8).reshape(-1, 32)
+        index["digest"] = digests
+        index["key"] = digests[:, :8].copy().view(">u8").ravel()
+        index["offset"] = [entry["offset"] for entry in entries]
+        index["length"] = [entry["length"] for entry in entries]
+        index["record"] = np.arange(len(entries))
+    return np.sort(index, order=["key", "offset"])
+
+
+class ArchiveWriter:
+    """
+    Appends images to an archive, skipping images it already holds.
+
+    Reopening an existing archive appends to it. Use as a context manager,
+    or call ``close`` to write the index.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path, self.journal_path, self.index_path = archive_paths(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        entries, journal_end = _scan_journal(self.journal_path)
+        self._digests: Set[str] = {entry["digest"] for entry in entries}
+        self.added = 0
+        self.duplicates = 0
+
+        if not self.path.exists() or self.path.stat().st_size < len(MAGIC):
+            with open(self.path, "wb") as handle:
+                handle.write(MAGIC)
+        # Bytes past the last journaled image belong to an interrupted write
+        end = max((entry["offset"] + entry["length"] for entry in entries), default=len(MAGIC))
+        self._data = open(self.path, "r+b")
+        if self._data.read(len(MAGIC)) != MAGIC:
+            self._data.close()
+            raise ValueError(f"{self.path} is not an image archive")
+        self._data.truncate(end)
+        self._data.seek(end)
+        # Likewise a torn journal line: appending after it would merge it with the next entry
+        if self.journal_path.exists() and self.journal_path.stat().st_size > journal_end:
+            with open(self.journal_path, "r+b") as handle:
+                handle.truncate(journal_end)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._digests
+
+    def add(self, data: bytes, metadata: Optional[Dict[str, Any]] = None,
+            digest: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Append one image file
+
+        Args:
+            data: The image file's bytes, stored as they are
+            metadata: JSON-serializable values kept with the image, e.g. path,
+                label, bearing_type, mounted_on_motor
+            digest: SHA-256 of data when already known
+
+        Returns:
+            (digest, whether the image was added rather than already present)
+        """
+        digest = digest or hashlib.sha256(data).hexdigest()
+        if digest in self._digests:
+            self.duplicates += 1
+            return digest, False
+        offset = self._data.tell()
+        self._data.write(data)
+        self._data.flush()
+        self._journal.write(json.dumps({"digest": digest, "offset": offset, "length": len(data),
+                                        **(metadata or {})}) + "\n")
+        self._journal.flush()
+        self._digests.add(digest)
+        self.added += 1
+        return digest, True
+
+    def close(self):
+        """Finish the data file and write the sorted index next to it"""
+        if self._data.closed:
+            return
+        self._data.close()
+        self._journal.close()
+        index = build_index(_read_journal(self.journal_path))
+        temporary = self.index_path.with_name(self.index_path.name + ".tmp")
+        with open(temporary, "wb") as handle:
+            np.save(handle, index)
+        os.replace(temporary, self.index_path)
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ImageArchive:
+    """
+    Memory-mapped reader of an archive.
+
+    ``get`` is a binary search of the index and returns a ``memoryview`` into
+    the mapping: no file is opened and no bytes are copied per image. Views
+    must be released (or dropped) before ``close``. The journal, with the
+    metadata, is only read on the first ``metadata`` call.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path, self.journal_path, self.index_path = archive_paths(path)
+        with open(self.path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError(f"{self.path} is not an image archive")
+        self._view = memoryview(self._map)
+        self._entries: Optional[List[Dict[str, Any]]] = None
+
+        if self.index_path.exists() and self.index_path.stat().st_mtime_ns >= self.journal_path.stat().st_mtime_ns:
+            self.index = np.load(self.index_path)
+        else:
+            # The writer was interrupted (or is still open) before writing the index
+            self.index = build_index(self._journal())
+        # Plain columns: per-lookup field access on the structured array costs more than the search
+        self._keys = np.ascontiguousarray(self.index["key"])
+        self._digests = self.index["digest"].tobytes()
+        self._offsets = np.ascontiguousarray(self.index["offset"])
+        self._lengths = np.ascontiguousarray(self.index["length"])
+
+    def _journal(self) -> List[Dict[str, Any]]:
+        if self._entries is None:
+            self._entries = _read_journal(self.journal_path)
+        return self._entries
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, digest: str) -> bool:
+        return self._find(digest) is not None
+
+    def _find(self, digest: str) -> Optional[int]:
+        """Index row of a digest"""
+        try:
+            raw = bytes.fromhex(digest)
+        except ValueError:
+            return None
+        if len(raw) != 32:
+            return None
+        key = np.uint64(int.from_bytes(raw[:8], "big"))
+        row = int(self._keys.searchsorted(key))
+        # Rows sharing the 8-byte key are adjacent; practically there is one
+        while row < len(self._keys) and self._keys[row] == key:
+            if self._digests[row * 32:row * 32 + 32] == raw:
+                return row
+            row += 1
+        return None
+
+    def _slice(self, row: int) -> memoryview:
+        offset = int(self._offsets[row])
+        return self._view[offset:offset + int(self._lengths[row])]
+
+    def get(self, digest: str) -> Optional[memoryview]:
+        """The stored image file, or None if the archive does not hold it"""
+        row = self._find(digest)
+        return None if row is None else self._slice(row)
+
+    def metadata(self, digest: str) -> Dict[str, Any]:
+        """Metadata stored with an image (empty if unknown)"""
+        row = self._find(digest)
+        if row is None:
+            return {}
+        entry = dict(self._journal()[int(self.index["record"][row])])
+        for field in ("digest", "offset", "length"):
+            entry.pop(field)
+        return entry
+
+    def _digest(self, row: int) -> str:
+        return self._digests[row * 32:row * 32 + 32].hex()
+
+    def digests(self) -> List[str]:
+        """Digests of every image, in the order they were added"""
+        return [self._digest(row) for row in np.argsort(self._offsets, kind="stable").tolist()]
+
+    def records(self) -> Iterator[Tuple[str, memoryview]]:
+        """(digest, image) pairs in file order, for sequential scans"""
+        for row in np.argsort(self._offsets, kind="stable").tolist():
+            yield self._digest(row), self._slice(row)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "images": len(self),
+            "bytes": int(self._lengths.sum()),
+            "file_bytes": len(self._map)
+        }
+
+    def close(self):
+        self._view.release()
+        self._map.close()
+
+    def __enter__(self) -> "ImageArchive":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,154 @@
+"""
+Image Pipeline for Bearing Analysis
+Decoding and high-resolution tiling in front of the Gemini analyzer
+"""
+
+import io
+from typing import List, NamedTuple, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+# Raw image bytes, or a buffer such as a memoryview into a packed image archive
+ImageData = Union[bytes, memoryview]
+
+
+class ImageTile(NamedTuple):
+    """One crop of a larger image"""
+    row: int
+    col: int
+    box: Tuple[int, int, int, int]  # (left, upper, right, lower) in source pixels
+    image: Image.Image
+    entropy: float
+    variance: float
+
+
+class BufferReader(io.RawIOBase):
+    """
+    Read-only raw file object over a buffer.
+
+    Unlike ``io.BytesIO``, which copies anything but ``bytes``, it reads
+    straight from the buffer, so PIL decodes a memory-mapped image without a
+    copy of the whole file. Wrap it in ``io.BufferedReader``: PIL parses
+    headers with many tiny reads.
+    """
+
+    def __init__(self, buffer: ImageData):
+        self._view = memoryview(buffer).cast("B")
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        chunk = self._view[self._position:self._position + len(target)]
+        target[:len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._view)}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+
+def open_image(image_data: ImageData) -> Image.Image:
+    """Open an image lazily from bytes or a buffer, without copying the buffer"""
+    if isinstance(image_data, bytes):
+        return Image.open(io.BytesIO(image_data))
+    return Image.open(io.BufferedReader(BufferReader(image_data)))
+
+
+def decode_image(image_data: ImageData) -> Image.Image:
+    """Decode raw upload bytes (or a buffer) into a PIL image"""
+    image = open_image(image_data)
+    image.load()
+    return image
+
+
+def _tile_starts(length: int, tile_size: int, stride: int) -> List[int]:
+    """Start offsets that cover the full length, the last tile flush with the edge"""
+    if length <= tile_size:
+        return [0]
+    starts = list(range(0, length - tile_size, stride))
+    starts.append(length - tile_size)
+    return starts
+
+
+def grayscale_entropy(pixels: np.ndarray) -> float:
+    """Shannon entropy (bits) of an 8-bit grayscale array"""
+    histogram = np.bincount(pixels.ravel(), minlength=256).astype(np.float64)
+    probabilities = histogram[histogram > 0] / pixels.size
+    return float(-(probabilities * np.log2(probabilities)).sum())
+
+
+def split_into_tiles(image: Image.Image, tile_size: int = 1024, overlap: int = 128) -> List[ImageTile]:
+    """
+    Split an image into overlapping square tiles
+
+    Args:
+        image: Source image at full resolution
+        tile_size: Tile edge length in pixels
+        overlap: Pixels shared by neighbouring tiles, so damage on a seam
+            appears whole in at least one tile
+
+    Returns:
+        Tiles in row-major order with their entropy and variance
+    """
+    stride = max(1, tile_size - overlap)
+    width, height = image.size
+    gray = np.asarray(image.convert("L"))
+    rgb = image.convert("RGB")
+
+    tiles = []
+    for row, top in enumerate(_tile_starts(height, tile_size, stride)):
+        for col, left in enumerate(_tile_starts(width, tile_size, stride)):
+            box = (left, top, min(left + tile_size, width), min(top + tile_size, height))
+            pixels = gray[box[1]:box[3], box[0]:box[2]]
+            tiles.append(ImageTile(
+                row=row,
+                col=col,
+                box=box,
+                image=rgb.crop(box),
+                entropy=grayscale_entropy(pixels),
+                variance=float(pixels.var())
+            ))
+    return tiles
+
+
+def select_informative_tiles(tiles: List[ImageTile],
+                             min_entropy: float = 3.0,
+                             min_variance: float = 25.0,
+                             max_tiles: int = 24) -> Tuple[List[ImageTile], List[ImageTile]]:
+    """
+    Drop flat background tiles and keep the most detailed ones
+
+    Returns:
+        (kept, skipped) tiles; kept tiles are ordered by entropy, highest first
+    """
+    informative = [tile for tile in tiles
+                   if tile.entropy >= min_entropy and tile.variance >= min_variance]
+    informative.sort(key=lambda tile: tile.entropy, reverse=True)
+    kept = informative[:max_tiles]
+    kept_boxes = {tile.box for tile in kept}
+    skipped = [tile for tile in tiles if tile.box not in kept_boxes]
+    return kept, skipped
+
+
+def location_hint(tile: ImageTile, image_size: Tuple[int, int]) -> str:
+    """Describe where a tile sits in the source image"""
+    width, height = image_size
+    left, top, right, lower = tile.box
+    center_x = (left + right) / 2 / width
+    center_y = (top + lower) / 2 / height
+
+    vertical = "upper" if center_y < 1 / 3 else "lower" if center_y > 2 / 3 else "middle"
+    horizontal = "left" if center_x < 1 / 3 else "right" if center_x > 2 / 3 else "center"
+    region = "center" if vertical == "middle" and horizontal == "center" else f"{vertical}-{horizontal}"
+    return f"{region} region (x {left}-{right}, y {top}-{lower})"
@@ -0,0 +1,122 @@
+"""
+Asynchronous Analysis Job Manager
+Runs submitted analyses in the background so clients can poll for results
+"""
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.models.fault_models import AnalysisResponse, JobInfo, JobStatus
+
+
+class JobManager:
+    """In-memory registry of background analysis jobs"""
+
+    def __init__(self, result_ttl: int = 3600, max_retained: int = 10000):
+        self.result_ttl = result_ttl
+        self.max_retained = max_retained
+        self._jobs: "OrderedDict[str, JobInfo]" = OrderedDict()
+        self._finished_at: Dict[str, float] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def submit(self,
+               run: Callable[[JobInfo], Awaitable[AnalysisResponse]],
+               filename: Optional[str] = None,
+               batch_id: Optional[str] = None,
+               tenant: Optional[str] = None,
+               callback_url: Optional[str] = None,
+               on_finished: Optional[Callable[[JobInfo], Awaitable[None]]] = None) -> JobInfo:
+        """
+        Register a job and start running it in the background
+
+        Args:
+            run: Coroutine factory that performs the analysis; it receives the
+                job and marks it running once a model slot is granted
+            filename: Original upload name, echoed back to the client
+            batch_id: Batch the job belongs to (a new one is created if omitted)
+            tenant: Tenant that submitted the job
+            callback_url: URL notified when the job finishes, echoed back
+            on_finished: Coroutine called with the job once it completed or failed
+
+        Returns:
+            JobInfo in the queued state
+        """
+        self._evict()
+
+        job = JobInfo(
+            job_id=uuid.uuid4().hex,
+            batch_id=batch_id or uuid.uuid4().hex,
+            filename=filename,
+            tenant=tenant,
+            callback_url=callback_url
+        )
+        self._jobs[job.job_id] = job
+
+        task = asyncio.create_task(self._run(job, run, on_finished))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: JobInfo, run: Callable[[JobInfo], Awaitable[AnalysisResponse]],
+                   on_finished: Optional[Callable[[JobInfo], Awaitable[None]]] = None):
+        """Execute a job and record its outcome"""
+        try:
+            job.result = await run(job)
+            job.status = JobStatus.COMPLETED
+        except Exception as e:
+            job.error = str(e)
+            job.status = JobStatus.FAILED
+        finally:
+            job.completed_at = datetime.now()
+            self._finished_at[job.job_id] = time.monotonic()
+
+        if on_finished is not None:
+            try:
+                await on_finished(job)
+            except Exception as e:
+                print(f"⚠️  Job {job.job_id} completion hook failed: {e}")
+
+    def _evict(self):
+        """Drop expired results and keep the registry bounded"""
+        now = time.monotonic()
+        expired = [job_id for job_id, finished in self._finished_at.items()
+                   if now - finished > self.result_ttl]
+        for job_id in expired:
+            self._jobs.pop(job_id, None)
+            self._finished_at.pop(job_id, None)
+
+        # Oldest finished jobs go first; running jobs are never dropped
+        while len(self._jobs) >= self.max_retained and self._finished_at:
+            oldest = next((job_id for job_id in self._jobs if job_id in self._finished_at), None)
+            if oldest is None:
+                break
+            self._jobs.pop(oldest, None)
+            self._finished_at.pop(oldest, None)
+
+    def get(self, job_id: str) -> Optional[JobInfo]:
+        """Look up a job by id"""
+        return self._jobs.get(job_id)
+
+    def get_batch(self, batch_id: str) -> List[JobInfo]:
+        """List the jobs submitted together under one batch id"""
+        return [job for job in self._jobs.values() if job.batch_id == batch_id]
+
+    def stats(self) -> Dict[str, int]:
+        """Count retained jobs by status"""
+        counts = {status.value: 0 for status in JobStatus}
+        for job in self._jobs.values():
+            counts[job.status.value] += 1
+        return counts
+
+
+def create_job_manager() -> JobManager:
+    """Build the job manager from application settings"""
+    return JobManager(
+        result_ttl=settings.JOB_RESULT_TTL_SECONDS,
+        max_retained=settings.JOB_MAX_RETAINED
+    )
@@ -0,0 +1,172 @@
+"""
+Priority Scheduler for Bearing Analysis Requests
+Weighted-fair admission control in front of the Gemini model call
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Deque, Optional, Any, Tuple
+
+from app.core.config import settings
+from app.models.fault_models import RequestPriority
+
+
+class SchedulerOverloaded(Exception):
+    """Raised when a request is shed because its lane queue is full"""
+
+    def __init__(self, priority: RequestPriority, queued: int):
+        self.priority = priority
+        self.queued = queued
+        super().__init__(f"{priority.value} queue is full ({queued} waiting)")
+
+
+class PriorityScheduler:
+    """
+    Admits analysis requests into a fixed number of model slots.
+
+    Interactive and batch traffic wait in separate lanes. When a slot frees up
+    the next lane is chosen by stride scheduling on the lane weights, batch
+    traffic can never occupy the slots reserved for interactive requests, and
+    batch requests are shed once their queue passes its limit.
+    """
+
+    def __init__(self,
+                 max_concurrent: int = 8,
+                 interactive_reserved: int = 2,
+                 weights: Optional[Dict[RequestPriority, int]] = None,
+                 queue_limits: Optional[Dict[RequestPriority, int]] = None):
+        self.max_concurrent = max(1, max_concurrent)
+        self.interactive_reserved = min(max(0, interactive_reserved), self.max_concurrent - 1)
+        self.weights = weights or {RequestPriority.INTERACTIVE: 4, RequestPriority.BATCH: 1}
+        self.queue_limits = queue_limits or {RequestPriority.INTERACTIVE: 100, RequestPriority.BATCH: 32}
+
+        self._active: Dict[RequestPriority, int] = {lane: 0 for lane in RequestPriority}
+        self._waiters: Dict[RequestPriority, Deque[Tuple[asyncio.Future, float]]] = {
+            lane: deque() for lane in RequestPriority
+        }
+        self._pass: Dict[RequestPriority, float] = {lane: 0.0 for lane in RequestPriority}
+        self._virtual_time = 0.0
+
+        self._admitted: Dict[RequestPriority, int] = {lane: 0 for lane in RequestPriority}
+        self._shed: Dict[RequestPriority, int] = {lane: 0 for lane in RequestPriority}
+        self._wait_times: Dict[RequestPriority, Deque[float]] = {lane: deque(maxlen=1000) for lane in RequestPriority}
+
+    def _can_start(self, lane: RequestPriority) -> bool:
+        """Check whether a request in this lane may take a slot right now"""
+        if sum(self._active.values()) >= self.max_concurrent:
+            return False
+        if lane == RequestPriority.BATCH:
+            return self._active[lane] < self.max_concurrent - self.interactive_reserved
+        return True
+
+    def _start(self, lane: RequestPriority, waited: float):
+        """Account for a request entering a slot"""
+        self._virtual_time = self._pass[lane]
+        self._pass[lane] += 1.0 / max(1, self.weights.get(lane, 1))
+        self._active[lane] += 1
+        self._admitted[lane] += 1
+        self._wait_times[lane].append(waited)
+
+    def _dispatch(self):
+        """Hand free slots to waiting requests in weighted-fair order"""
+        while True:
+            candidates = [lane for lane in RequestPriority
+                          if self._waiters[lane] and self._can_start(lane)]
+            if not candidates:
+                return
+
+            lane = min(candidates, key=lambda candidate: self._pass[candidate])
+            future, enqueued_at = self._waiters[lane].popleft()
+            if future.done():
+                # Waiter was cancelled while queued
+                continue
+
+            self._start(lane, time.monotonic() - enqueued_at)
+            future.set_result(None)
+
+    async def acquire(self, priority: RequestPriority):
+        """Wait for a model slot in the given priority lane"""
+        if not self._waiters[priority] and self._can_start(priority):
+            self._pass[priority] = max(self._pass[priority], self._virtual_time)
+            self._start(priority, 0.0)
+            return
+
+        queued = len(self._waiters[priority])
+        if queued >= self.queue_limits.get(priority, 0):
+            self._shed[priority] += 1
+            raise SchedulerOverloaded(priority, queued)
+
+        if not queued:
+            # A lane returning from idle must not bank credit from its quiet period
+            self._pass[priority] = max(self._pass[priority], self._virtual_time)
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (future, time.monotonic())
+        self._waiters[priority].append(entry)
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was granted just before cancellation, give it back
+                self.release(priority)
+            else:
+                try:
+                    self._waiters[priority].remove(entry)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self, priority: RequestPriority):
+        """Return a model slot and wake the next waiter"""
+        self._active[priority] = max(0, self._active[priority] - 1)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: RequestPriority):
+        """Hold a model slot for the duration of the block"""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get per-lane queue depth, admissions, shedding and wait times"""
+        lanes = {}
+        for lane in RequestPriority:
+            waits = sorted(self._wait_times[lane])
+            p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0
+            lanes[lane.value] = {
+                "active": self._active[lane],
+                "queued": len(self._waiters[lane]),
+                "admitted": self._admitted[lane],
+                "shed": self._shed[lane],
+                "queue_limit": self.queue_limits.get(lane, 0),
+                "weight": self.weights.get(lane, 1),
+                "wait_p95_seconds": round(p95, 4)
+            }
+
+        return {
+            "max_concurrent": self.max_concurrent,
+            "interactive_reserved": self.interactive_reserved,
+            "lanes": lanes
+        }
+
+
+def create_scheduler() -> PriorityScheduler:
+    """Build the scheduler from application settings"""
+    return PriorityScheduler(
+        max_concurrent=settings.MAX_CONCURRENT_ANALYSES,
+        interactive_reserved=settings.INTERACTIVE_RESERVED_SLOTS,
+        weights={
+            RequestPriority.INTERACTIVE: settings.INTERACTIVE_WEIGHT,
+            RequestPriority.BATCH: settings.BATCH_WEIGHT
+        },
+        queue_limits={
+            RequestPriority.INTERACTIVE: settings.INTERACTIVE_QUEUE_LIMIT,
+            RequestPriority.BATCH: settings.BATCH_QUEUE_LIMIT
+        }
+    )
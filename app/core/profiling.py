@@ -0,0 +1,266 @@
+"""
+Profiling and Slow-Request Capture
+Time-boxed sampling profiles of the running server and per-stage timings of slow requests
+"""
+
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+# Path prefixes stripped from frame file names, longest first
+_PATH_PREFIXES = sorted({os.getcwd() + os.sep, *(path + os.sep for path in sys.path if path)}, key=len, reverse=True)
+
+Frame = Tuple[str, str, int]  # (function, file, first line)
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another one is running"""
+
+
+def _short_path(filename: str) -> str:
+    for prefix in _PATH_PREFIXES:
+        if filename.startswith(prefix):
+            return filename[len(prefix):]
+    return filename
+
+
+class Profile:
+    """Aggregated samples of one profiling run: call stacks per thread with their counts"""
+
+    def __init__(self, frames: List[Frame], stacks: Counter, thread_names: Dict[int, str],
+                 duration: float, interval: float):
+        self.frames = frames
+        self.stacks = stacks  # (thread ident, frame indices root -> leaf) -> samples
+        self.thread_names = thread_names
+        self.duration = duration
+        self.interval = interval
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def _thread_name(self, ident: int) -> str:
+        return self.thread_names.get(ident, f"thread-{ident}")
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed stacks ("thread;outer;...;inner count"), for flamegraph.pl or speedscope"""
+        names = [f"{function} ({path}:{line})".replace(";", ":") for function, path, line in self.frames]
+        lines = [
+            ";".join([self._thread_name(ident).replace(";", ":")] + [names[index] for index in stack]) + f" {count}"
+            for (ident, stack), count in self.stacks.most_common()
+        ]
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str = "bearing-fault-api") -> Dict[str, Any]:
+        """speedscope file format: one sampled profile per thread, weights in seconds"""
+        per_thread: Dict[int, List[Tuple[Tuple[int, ...], int]]] = {}
+        for (ident, stack), count in self.stacks.items():
+            per_thread.setdefault(ident, []).append((stack, count))
+        profiles = []
+        for ident, entries in sorted(per_thread.items(), key=lambda item: -sum(count for _, count in item[1])):
+            profiles.append({
+                "type": "sampled",
+                "name": self._thread_name(ident),
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(sum(count for _, count in entries) * self.interval, 6),
+                "samples": [list(stack) for stack, _ in entries],
+                "weights": [round(count * self.interval, 6) for _, count in entries]
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "bearing-fault-api",
+            "activeProfileIndex": 0,
+            "shared": {"frames": [{"name": function, "file": path, "line": line}
+                                  for function, path, line in self.frames]},
+            "profiles": profiles
+        }
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler of every Python thread in the process.
+
+    A background thread reads ``sys._current_frames()`` at a fixed interval
+    and counts identical stacks; nothing is instrumented, so the server runs
+    at full speed outside the samples. One profile runs at a time.
+    """
+
+    def __init__(self, max_seconds: float = 60.0):
+        self.max_seconds = max_seconds
+        self._running = threading.Lock()
+        self.profiles_taken = 0
+
+    def profile(self, seconds: float, interval: float = 0.005) -> Profile:
+        """Sample for up to max_seconds (blocking; run it in a worker thread)"""
+        if not self._running.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            return self._sample(min(seconds, self.max_seconds), interval)
+        finally:
+            self._running.release()
+
+    def _sample(self, seconds: float, interval: float) -> Profile:
+        me = threading.get_ident()
+        frames: List[Frame] = []
+        frame_index: Dict[Any, int] = {}
+        stacks: Counter = Counter()
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+        start = time.perf_counter()
+        deadline = start + seconds
+        next_tick = start
+        while True:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    index = frame_index.get(code)
+                    if index is None:
+                        index = frame_index[code] = len(frames)
+                        frames.append((code.co_name, _short_path(code.co_filename), code.co_firstlineno))
+                    stack.append(index)
+                    frame = frame.f_back
+                stack.reverse()
+                stacks[(ident, tuple(stack))] += 1
+            next_tick += interval
+            now = time.perf_counter()
+            if next_tick >= deadline:
+                break
+            if next_tick > now:
+                time.sleep(next_tick - now)
+            else:
+                # Fell behind (GIL held elsewhere): skip the missed ticks
+                next_tick = now
+
+        # Threads started during the run
+        thread_names.update({thread.ident: thread.name for thread in threading.enumerate()})
+        self.profiles_taken += 1
+        return Profile(frames, stacks, thread_names, time.perf_counter() - start, interval)
+
+
+class RequestTrace:
+    """Stage timings and notes of one request, collected while it runs"""
+
+    def __init__(self, method: str, path: str, max_chars: int = 0):
+        self.method = method
+        self.path = path
+        self.max_chars = max_chars
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.stages: List[Tuple[str, float, float]] = []  # (name, start offset, duration) in seconds
+        self.notes: Dict[str, List[str]] = {}
+        self.closed = False
+
+
+_current_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar("request_trace", default=None)
+
+
+def record_stage(name: str, started: float):
+    """Record a stage of the current request that began at perf_counter() value started"""
+    trace = _current_trace.get()
+    if trace is not None and not trace.closed:
+        trace.stages.append((name, started - trace.start, time.perf_counter() - started))
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the enclosed block as a stage of the current request (no-op outside requests)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, started)
+
+
+def annotate(key: str, text: str):
+    """Attach text to the current request's capture, e.g. the raw model response"""
+    trace = _current_trace.get()
+    if trace is not None and not trace.closed and trace.max_chars > 0:
+        truncated = text if len(text) <= trace.max_chars else text[:trace.max_chars] + "…[truncated]"
+        trace.notes.setdefault(key, []).append(truncated)
+
+
+class SlowRequestLog:
+    """
+    Ring buffer of requests slower than a threshold.
+
+    Every request gets a trace in a context variable, so analyzer code marks
+    stages without passing anything around; tasks spawned by the request
+    share it. Only traces over the threshold are kept, newest last, and the
+    oldest drop out once the buffer is full.
+    """
+
+    def __init__(self, threshold_ms: float, capacity: int = 200, max_chars: int = 0):
+        self.threshold_ms = threshold_ms
+        self.max_chars = max_chars
+        self.captures: deque = deque(maxlen=capacity)
+        self.counts = Counter()
+
+    def start(self, method: str, path: str) -> Tuple[RequestTrace, contextvars.Token]:
+        trace = RequestTrace(method, path, self.max_chars)
+        return trace, _current_trace.set(trace)
+
+    def finish(self, trace: RequestTrace, token: contextvars.Token, status_code: Optional[int],
+               tenant: Optional[str] = None):
+        _current_trace.reset(token)
+        # Background jobs of the request may outlive it; they stop adding stages
+        trace.closed = True
+        duration_ms = (time.perf_counter() - trace.start) * 1000.0
+        self.counts["requests"] += 1
+        if duration_ms < self.threshold_ms:
+            return
+        self.counts["captured"] += 1
+        self.captures.append({
+            "started_at": trace.started_at,
+            "method": trace.method,
+            "path": trace.path,
+            "status_code": status_code,
+            "tenant": tenant,
+            "duration_ms": round(duration_ms, 1),
+            "stages": [{"name": name, "start_ms": round(offset * 1000.0, 1), "duration_ms": round(duration * 1000.0, 1)}
+                       for name, offset, duration in trace.stages],
+            "notes": trace.notes
+        })
+
+    def recent(self, limit: int = 50, path: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Newest captures first, optionally only those of one path"""
+        captures = [capture for capture in reversed(self.captures) if path is None or capture["path"] == path]
+        return captures[:limit]
+
+    def clear(self):
+        self.captures.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threshold_ms": self.threshold_ms,
+            "requests": self.counts["requests"],
+            "captured": self.counts["captured"],
+            "buffered": len(self.captures),
+            "capacity": self.captures.maxlen
+        }
+
+
+def create_profiler() -> Optional[SamplingProfiler]:
+    """Sampling profiler from settings; None when profiling is disabled"""
+    if not settings.PROFILING_ENABLED:
+        return None
+    return SamplingProfiler(settings.PROFILING_MAX_SECONDS)
+
+
+def create_slow_request_log() -> Optional[SlowRequestLog]:
+    """Slow-request ring buffer from settings; None when the buffer size is 0"""
+    if settings.SLOW_REQUEST_BUFFER_SIZE <= 0:
+        return None
+    return SlowRequestLog(settings.SLOW_REQUEST_THRESHOLD_MS, settings.SLOW_REQUEST_BUFFER_SIZE,
+                          settings.SLOW_REQUEST_RESPONSE_CHARS)
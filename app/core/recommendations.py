@@ -0,0 +1,117 @@
+"""
+Recommendation Library
+Canonical maintenance recommendations by failure mode and root cause code
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from app.core.taxonomy import OTHER, TAXONOMY, describe, normalize_failure_mode
+from app.models.fault_models import BearingAnalysisResult
+
+# Bump when the wording or the mapping changes; recorded in technical notes
+LIBRARY_VERSION = "recommendations-v1"
+
+RECOMMENDATIONS_PER_RESULT = 3
+
+# Line the codes-only prompt variants carry; the fake backend keys off it too
+CODES_ONLY_INSTRUCTION = "Answer with diagnosis codes only; do not write recommendations."
+
+# Codes the model may answer with; a missing bearing is answered by the refusal line
+DIAGNOSIS_CODES = [code for code in TAXONOMY if code not in ("not_bearing", "undetermined")]
+
+# Outcomes whose advice does not depend on a root cause
+NON_DAMAGE_CODES = ("no_damage", "not_bearing", "undetermined", OTHER)
+
+# Failure mode code -> what to do about the mechanism. Entries stay under 40
+# characters, the length the free-text answers are trimmed to.
+MODE_RECOMMENDATIONS: Dict[str, Tuple[str, ...]] = {
+    "fatigue": ("Verify load against bearing rating", "Replace bearing and inspect shaft", "Trend vibration monthly"),
+    "abrasion": ("Filter and flush lubricant", "Replace seals with contact type", "Clean housing before refit"),
+    "adhesive_wear": ("Check minimum load to prevent skidding", "Use lubricant with EP additives", "Verify running clearance"),
+    "lubrication": ("Review relubrication interval", "Check lubricant grade and viscosity", "Verify grease reaches the bearing"),
+    "contamination": ("Replace seals with contact type", "Filter and flush lubricant", "Clean housing before refit"),
+    "corrosion": ("Inspect seals for water ingress", "Use corrosion-inhibiting lubricant", "Store spares sealed and dry"),
+    "electrical_erosion": ("Install shaft grounding ring", "Use insulated or hybrid bearing", "Check motor earthing"),
+    "mounting": ("Use proper mounting tools", "Check shaft and housing fits", "Heat inner ring; never hammer"),
+    "misalignment": ("Laser-align shaft and housing", "Check shaft deflection under load", "Verify housing seat squareness"),
+    "false_brinelling": ("Lock shaft during transport", "Isolate standby machines", "Rotate idle shafts weekly"),
+    "overload": ("Verify load against bearing rating", "Check for shock loads", "Consider higher-capacity bearing"),
+    "fracture": ("Replace bearing immediately", "Check fits for excess hoop stress", "Inspect for impact damage"),
+    "overheating": ("Check lubricant quantity and grade", "Verify clearance and preload", "Monitor operating temperature"),
+    "no_damage": ("Continue routine monitoring", "Capture closer raceway image", "Check lubrication schedule"),
+    "not_bearing": ("Upload a clear bearing image", "Show the raceway in focus", "Avoid glare and background clutter"),
+    "undetermined": ("Conduct additional visual inspection", "Perform vibration analysis", "Review operating history")
+}
+
+# Root cause code -> what removes the cause; listed ahead of the mode's advice
+CAUSE_RECOMMENDATIONS: Dict[str, Tuple[str, ...]] = {
+    "fatigue": ("Plan replacement before rated life",),
+    "abrasion": ("Filter and flush lubricant",),
+    "adhesive_wear": ("Check minimum load to prevent skidding",),
+    "lubrication": ("Review relubrication interval", "Check lubricant grade and viscosity"),
+    "contamination": ("Replace seals with contact type", "Filter and flush lubricant"),
+    "corrosion": ("Inspect seals for water ingress",),
+    "electrical_erosion": ("Install shaft grounding ring", "Check motor earthing"),
+    "mounting": ("Check shaft and housing fits", "Use proper mounting tools"),
+    "misalignment": ("Laser-align shaft and housing",),
+    "false_brinelling": ("Isolate standby machines",),
+    "overload": ("Verify load against bearing rating",),
+    "overheating": ("Monitor operating temperature",)
+}
+
+
+def _combine(mode: str, cause: Optional[str]) -> Tuple[str, ...]:
+    """Cause-specific advice first, then the mode's, without repeats"""
+    picks: List[str] = []
+    candidates = CAUSE_RECOMMENDATIONS.get(cause, ()) + MODE_RECOMMENDATIONS.get(mode, MODE_RECOMMENDATIONS["undetermined"])
+    for recommendation in candidates:
+        if recommendation not in picks:
+            picks.append(recommendation)
+    return tuple(picks[:RECOMMENDATIONS_PER_RESULT])
+
+
+# Every (mode, cause) pair resolved once at import; lookups are a dict get
+_LOOKUP: Dict[Tuple[str, Optional[str]], Tuple[str, ...]] = {
+    (mode, cause): _combine(mode, None if mode in NON_DAMAGE_CODES else cause)
+    for mode in list(TAXONOMY) + [OTHER]
+    for cause in list(CAUSE_RECOMMENDATIONS) + [None]
+}
+
+
+def recommend(failure_mode_code: Optional[str], root_cause_codes: Optional[List[str]] = None) -> List[str]:
+    """Library recommendations for a diagnosis, keyed by its first root cause with advice"""
+    cause = next((code for code in root_cause_codes or [] if code in CAUSE_RECOMMENDATIONS), None)
+    return list(_LOOKUP.get((failure_mode_code or OTHER, cause)) or _LOOKUP[(OTHER, None)])
+
+
+def _as_code(text: str) -> Optional[str]:
+    """The code itself when the answer is a bare taxonomy code"""
+    code = text.strip().strip(".").lower().replace(" ", "_").replace("-", "_")
+    return code if code in TAXONOMY else None
+
+
+def expand_codes(result: BearingAnalysisResult) -> BearingAnalysisResult:
+    """
+    Turn a codes-only answer into a full result in place: codes become
+    their labels and the recommendations come from the library. Codes
+    outside the taxonomy are dropped; an unknown failure mode becomes other
+    """
+    mode = _as_code(result.failure_mode) or result.failure_mode_code or normalize_failure_mode(result.failure_mode)
+    if mode not in TAXONOMY:
+        mode = OTHER
+    causes: List[str] = []
+    for line in result.root_cause_analysis:
+        code = _as_code(line)
+        if code and code not in causes:
+            causes.append(code)
+    if not causes:
+        causes = [code for code in result.root_cause_codes if code in TAXONOMY]
+
+    result.failure_mode_code = mode
+    result.failure_mode = describe(mode)
+    result.root_cause_codes = causes
+    if causes:
+        result.root_cause_analysis = [describe(code) for code in causes]
+    result.recommendations = recommend(mode, causes)
+    result.technical_notes = f"{result.technical_notes or ''} (recommendations: {LIBRARY_VERSION})".strip()
+    return result
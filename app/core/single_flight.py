@@ -0,0 +1,62 @@
+"""
+Single-Flight Request Coalescing
+Lets concurrent identical calls share one execution instead of each running it
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """
+    De-duplicates concurrent async calls by key.
+
+    The first caller for a key (the leader) starts the call as a task; callers
+    arriving while it runs await the same task. Nothing is remembered once it
+    finishes, so this only removes duplicates that overlap in time, e.g. a
+    double-clicked upload or a batch with the same photo twice.
+
+    Waiters are shielded from each other: a cancelled caller (a client that
+    disconnected) stops waiting but does not cancel the shared call.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run call, or join the identical call already running
+
+        Returns:
+            (result, shared) where shared is True for callers that joined
+            another caller's execution
+        """
+        self.calls += 1
+        if not self.enabled:
+            self.executions += 1
+            return await call(), False
+
+        task = self._in_flight.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            task = asyncio.ensure_future(call())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task), shared
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+            "coalesced_ratio": round(self.coalesced / self.calls, 4) if self.calls else 0.0
+        }
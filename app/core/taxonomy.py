@@ -0,0 +1,354 @@
+"""
+Failure-Mode Taxonomy Normalization
+Maps free-text failure modes and root causes onto canonical codes
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from app.models.fault_models import BearingAnalysisResult
+
+# Canonical codes, loosely following the ISO 15243 bearing damage classes
+TAXONOMY: Dict[str, str] = {
+    "fatigue": "Rolling contact fatigue (spalling, flaking)",
+    "abrasion": "Abrasive wear",
+    "adhesive_wear": "Adhesive wear (smearing, skidding)",
+    "lubrication": "Inadequate or degraded lubrication",
+    "contamination": "Contamination by particles or debris",
+    "corrosion": "Moisture, chemical or fretting corrosion",
+    "electrical_erosion": "Electrical erosion (current passage, fluting)",
+    "mounting": "Mounting or fitting damage",
+    "misalignment": "Misalignment or shaft deflection",
+    "false_brinelling": "False brinelling (vibration at standstill)",
+    "overload": "Overload, true brinelling or impact",
+    "fracture": "Cracking or fracture",
+    "overheating": "Overheating",
+    "no_damage": "No damage found",
+    "not_bearing": "No bearing in the image",
+    "undetermined": "Could not be determined"
+}
+
+# Used when no keyword matches the failure mode text
+OTHER = "other"
+
+# Keyword or phrase -> code. Keywords match whole words, plurals included
+# ("dents"); a trailing * marks a stem that matches any word it starts
+# ("corros*" matches corrosion and corroded). Where matches overlap, the
+# longest wins, so "false brinelling" beats "brinell*".
+SYNONYMS: Dict[str, str] = {
+    # fatigue
+    "fatigu*": "fatigue",
+    "spall*": "fatigue",
+    "flaking": "fatigue",
+    "micropitting": "fatigue",
+    "micro pitting": "fatigue",
+    "pitting": "fatigue",
+    "peeling": "fatigue",
+    "subsurface": "fatigue",
+    "rolling contact": "fatigue",
+    "end of life": "fatigue",
+    "service life": "fatigue",
+    # abrasion
+    "abrasi*": "abrasion",
+    "wear": "abrasion",
+    "worn": "abrasion",
+    "scoring": "abrasion",
+    "scratch*": "abrasion",
+    "polish*": "abrasion",
+    # adhesive wear
+    "adhesive wear": "adhesive_wear",
+    "smear*": "adhesive_wear",
+    "skid*": "adhesive_wear",
+    "scuff*": "adhesive_wear",
+    "galling": "adhesive_wear",
+    # lubrication
+    "lubrica*": "lubrication",
+    "lubricant": "lubrication",
+    "relubrica*": "lubrication",
+    "grease*": "lubrication",
+    "oil starvation": "lubrication",
+    "starvation": "lubrication",
+    "dry running": "lubrication",
+    "oil film": "lubrication",
+    "viscosity": "lubrication",
+    # contamination
+    "contamina*": "contamination",
+    "debris": "contamination",
+    "particle": "contamination",
+    "particulate": "contamination",
+    "dirt*": "contamination",
+    "dust*": "contamination",
+    "ingress": "contamination",
+    "foreign": "contamination",
+    "seal failure": "contamination",
+    "failed seal": "contamination",
+    "damaged seal": "contamination",
+    "seal damage": "contamination",
+    "worn seal": "contamination",
+    "leaking seal": "contamination",
+    "seal leak*": "contamination",
+    "debris dent": "contamination",
+    # corrosion
+    "corros*": "corrosion",
+    "corrod*": "corrosion",
+    "rust*": "corrosion",
+    "moisture": "corrosion",
+    "water": "corrosion",
+    "humidity": "corrosion",
+    "oxidation": "corrosion",
+    "etching": "corrosion",
+    "fretting": "corrosion",
+    # electrical erosion
+    "electrical": "electrical_erosion",
+    "electric current": "electrical_erosion",
+    "electro erosion": "electrical_erosion",
+    "electroerosion": "electrical_erosion",
+    "current passage": "electrical_erosion",
+    "current leakage": "electrical_erosion",
+    "stray current": "electrical_erosion",
+    "shaft current": "electrical_erosion",
+    "shaft voltage": "electrical_erosion",
+    "fluting": "electrical_erosion",
+    "washboard": "electrical_erosion",
+    "arcing": "electrical_erosion",
+    "edm": "electrical_erosion",
+    "spark*": "electrical_erosion",
+    "frosting": "electrical_erosion",
+    "vfd": "electrical_erosion",
+    "variable frequency drive": "electrical_erosion",
+    "grounding": "electrical_erosion",
+    # mounting
+    "mounting": "mounting",
+    "installation": "mounting",
+    "improper fit": "mounting",
+    "loose fit": "mounting",
+    "interference fit": "mounting",
+    "fitting": "mounting",
+    "hammer*": "mounting",
+    "creep*": "mounting",
+    # misalignment
+    "misalign*": "misalignment",
+    "mis align": "misalignment",
+    "alignment": "misalignment",
+    "skew*": "misalignment",
+    "deflection": "misalignment",
+    "edge loading": "misalignment",
+    "eccentric*": "misalignment",
+    # false brinelling
+    "false brinell*": "false_brinelling",
+    "standstill": "false_brinelling",
+    "stand still": "false_brinelling",
+    "transport vibration": "false_brinelling",
+    "vibration while stationary": "false_brinelling",
+    # overload
+    "brinell*": "overload",
+    "true brinell*": "overload",
+    "overload*": "overload",
+    "excessive load": "overload",
+    "heavy load": "overload",
+    "shock load": "overload",
+    "impact*": "overload",
+    "indent*": "overload",
+    "dent": "overload",
+    "dented": "overload",
+    "plastic deformation": "overload",
+    # fracture
+    "crack*": "fracture",
+    "fractur*": "fracture",
+    "broken": "fracture",
+    "breakage": "fracture",
+    "chipp*": "fracture",
+    # overheating
+    "overheat*": "overheating",
+    "excessive heat": "overheating",
+    "heat damage*": "overheating",
+    "heat discolo*": "overheating",
+    "heat tint*": "overheating",
+    "discolo*": "overheating",
+    "temper colo*": "overheating",
+    "tempering": "overheating",
+    "thermal": "overheating",
+    "burn mark*": "overheating",
+    "burnt": "overheating",
+    "burned": "overheating",
+    "excessive temperature": "overheating",
+    "high temperature": "overheating",
+    # outcomes that are not damage
+    "no visible damage": "no_damage",
+    "no damage": "no_damage",
+    "no failure mode": "no_damage",
+    "no significant damage": "no_damage",
+    "no root cause evident": "no_damage",
+    "no bearing detected": "not_bearing",
+    "does not show a bearing": "not_bearing",
+    "unable to determine": "undetermined",
+    "analysis failed": "undetermined",
+    "insufficient visual evidence": "undetermined",
+    "technical error": "undetermined"
+}
+
+_SEPARATORS = str.maketrans({"-": " ", "_": " ", "/": " ", "\n": " ", "\t": " "})
+
+# Endings a whole-word keyword may still take
+_PLURAL_ENDINGS = ("", "s", "es")
+
+# Words that negate a mention shortly after them, within the same clause
+# ("no signs of contamination", "without any wear", "normal wear")
+NEGATIONS = {"no", "not", "without", "nor", "never", "absence", "free", "normal"}
+NEGATION_WINDOW = 3
+
+# Words that negate the mention right before them ("contamination-free")
+TRAILING_NEGATIONS = {"free"}
+_CLAUSE_BREAK = re.compile(r"[.,;:!?()]|\bbut\b")
+
+# Outcome codes whose phrases carry their own negation ("no damage")
+OUTCOME_CODES = {"no_damage", "not_bearing", "undetermined"}
+
+
+def _prepare(text: str) -> str:
+    """Lowercase and turn separators into spaces so phrases match"""
+    return " ".join(text.lower().translate(_SEPARATORS).split())
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over the synonym keywords.
+
+    Built once; scanning is a single pass over the text whatever the number
+    of keywords.
+    """
+
+    def __init__(self, keywords: Dict[str, str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, str, bool]]] = [[]]
+
+        for keyword, code in keywords.items():
+            stem = keyword.endswith("*")
+            keyword = _prepare(keyword.rstrip("*"))
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append((len(keyword), code, stem))
+
+        # Breadth-first failure links; outputs include those of the fallback state
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    @staticmethod
+    def _word_ends(text: str, end: int) -> bool:
+        """Whether a word ends at end, allowing a plural ending"""
+        word_end = end
+        while word_end < len(text) and text[word_end].isalnum():
+            word_end += 1
+        return text[end:word_end] in _PLURAL_ENDINGS
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """
+        Non-overlapping keyword matches in prepared text
+
+        Returns:
+            (start, end, code) tuples in text order, longest match winning overlaps
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        matches = []
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, code, stem in output[state]:
+                start = position + 1 - length
+                # Keywords must start a word, and end one unless they are stems
+                if start and text[start - 1].isalnum():
+                    continue
+                if stem or self._word_ends(text, position + 1):
+                    matches.append((start, position + 1, code))
+
+        matches.sort(key=lambda match: (match[0], -match[1]))
+        selected = []
+        end = -1
+        for match in matches:
+            if match[0] >= end:
+                selected.append(match)
+                end = match[1]
+            elif match[1] - match[0] > selected[-1][1] - selected[-1][0] and match[0] >= selected[-1][0]:
+                # A longer phrase starting inside the previous match replaces it
+                selected[-1] = match
+                end = match[1]
+        return selected
+
+
+_automaton = KeywordAutomaton(SYNONYMS)
+
+
+def _negated(text: str, start: int, end: int) -> bool:
+    """Whether the mention at start:end is negated within its clause"""
+    clause = _CLAUSE_BREAK.split(text[max(0, start - 80):start])[-1]
+    if any(word in NEGATIONS for word in clause.split()[-NEGATION_WINDOW:]):
+        return True
+    # The word after the one the mention ends in
+    following = re.match(r"\w*\s+(\w+)", text[end:])
+    return following is not None and following.group(1) in TRAILING_NEGATIONS
+
+
+@lru_cache(maxsize=65536)
+def match_codes(text: str) -> Tuple[str, ...]:
+    """Canonical codes mentioned, and not negated, in a text, in order of first mention"""
+    text = _prepare(text)
+    codes: List[str] = []
+    for start, end, code in _automaton.find(text):
+        if code not in OUTCOME_CODES and _negated(text, start, end):
+            continue
+        if code not in codes:
+            codes.append(code)
+    return tuple(codes)
+
+
+def normalize_failure_mode(failure_mode: str) -> str:
+    """Code of the first failure mechanism named in the text"""
+    codes = match_codes(failure_mode or "")
+    return codes[0] if codes else OTHER
+
+
+def normalize_root_causes(root_causes: List[str]) -> List[str]:
+    """Codes named across the root-cause lines, deduplicated in order"""
+    codes: List[str] = []
+    for cause in root_causes or []:
+        for code in match_codes(cause):
+            if code not in codes:
+                codes.append(code)
+    return codes
+
+
+def normalize_fields(failure_mode: str, root_causes: List[str]) -> Tuple[str, List[str]]:
+    """Codes for raw fields, for bulk re-normalization without model objects"""
+    return normalize_failure_mode(failure_mode), normalize_root_causes(root_causes)
+
+
+def normalize_result(result: BearingAnalysisResult) -> BearingAnalysisResult:
+    """Set the canonical codes on a result in place and return it"""
+    result.failure_mode_code, result.root_cause_codes = normalize_fields(
+        result.failure_mode, result.root_cause_analysis
+    )
+    return result
+
+
+def describe(code: Optional[str]) -> Optional[str]:
+    """Human-readable label of a code"""
+    return TAXONOMY.get(code, "Other") if code else None
@@ -0,0 +1,332 @@
+"""
+Tenants, API Keys and Quotas
+Authenticates API keys and enforces per-tenant request, concurrency and token limits
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+API_KEY_PREFIX = "bfa_"
+
+
+def hash_api_key(api_key: str) -> str:
+    """Keys are stored and looked up by their SHA-256, never in plain text"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def generate_api_key() -> str:
+    return API_KEY_PREFIX + secrets.token_urlsafe(32)
+
+
+class TenantConfig:
+    """
+    One tenant and its limits.
+
+    A limit of 0 means unlimited; None falls back to the configured default.
+    """
+
+    def __init__(self, tenant_id: str,
+                 name: Optional[str] = None,
+                 requests_per_minute: Optional[int] = None,
+                 max_concurrent: Optional[int] = None,
+                 daily_token_limit: Optional[int] = None,
+                 admin: bool = False,
+                 enabled: bool = True,
+                 api_keys: Optional[List[str]] = None):
+        self.tenant_id = tenant_id
+        self.name = name or tenant_id
+        self.requests_per_minute = requests_per_minute
+        self.max_concurrent = max_concurrent
+        self.daily_token_limit = daily_token_limit
+        self.admin = admin
+        self.enabled = enabled
+        self.api_keys = api_keys or []  # SHA-256 hashes
+
+    @property
+    def rpm_limit(self) -> int:
+        return settings.DEFAULT_TENANT_RPM if self.requests_per_minute is None else self.requests_per_minute
+
+    @property
+    def concurrency_limit(self) -> int:
+        return settings.DEFAULT_TENANT_MAX_CONCURRENT if self.max_concurrent is None else self.max_concurrent
+
+    @property
+    def token_limit(self) -> int:
+        return settings.DEFAULT_TENANT_DAILY_TOKENS if self.daily_token_limit is None else self.daily_token_limit
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.tenant_id,
+            "name": self.name,
+            "requests_per_minute": self.requests_per_minute,
+            "max_concurrent": self.max_concurrent,
+            "daily_token_limit": self.daily_token_limit,
+            "admin": self.admin,
+            "enabled": self.enabled,
+            "api_keys": self.api_keys
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TenantConfig":
+        return cls(
+            tenant_id=data["id"],
+            name=data.get("name"),
+            requests_per_minute=data.get("requests_per_minute"),
+            max_concurrent=data.get("max_concurrent"),
+            daily_token_limit=data.get("daily_token_limit"),
+            admin=data.get("admin", False),
+            enabled=data.get("enabled", True),
+            api_keys=data.get("api_keys", [])
+        )
+
+
+class TenantContext:
+    """Tenant a request runs as"""
+
+    def __init__(self, tenant_id: str, config: Optional[TenantConfig] = None, admin: bool = False):
+        self.tenant_id = tenant_id
+        self.config = config
+        self.admin = admin
+
+
+class ApiKeyStore:
+    """
+    Tenants and key hashes from a JSON file, cached in memory.
+
+    Authentication is one hash and one dictionary lookup. The file is
+    re-read when its modification time changes, checked at most every
+    ``reload_interval`` seconds, so keys can be issued or revoked without
+    a restart.
+    """
+
+    def __init__(self, path: str, reload_interval: float = 5.0):
+        self.path = Path(path)
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._tenants: Dict[str, TenantConfig] = {}
+        self._by_key: Dict[str, TenantConfig] = {}
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._load()
+
+    def _load(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime and self._mtime is not None:
+            return
+
+        tenants: Dict[str, TenantConfig] = {}
+        if mtime is not None:
+            try:
+                data = json.loads(self.path.read_text())
+                for entry in data.get("tenants", []):
+                    tenant = TenantConfig.from_dict(entry)
+                    tenants[tenant.tenant_id] = tenant
+            except Exception as e:
+                print(f"⚠️  Failed to load tenants from {self.path}: {e}")
+                return
+
+        by_key = {key_hash: tenant for tenant in tenants.values() for key_hash in tenant.api_keys}
+        with self._lock:
+            self._tenants, self._by_key, self._mtime = tenants, by_key, mtime
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_interval:
+            self._checked_at = now
+            self._load()
+
+    def authenticate(self, api_key: Optional[str]) -> Optional[TenantConfig]:
+        """Tenant owning an API key, or None for unknown keys and disabled tenants"""
+        if not api_key:
+            return None
+        self._maybe_reload()
+        tenant = self._by_key.get(hash_api_key(api_key))
+        return tenant if tenant is not None and tenant.enabled else None
+
+    def get(self, tenant_id: str) -> Optional[TenantConfig]:
+        self._maybe_reload()
+        return self._tenants.get(tenant_id)
+
+    def tenants(self) -> List[TenantConfig]:
+        self._maybe_reload()
+        return list(self._tenants.values())
+
+    def save(self, tenants: List[TenantConfig]):
+        """Write the tenant file atomically (used by tenant_admin.py)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_suffix(self.path.suffix + ".tmp")
+        temporary.write_text(json.dumps({"tenants": [tenant.to_dict() for tenant in tenants]}, indent=2))
+        os.replace(temporary, self.path)
+        self._mtime = None
+        self._load()
+
+
+class QuotaExceeded(Exception):
+    """Raised when a tenant is over one of its limits"""
+
+    def __init__(self, tenant_id: str, limit: str, retry_after: int):
+        self.tenant_id = tenant_id
+        self.limit = limit
+        self.retry_after = retry_after
+        super().__init__(f"Tenant {tenant_id} exceeded its {limit} quota")
+
+
+class _TenantState:
+    """Live counters of one tenant"""
+
+    def __init__(self, rpm: int, max_concurrent: int):
+        self.rpm = rpm
+        self.tokens = float(rpm)
+        self.refilled_at = time.monotonic()
+        self.semaphore = asyncio.Semaphore(max_concurrent) if max_concurrent else None
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self.waiting = 0
+        self.day: Optional[str] = None
+        self.tokens_today = 0
+        self.requests = 0
+        self.rejected: Dict[str, int] = {"requests_per_minute": 0, "daily_tokens": 0}
+
+
+class QuotaManager:
+    """
+    Per-tenant limits.
+
+    Requests per minute use a token bucket checked at admission. Concurrent
+    analyses are bounded by a per-tenant semaphore taken before the shared
+    scheduler slot, so a tenant's excess requests queue behind each other
+    instead of filling the shared queue. Daily tokens are checked at
+    admission against usage counted since midnight UTC.
+    """
+
+    def __init__(self, daily_usage_loader: Optional[Callable[[str, datetime], int]] = None):
+        self.daily_usage_loader = daily_usage_loader
+        self._states: Dict[str, _TenantState] = {}
+
+    def _state(self, tenant: TenantConfig) -> _TenantState:
+        state = self._states.get(tenant.tenant_id)
+        if state is None or state.rpm != tenant.rpm_limit or state.max_concurrent != tenant.concurrency_limit:
+            previous = state
+            state = _TenantState(tenant.rpm_limit, tenant.concurrency_limit)
+            if previous is not None:
+                # Limits changed in the tenant file; keep the counters
+                state.day, state.tokens_today = previous.day, previous.tokens_today
+                state.requests, state.rejected = previous.requests, previous.rejected
+            self._states[tenant.tenant_id] = state
+        return state
+
+    def _roll_day(self, tenant_id: str, state: _TenantState):
+        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        if state.day == today:
+            return
+        state.day = today
+        state.tokens_today = 0
+        if self.daily_usage_loader is not None:
+            midnight = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+            try:
+                state.tokens_today = self.daily_usage_loader(tenant_id, midnight)
+            except Exception as e:
+                print(f"⚠️  Failed to load today's usage for {tenant_id}: {e}")
+
+    def admit(self, tenant: Optional[TenantConfig]):
+        """Check request-rate and daily-token limits; raises QuotaExceeded"""
+        if tenant is None:
+            return
+        state = self._state(tenant)
+        state.requests += 1
+
+        if tenant.rpm_limit:
+            now = time.monotonic()
+            state.tokens = min(float(tenant.rpm_limit),
+                               state.tokens + (now - state.refilled_at) * tenant.rpm_limit / 60.0)
+            state.refilled_at = now
+            if state.tokens < 1.0:
+                state.rejected["requests_per_minute"] += 1
+                retry_after = max(1, int((1.0 - state.tokens) * 60.0 / tenant.rpm_limit + 0.999))
+                raise QuotaExceeded(tenant.tenant_id, "requests_per_minute", retry_after)
+            state.tokens -= 1.0
+
+        if tenant.token_limit:
+            self._roll_day(tenant.tenant_id, state)
+            if state.tokens_today >= tenant.token_limit:
+                state.rejected["daily_tokens"] += 1
+                now = datetime.now(timezone.utc)
+                seconds_to_midnight = 86400 - (now.hour * 3600 + now.minute * 60 + now.second)
+                raise QuotaExceeded(tenant.tenant_id, "daily_tokens", seconds_to_midnight)
+
+    @asynccontextmanager
+    async def analysis_slot(self, tenant: Optional[TenantConfig]) -> AsyncIterator[None]:
+        """Hold one of the tenant's concurrent-analysis slots"""
+        state = self._state(tenant) if tenant is not None else None
+        if state is None or state.semaphore is None:
+            yield
+            return
+        state.waiting += 1
+        try:
+            await state.semaphore.acquire()
+        finally:
+            state.waiting -= 1
+        state.in_flight += 1
+        try:
+            yield
+        finally:
+            state.in_flight -= 1
+            state.semaphore.release()
+
+    def add_tokens(self, tenant: Optional[TenantConfig], tokens: int):
+        """Count tokens an analysis consumed against the daily limit"""
+        if tenant is None or not tokens:
+            return
+        state = self._state(tenant)
+        self._roll_day(tenant.tenant_id, state)
+        state.tokens_today += tokens
+
+    def stats(self, tenant_id: Optional[str] = None) -> Dict[str, Any]:
+        """Per-tenant usage against limits; one tenant when tenant_id is given"""
+        report = {}
+        for current_id, state in self._states.items():
+            if tenant_id is not None and current_id != tenant_id:
+                continue
+            report[current_id] = {
+                "requests": state.requests,
+                "in_flight": state.in_flight,
+                "waiting": state.waiting,
+                "max_concurrent": state.max_concurrent,
+                "requests_per_minute": state.rpm,
+                "rpm_tokens_available": round(state.tokens, 2),
+                "tokens_today": state.tokens_today,
+                "rejected": dict(state.rejected)
+            }
+        return report
+
+
+def create_api_key_store() -> ApiKeyStore:
+    """Open the tenant file from settings"""
+    store = ApiKeyStore(settings.TENANTS_FILE)
+    if settings.AUTH_ENABLED:
+        print(f"✅ API key authentication enabled ({len(store.tenants())} tenants in {settings.TENANTS_FILE})")
+    return store
+
+
+def create_quota_manager(history_store: Any = None) -> QuotaManager:
+    """Quota manager that seeds daily token counts from stored usage"""
+    loader = None
+    if history_store is not None:
+        def loader(tenant_id: str, since: datetime) -> int:
+            groups = history_store.usage_summary("tenant", since=since, tenant=tenant_id)
+            return sum(group["prompt_tokens"] + group["image_tokens"] + group["output_tokens"] for group in groups)
+    return QuotaManager(daily_usage_loader=loader)
@@ -0,0 +1,306 @@
+"""
+Local Triage for Bearing Images
+CPU-only classical-CV classifier that answers obvious cases before Gemini
+"""
+
+import json
+import pickle
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app.core.config import settings
+from app.models.fault_models import BearingAnalysisResult
+
+NOT_BEARING = "not_bearing"
+NO_DAMAGE = "no_damage"
+NEEDS_ANALYSIS = "needs_analysis"
+TRIAGE_CLASSES = [NOT_BEARING, NO_DAMAGE, NEEDS_ANALYSIS]
+
+FEATURE_NAMES = [
+    "edge_density",
+    "ring_consistency",
+    "gray_mean",
+    "gray_std",
+    "gray_entropy",
+    "laplacian_mean",
+    "saturation_mean"
+]
+
+
+@lru_cache(maxsize=4)
+def _ring_index(size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Integer ring radius of every pixel and the pixel count per ring"""
+    yy, xx = np.indices((size, size))
+    radius = np.hypot(yy - (size - 1) / 2, xx - (size - 1) / 2).astype(np.int32).ravel()
+    return radius, np.bincount(radius)
+
+
+def extract_features(image: Image.Image, size: int = 192) -> np.ndarray:
+    """
+    Compute the triage feature vector for an image
+
+    Works on a small grayscale copy so it costs a few milliseconds even for
+    multi-megapixel uploads. JPEG decoding is reduced in place with
+    ``draft``, so pass a freshly opened image that is not used afterwards.
+
+    Returns:
+        Float array ordered as FEATURE_NAMES
+    """
+    if image.format == "JPEG":
+        image.draft("RGB", (size * 2, size * 2))
+    small = image.convert("RGB").resize((size, size), Image.BILINEAR)
+
+    hsv = np.asarray(small.convert("HSV"), dtype=np.float32)
+    gray = np.asarray(small.convert("L"), dtype=np.float32)
+
+    # Edge density from finite-difference gradient magnitude
+    gx = np.abs(np.diff(gray, axis=1))[:-1, :]
+    gy = np.abs(np.diff(gray, axis=0))[:, :-1]
+    gradient = gx + gy
+    edge_density = float((gradient > 40.0).mean())
+
+    # Rings around the image center: bearings vary little along each ring
+    radius, counts = _ring_index(size)
+    ring_means = np.bincount(radius, weights=gray.ravel()) / np.maximum(counts, 1)
+    within = ((gray.ravel() - ring_means[radius]) ** 2).mean()
+    total = gray.var()
+    ring_consistency = float(1.0 - within / total) if total > 0 else 0.0
+
+    histogram = np.bincount(gray.astype(np.uint8).ravel(), minlength=256) / gray.size
+    nonzero = histogram[histogram > 0]
+    entropy = float(-(nonzero * np.log2(nonzero)).sum())
+
+    laplacian = np.abs(
+        4 * gray[1:-1, 1:-1] - gray[:-2, 1:-1] - gray[2:, 1:-1] - gray[1:-1, :-2] - gray[1:-1, 2:]
+    )
+
+    return np.array([
+        edge_density,
+        ring_consistency,
+        float(gray.mean()) / 255.0,
+        float(gray.std()) / 255.0,
+        entropy / 8.0,
+        float(laplacian.mean()) / 255.0,
+        float(hsv[..., 1].mean()) / 255.0
+    ], dtype=np.float64)
+
+
+class LinearTriageModel:
+    """
+    Multinomial logistic regression with the scikit-learn predict_proba API.
+
+    Stored as JSON so a model trained anywhere loads without pickle or sklearn.
+    """
+
+    def __init__(self, classes: List[str], coef: np.ndarray, intercept: np.ndarray,
+                 mean: np.ndarray, scale: np.ndarray):
+        self.classes_ = np.array(classes)
+        self.coef_ = np.asarray(coef, dtype=np.float64)
+        self.intercept_ = np.asarray(intercept, dtype=np.float64)
+        self.mean_ = np.asarray(mean, dtype=np.float64)
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        X = (np.atleast_2d(X) - self.mean_) / self.scale_
+        logits = X @ self.coef_.T + self.intercept_
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    @classmethod
+    def fit(cls, X: np.ndarray, labels: List[str], epochs: int = 2000,
+            learning_rate: float = 0.5, l2: float = 1e-3) -> "LinearTriageModel":
+        """Train with full-batch gradient descent on standardized features"""
+        classes = sorted(set(labels), key=lambda label: TRIAGE_CLASSES.index(label)
+                         if label in TRIAGE_CLASSES else len(TRIAGE_CLASSES))
+        index = {label: i for i, label in enumerate(classes)}
+        y = np.eye(len(classes))[[index[label] for label in labels]]
+
+        mean = X.mean(axis=0)
+        scale = X.std(axis=0)
+        scale[scale == 0] = 1.0
+        Xs = (X - mean) / scale
+
+        coef = np.zeros((len(classes), X.shape[1]))
+        intercept = np.zeros(len(classes))
+        for _ in range(epochs):
+            logits = Xs @ coef.T + intercept
+            logits -= logits.max(axis=1, keepdims=True)
+            probabilities = np.exp(logits)
+            probabilities /= probabilities.sum(axis=1, keepdims=True)
+            error = (probabilities - y) / len(Xs)
+            coef -= learning_rate * (error.T @ Xs + l2 * coef)
+            intercept -= learning_rate * error.sum(axis=0)
+
+        return cls(classes, coef, intercept, mean, scale)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "type": "linear_softmax",
+            "features": FEATURE_NAMES,
+            "classes": self.classes_.tolist(),
+            "coef": self.coef_.tolist(),
+            "intercept": self.intercept_.tolist(),
+            "mean": self.mean_.tolist(),
+            "scale": self.scale_.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LinearTriageModel":
+        if data.get("features", FEATURE_NAMES) != FEATURE_NAMES:
+            raise ValueError("Triage model was trained on a different feature set")
+        return cls(data["classes"], data["coef"], data["intercept"], data["mean"], data["scale"])
+
+
+def load_triage_model(path: str) -> Any:
+    """Load a JSON linear model or a pickled scikit-learn style classifier"""
+    model_path = Path(path)
+    if model_path.suffix == ".json":
+        return LinearTriageModel.from_dict(json.loads(model_path.read_text()))
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+    if not hasattr(model, "predict_proba") or not hasattr(model, "classes_"):
+        raise ValueError("Triage model must provide predict_proba and classes_")
+    return model
+
+
+def triage_label_for_result(result: BearingAnalysisResult) -> str:
+    """Map a Gemini result onto the triage classes, used to measure agreement"""
+    damage = result.observed_damage.lower()
+    mode = result.failure_mode.lower()
+    if "no bearing detected" in mode or "no bearing detected" in damage:
+        return NOT_BEARING
+    # An empty parse also reports "no visible damage", but with no failure mode
+    if "no failure mode" in mode or ("no visible damage" in damage and "unable" not in mode):
+        return NO_DAMAGE
+    return NEEDS_ANALYSIS
+
+
+class TriageDecision:
+    """Outcome of triaging one image"""
+
+    def __init__(self, label: str, probability: float, elapsed_ms: float, short_circuit: bool):
+        self.label = label
+        self.probability = probability
+        self.elapsed_ms = elapsed_ms
+        self.short_circuit = short_circuit
+
+    def to_result(self) -> BearingAnalysisResult:
+        """Build the locally answered analysis result"""
+        note = f"Answered by local triage ({self.label}, p={self.probability:.2f}); Gemini was not called"
+        if self.label == NOT_BEARING:
+            return BearingAnalysisResult(
+                observed_damage="No bearing detected or image unclear. Please upload a clear bearing image.",
+                failure_mode="No bearing detected",
+                root_cause_analysis=["Image does not show a bearing component"],
+                confidence_score=round(self.probability, 3),
+                technical_notes=note,
+                recommendations=[
+                    "Upload a clear bearing image",
+                    "Photograph the raceway close up",
+                    "Use even lighting without glare"
+                ]
+            )
+        return BearingAnalysisResult(
+            observed_damage="No visible damage detected",
+            failure_mode="No failure mode identified",
+            root_cause_analysis=["No root cause evident from the image"],
+            confidence_score=round(self.probability, 3),
+            technical_notes=note,
+            recommendations=[
+                "Continue routine condition monitoring",
+                "Re-inspect at next scheduled outage",
+                "Check lubrication schedule"
+            ]
+        )
+
+
+class TriageClassifier:
+    """Runs the local model and tracks short-circuit rate and latency"""
+
+    def __init__(self, model: Any = None, confidence_threshold: float = 0.9,
+                 latency_budget_ms: float = 5.0, image_size: int = 192):
+        self.model = model
+        self.confidence_threshold = confidence_threshold
+        self.latency_budget_ms = latency_budget_ms
+        self.image_size = image_size
+
+        self._lock = threading.Lock()
+        self._decisions: Dict[str, int] = {label: 0 for label in TRIAGE_CLASSES}
+        self._short_circuits = 0
+        self._over_budget = 0
+        self._latencies: Deque[float] = deque(maxlen=1000)
+
+    @property
+    def enabled(self) -> bool:
+        return self.model is not None
+
+    def classify(self, image: Image.Image) -> Optional[TriageDecision]:
+        """Triage an image; returns None when no model is loaded"""
+        if self.model is None:
+            return None
+
+        start = time.perf_counter()
+        features = extract_features(image, self.image_size)
+        probabilities = self.model.predict_proba(features.reshape(1, -1))[0]
+        best = int(np.argmax(probabilities))
+        label = str(self.model.classes_[best])
+        probability = float(probabilities[best])
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+
+        # Only confident answers inside the latency budget skip the model
+        short_circuit = (label != NEEDS_ANALYSIS
+                         and probability >= self.confidence_threshold
+                         and elapsed_ms <= self.latency_budget_ms)
+
+        with self._lock:
+            self._decisions[label] = self._decisions.get(label, 0) + 1
+            self._latencies.append(elapsed_ms)
+            if short_circuit:
+                self._short_circuits += 1
+            if elapsed_ms > self.latency_budget_ms:
+                self._over_budget += 1
+
+        return TriageDecision(label, probability, elapsed_ms, short_circuit)
+
+    def stats(self) -> Dict[str, Any]:
+        """Short-circuit rate, decision counts and latency"""
+        with self._lock:
+            total = sum(self._decisions.values())
+            latencies = sorted(self._latencies)
+            return {
+                "enabled": self.enabled,
+                "triaged": total,
+                "short_circuited": self._short_circuits,
+                "short_circuit_rate": round(self._short_circuits / total, 4) if total else 0.0,
+                "decisions": dict(self._decisions),
+                "over_latency_budget": self._over_budget,
+                "latency_p95_ms": round(latencies[int(len(latencies) * 0.95)], 3) if latencies else 0.0
+            }
+
+
+def create_triage_classifier() -> TriageClassifier:
+    """Build the triage stage from settings; disabled when no model path is set"""
+    model = None
+    if settings.TRIAGE_MODEL_PATH:
+        try:
+            model = load_triage_model(settings.TRIAGE_MODEL_PATH)
+            print(f"✅ Local triage model loaded from {settings.TRIAGE_MODEL_PATH}")
+        except Exception as e:
+            print(f"⚠️  Failed to load triage model: {e}")
+    return TriageClassifier(
+        model=model,
+        confidence_threshold=settings.TRIAGE_CONFIDENCE_THRESHOLD,
+        latency_budget_ms=settings.TRIAGE_LATENCY_BUDGET_MS,
+        image_size=settings.TRIAGE_IMAGE_SIZE
+    )
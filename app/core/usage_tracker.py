@@ -0,0 +1,205 @@
+"""
+Token Usage Accounting
+Captures model token usage per call and aggregates it per tenant and prompt variant
+"""
+
+import asyncio
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from app.core.config import settings
+from app.models.fault_models import TokenUsage
+
+# Gemini bills small images as one tile and larger ones per 768x768 crop
+IMAGE_TILE_TOKENS = 258
+IMAGE_SMALL_EDGE = 384
+IMAGE_TILE_EDGE = 768
+
+# Usage is aggregated into buckets of this many seconds before it is stored
+BUCKET_SECONDS = 3600
+
+USAGE_FIELDS = ["requests", "model_calls", "prompt_tokens", "image_tokens", "output_tokens"]
+
+
+def estimate_image_tokens(size: Tuple[int, int]) -> int:
+    """Tokens Gemini charges for an image of the given size"""
+    width, height = size
+    if width <= IMAGE_SMALL_EDGE and height <= IMAGE_SMALL_EDGE:
+        return IMAGE_TILE_TOKENS
+    return math.ceil(width / IMAGE_TILE_EDGE) * math.ceil(height / IMAGE_TILE_EDGE) * IMAGE_TILE_TOKENS
+
+
+def extract_usage(response: Any, images: List[Image.Image]) -> TokenUsage:
+    """
+    Token usage of one model call from the SDK's usage metadata
+
+    The prompt count includes the images. Newer SDKs break it down by
+    modality; otherwise the image share is estimated from the image sizes.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    prompt_total = getattr(usage, "prompt_token_count", 0) or 0
+    output = getattr(usage, "candidates_token_count", 0) or 0
+
+    image_tokens = None
+    for detail in getattr(usage, "prompt_tokens_details", None) or []:
+        modality = str(getattr(detail, "modality", "")).upper()
+        if modality.endswith("IMAGE"):
+            image_tokens = (image_tokens or 0) + (getattr(detail, "token_count", 0) or 0)
+    if image_tokens is None:
+        image_tokens = sum(estimate_image_tokens(image.size) for image in images)
+    image_tokens = min(image_tokens, prompt_total) if prompt_total else image_tokens
+
+    return TokenUsage(
+        prompt_tokens=max(0, prompt_total - image_tokens),
+        image_tokens=image_tokens,
+        output_tokens=output,
+        model_calls=1
+    )
+
+
+def estimate_cost(prompt_tokens: int, image_tokens: int, output_tokens: int) -> Optional[float]:
+    """Cost in USD from the configured prices; None when no prices are set"""
+    if not settings.PRICE_INPUT_PER_MTOK and not settings.PRICE_OUTPUT_PER_MTOK:
+        return None
+    return round(((prompt_tokens + image_tokens) * settings.PRICE_INPUT_PER_MTOK
+                  + output_tokens * settings.PRICE_OUTPUT_PER_MTOK) / 1e6, 6)
+
+
+class UsageTracker:
+    """
+    In-memory usage counters flushed periodically to the history store.
+
+    Recording is a dictionary update under a lock, so it adds nothing
+    measurable to a request. Counters are keyed by hour, tenant, prompt
+    variant and model; flushing swaps the dictionary out and upserts it.
+    Without a store the counters stay in memory for the process lifetime.
+    """
+
+    def __init__(self, store: Any = None, flush_interval: float = 30.0):
+        self.store = store
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[float, str, str, str], List[int]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.flush_errors = 0
+
+    def record(self, tenant: str, prompt_variant: Optional[str], model: str, usage: Optional[TokenUsage]):
+        """Count one request and its token usage"""
+        bucket = float(int(time.time() // BUCKET_SECONDS) * BUCKET_SECONDS)
+        key = (bucket, tenant, prompt_variant or "", model)
+        usage = usage or TokenUsage()
+        with self._lock:
+            counters = self._pending.get(key)
+            if counters is None:
+                counters = self._pending[key] = [0, 0, 0, 0, 0]
+            counters[0] += 1
+            counters[1] += usage.model_calls
+            counters[2] += usage.prompt_tokens
+            counters[3] += usage.image_tokens
+            counters[4] += usage.output_tokens
+
+    def flush(self) -> int:
+        """Write pending counters to the store; returns the number of rows written"""
+        if self.store is None:
+            return 0
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        rows = [key + tuple(counters) for key, counters in pending.items()]
+        try:
+            self.store.add_usage(rows)
+        except Exception as e:
+            # Put the counters back so the next flush retries them
+            self.flush_errors += 1
+            print(f"⚠️  Failed to flush usage counters: {e}")
+            with self._lock:
+                for key, counters in pending.items():
+                    current = self._pending.setdefault(key, [0, 0, 0, 0, 0])
+                    for i, value in enumerate(counters):
+                        current[i] += value
+            return 0
+        self.flushes += 1
+        return len(rows)
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await asyncio.to_thread(self.flush)
+
+    def start(self):
+        """Start periodic flushing on the running event loop"""
+        if self.store is not None and self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self):
+        """Stop periodic flushing and write what is left"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await asyncio.to_thread(self.flush)
+
+    def _pending_summary(self, group_by: str, since: Optional[datetime], until: Optional[datetime],
+                         tenant: Optional[str]) -> List[Dict[str, Any]]:
+        """Aggregate in-memory counters the way the store summarizes flushed ones"""
+        groups: Dict[Optional[str], List[int]] = {}
+        with self._lock:
+            items = list(self._pending.items())
+        for (bucket, row_tenant, variant, model), counters in items:
+            if tenant is not None and row_tenant != tenant:
+                continue
+            if since is not None and bucket < since.timestamp():
+                continue
+            if until is not None and bucket >= until.timestamp():
+                continue
+            key = {
+                "tenant": row_tenant,
+                "prompt_variant": variant,
+                "model": model,
+                "day": datetime.utcfromtimestamp(bucket).strftime("%Y-%m-%d"),
+                "hour": datetime.utcfromtimestamp(bucket).strftime("%Y-%m-%d %H:00")
+            }[group_by]
+            totals = groups.setdefault(key, [0, 0, 0, 0, 0])
+            for i, value in enumerate(counters):
+                totals[i] += value
+        return [{"key": key, **dict(zip(USAGE_FIELDS, totals))} for key, totals in groups.items()]
+
+    def report(self, group_by: str = "tenant", since: Optional[datetime] = None,
+               until: Optional[datetime] = None, tenant: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Usage totals per group, most tokens first
+
+        Pending counters are flushed first so the report is current.
+        """
+        if self.store is not None:
+            self.flush()
+            groups = self.store.usage_summary(group_by, since=since, until=until, tenant=tenant)
+        else:
+            groups = self._pending_summary(group_by, since, until, tenant)
+
+        for group in groups:
+            group["total_tokens"] = group["prompt_tokens"] + group["image_tokens"] + group["output_tokens"]
+            group["estimated_cost_usd"] = estimate_cost(
+                group["prompt_tokens"], group["image_tokens"], group["output_tokens"]
+            )
+        groups.sort(key=lambda group: group["total_tokens"], reverse=True)
+        return groups
+
+    async def report_async(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.report, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._pending)
+        return {"pending_rows": pending, "flushes": self.flushes, "flush_errors": self.flush_errors}
+
+
+def create_usage_tracker(store: Any = None) -> UsageTracker:
+    """Build the usage tracker from settings, flushing to the given store"""
+    return UsageTracker(store=store, flush_interval=settings.USAGE_FLUSH_INTERVAL_SECONDS)
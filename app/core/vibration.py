@@ -0,0 +1,461 @@
+"""
+Vibration Spectrum Analysis
+Envelope spectra and bearing defect-frequency matching for accelerometer captures
+"""
+
+import io
+import math
+import time
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.bearing_catalog import DEFECT_NAMES, BearingCatalog, defect_orders
+from app.core.config import settings
+from app.models.fault_models import DefectFrequencyMatch, VibrationFindings
+
+DEFECT_DESCRIPTIONS = {
+    "BPFO": "outer race defect",
+    "BPFI": "inner race defect",
+    "BSF": "rolling element defect",
+    "FTF": "cage defect"
+}
+
+CSV_BLOCK_BYTES = 4 * 1024 * 1024
+
+
+class BearingGeometry:
+    """Rolling element count and dimensions that set the defect frequencies"""
+
+    def __init__(self, rolling_elements: int, element_diameter_mm: float,
+                 pitch_diameter_mm: float, contact_angle_deg: float = 0.0):
+        if rolling_elements < 1 or element_diameter_mm <= 0 or pitch_diameter_mm <= element_diameter_mm:
+            raise ValueError("Bearing geometry needs rolling elements >= 1 and pitch diameter > element diameter")
+        self.rolling_elements = rolling_elements
+        self.element_diameter_mm = element_diameter_mm
+        self.pitch_diameter_mm = pitch_diameter_mm
+        self.contact_angle_deg = contact_angle_deg
+
+    def defect_frequencies(self, shaft_hz: float) -> Dict[str, float]:
+        """BPFO, BPFI, BSF and FTF in Hz for a shaft speed, assuming a fixed outer ring"""
+        orders = defect_orders(self.rolling_elements, self.element_diameter_mm,
+                               self.pitch_diameter_mm, self.contact_angle_deg)
+        return {name: float(order) * shaft_hz for name, order in zip(DEFECT_NAMES, orders)}
+
+
+# Representative mid-size bearings per type, used when no geometry is given.
+# Defect frequencies from these are approximate; pass the real geometry for
+# anything beyond a first look.
+DEFAULT_GEOMETRIES = {
+    "ball_bearing": BearingGeometry(9, 7.94, 39.04, 0.0),          # 6205
+    "roller_bearing": BearingGeometry(13, 6.5, 38.5, 0.0),         # NU205
+    "thrust_bearing": BearingGeometry(14, 5.5, 34.0, 90.0),        # 51105
+    "needle_bearing": BearingGeometry(20, 3.0, 30.0, 0.0),
+    "spherical_bearing": BearingGeometry(13, 7.5, 38.5, 10.0),     # 22205, per row
+    "tapered_roller": BearingGeometry(15, 6.5, 39.0, 14.0)         # 30205
+}
+
+
+def _signal_index(column: Optional[int], width: int) -> int:
+    """Index of the signal column in data this many columns wide (default: the last)"""
+    if column is None:
+        return width - 1
+    if not 0 <= column < width:
+        raise ValueError(f"Signal column {column} is out of range; the data has {width} column(s)")
+    return column
+
+
+def _npy_chunks(fileobj: BinaryIO, chunk_samples: int, column: Optional[int]) -> Iterator[np.ndarray]:
+    """Read a .npy array in chunks without loading the file"""
+    version = np.lib.format.read_magic(fileobj)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fileobj)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fileobj)
+    if dtype.hasobject or len(shape) not in (1, 2):
+        raise ValueError("NPY vibration data must be a numeric 1-D or 2-D array")
+    width = 1 if len(shape) == 1 else shape[1]
+    index = _signal_index(column, width)
+
+    if fortran_order and len(shape) == 2:
+        # Column-major: one column is contiguous, but not streamable row by row
+        array = np.frombuffer(fileobj.read(), dtype=dtype).reshape(shape, order="F")
+        yield np.asarray(array[:, index], dtype=np.float64)
+        return
+
+    row_bytes = dtype.itemsize * width
+    remaining = shape[0]
+    while remaining > 0:
+        rows = min(chunk_samples, remaining)
+        data = fileobj.read(rows * row_bytes)
+        if len(data) < rows * row_bytes:
+            raise ValueError("NPY file is truncated")
+        block = np.frombuffer(data, dtype=dtype)
+        if width > 1:
+            block = block.reshape(rows, width)[:, index]
+        remaining -= rows
+        yield block.astype(np.float64, copy=False)
+
+
+def _is_number(token: str) -> bool:
+    try:
+        float(token)
+        return True
+    except ValueError:
+        return False
+
+
+def _csv_chunks(fileobj: BinaryIO, column: Optional[int],
+                timestamps: Optional[List[float]] = None) -> Iterator[np.ndarray]:
+    """
+    Parse numeric CSV in blocks of lines
+
+    The delimiter and column count come from the first data line, and a
+    header line is skipped. The last column is the signal unless ``column``
+    says otherwise. When ``timestamps`` is a list, the first rows of column 0
+    are collected into it so the sample rate can be inferred.
+    """
+    columns = None
+    leftover = b""
+    while True:
+        block = fileobj.read(CSV_BLOCK_BYTES)
+        data = leftover + block
+        if not block:
+            leftover = b""
+        else:
+            cut = data.rfind(b"\n")
+            if cut < 0:
+                leftover = data
+                continue
+            data, leftover = data[:cut + 1], data[cut + 1:]
+
+        text = data.decode("utf-8", errors="replace")
+        if columns is None:
+            lines = text.lstrip().splitlines()
+            if not lines:
+                if not block:
+                    break
+                continue
+            first = lines[0].replace(";", ",").replace("\t", ",")
+            tokens = [token for token in first.replace(",", " ").split() if token]
+            if not tokens or not _is_number(tokens[0]):
+                text = "\n".join(lines[1:])  # Header
+                first = lines[1].replace(";", ",").replace("\t", ",") if len(lines) > 1 else ""
+            columns = max(1, len([token for token in first.replace(",", " ").split() if token]))
+            index = _signal_index(column, columns)
+
+        values = np.fromstring(text.replace(",", " ").replace(";", " ").replace("\t", " "), sep=" ")
+        if values.size % columns:
+            raise ValueError("CSV rows have differing numbers of columns")
+        rows = values.reshape(-1, columns)
+        if timestamps is not None and columns > 1 and len(timestamps) < 1000:
+            timestamps.extend(rows[:1000 - len(timestamps), 0].tolist())
+        if rows.size:
+            yield rows[:, index]
+        if not block:
+            break
+
+
+def iter_signal_chunks(fileobj: BinaryIO, filename: Optional[str],
+                       chunk_samples: int = 262144,
+                       column: Optional[int] = None,
+                       timestamps: Optional[List[float]] = None) -> Iterator[np.ndarray]:
+    """
+    Stream a vibration capture (.npy or numeric CSV) as float64 chunks
+
+    Args:
+        fileobj: Binary file positioned at the start of the capture
+        filename: Used to pick the format; NPY is also recognized by its magic bytes
+        chunk_samples: Samples per NPY chunk (CSV is read in blocks of lines)
+        column: Signal column in 2-D data (default: the last one)
+        timestamps: Filled with leading time values from a CSV time column
+    """
+    head = fileobj.read(6)
+    fileobj.seek(-len(head), io.SEEK_CUR)
+    if head == b"\x93NUMPY" or (filename or "").lower().endswith(".npy"):
+        return _npy_chunks(fileobj, chunk_samples, column)
+    return _csv_chunks(fileobj, column, timestamps)
+
+
+class SpectrumAccumulator:
+    """
+    Welch-averaged power and envelope spectra of a signal fed in chunks.
+
+    The signal is cut into Hann-windowed segments with overlap, and all
+    complete segments of a chunk are transformed in one batched FFT. The
+    envelope comes from the same FFT: the resonance band is shifted to
+    baseband and inverse transformed at a reduced rate, whose magnitude is
+    the demodulated envelope. Memory stays bounded by the segment size and
+    ``segments_per_block``, whatever the recording length.
+    """
+
+    def __init__(self, sample_rate: float, segment_size: int = 16384, overlap: float = 0.5,
+                 envelope_band: Optional[Tuple[float, float]] = None, segments_per_block: int = 64):
+        if sample_rate <= 0:
+            raise ValueError("Sample rate must be positive")
+        self.sample_rate = sample_rate
+        self.segment_size = segment_size
+        self.step = max(1, int(segment_size * (1.0 - overlap)))
+        self.segments_per_block = segments_per_block
+        self.window = np.hanning(segment_size)
+
+        low, high = envelope_band or (0.15 * sample_rate, 0.40 * sample_rate)
+        high = min(high, sample_rate / 2.0)
+        bin_width = sample_rate / segment_size
+        self.band_start = max(1, int(low / bin_width))
+        self.band_stop = min(segment_size // 2 + 1, int(math.ceil(high / bin_width)))
+        if self.band_stop - self.band_start < 16:
+            raise ValueError("Envelope band is too narrow for the segment size")
+        self.envelope_band = (self.band_start * bin_width, self.band_stop * bin_width)
+        band_bins = self.band_stop - self.band_start
+        self.envelope_window = np.hanning(band_bins)
+
+        self._tail = np.empty(0)
+        self._power_sum = np.zeros(segment_size // 2 + 1)
+        self._envelope_sum = np.zeros(band_bins // 2 + 1)
+        self.segments = 0
+
+        # Moments about a shift taken from the first chunk, which keeps a DC
+        # offset from swamping the higher moments
+        self._shift: Optional[float] = None
+        self.samples = 0
+        self._moments = np.zeros(4)
+        self._peak = 0.0
+
+    def _update_statistics(self, chunk: np.ndarray):
+        if self._shift is None:
+            self._shift = float(chunk.mean())
+        centered = chunk - self._shift
+        squared = centered * centered
+        self._moments += (centered.sum(), squared.sum(), (squared * centered).sum(), (squared * squared).sum())
+        self._peak = max(self._peak, float(np.abs(centered).max()))
+        self.samples += chunk.size
+
+    def _transform(self, segments: np.ndarray):
+        detrended = segments - segments.mean(axis=1, keepdims=True)
+        spectrum = np.fft.rfft(detrended * self.window, axis=1)
+        self._power_sum += (spectrum.real ** 2 + spectrum.imag ** 2).sum(axis=0)
+
+        envelope = np.abs(np.fft.ifft(spectrum[:, self.band_start:self.band_stop], axis=1))
+        envelope -= envelope.mean(axis=1, keepdims=True)
+        self._envelope_sum += np.abs(np.fft.rfft(envelope * self.envelope_window, axis=1)).sum(axis=0)
+        self.segments += segments.shape[0]
+
+    def add(self, chunk: np.ndarray):
+        """Feed the next samples"""
+        chunk = np.asarray(chunk, dtype=np.float64).ravel()
+        if chunk.size == 0:
+            return
+        if not np.isfinite(chunk).all():
+            raise ValueError("Vibration data contains NaN or infinite values")
+        self._update_statistics(chunk)
+
+        buffer = np.concatenate((self._tail, chunk)) if self._tail.size else chunk
+        count = (buffer.size - self.segment_size) // self.step + 1 if buffer.size >= self.segment_size else 0
+        if count:
+            segments = np.lib.stride_tricks.sliding_window_view(buffer, self.segment_size)[::self.step][:count]
+            for start in range(0, count, self.segments_per_block):
+                self._transform(segments[start:start + self.segments_per_block])
+        self._tail = buffer[count * self.step:].copy()
+
+    def finish(self) -> Dict[str, np.ndarray]:
+        """Averaged spectra and signal statistics"""
+        if self.segments == 0:
+            if self._tail.size < self.segment_size // 4:
+                raise ValueError(f"Vibration capture too short: need at least {self.segment_size // 4} samples")
+            padded = np.zeros(self.segment_size)
+            padded[:self._tail.size] = self._tail - self._tail.mean()
+            self._transform(padded[np.newaxis, :])
+
+        n = self.samples
+        mean = self._moments[0] / n
+        m2 = self._moments[1] / n - mean ** 2
+        m4 = (self._moments[3] / n - 4 * mean * self._moments[2] / n
+              + 6 * mean ** 2 * self._moments[1] / n - 3 * mean ** 4)
+        rms = math.sqrt(max(m2, 0.0))
+        envelope_rate = self.sample_rate * (self.band_stop - self.band_start) / self.segment_size
+        return {
+            "frequencies": np.fft.rfftfreq(self.segment_size, 1.0 / self.sample_rate),
+            "power": self._power_sum / self.segments,
+            "envelope_frequencies": np.fft.rfftfreq(self.band_stop - self.band_start, 1.0 / envelope_rate),
+            "envelope": self._envelope_sum / self.segments,
+            "rms": rms,
+            "peak": self._peak,
+            "kurtosis": m4 / m2 ** 2 if m2 > 0 else 0.0
+        }
+
+
+def match_defect_frequencies(frequencies: np.ndarray, amplitudes: np.ndarray,
+                             defect_frequencies: Dict[str, float],
+                             harmonics: int = 3,
+                             tolerance: float = 0.03,
+                             snr_threshold_db: float = 6.0) -> List[DefectFrequencyMatch]:
+    """
+    Look for each defect frequency and its harmonics in an envelope spectrum
+
+    A harmonic counts when the strongest bin within ``tolerance`` (slip makes
+    real frequencies run a few percent low) stands ``snr_threshold_db`` above
+    the local median. A defect is detected when its fundamental or two
+    harmonics are found.
+    """
+    resolution = frequencies[1] - frequencies[0]
+    matches = []
+    for name in DEFECT_NAMES:
+        frequency = defect_frequencies[name]
+        found = 0
+        fundamental_snr, fundamental_peak = None, None
+        for harmonic in range(1, harmonics + 1):
+            target = frequency * harmonic
+            half_width = max(tolerance * target, 2 * resolution)
+            low, high = np.searchsorted(frequencies, (target - half_width, target + half_width))
+            if high <= low or high >= frequencies.size:
+                break
+            peak_index = low + int(np.argmax(amplitudes[low:high]))
+            context = 25
+            neighbourhood = np.concatenate((amplitudes[max(1, low - context):low], amplitudes[high:high + context]))
+            noise = float(np.median(neighbourhood)) if neighbourhood.size else float(np.median(amplitudes))
+            snr_db = 20.0 * math.log10(amplitudes[peak_index] / noise) if noise > 0 else 0.0
+            if harmonic == 1:
+                fundamental_snr, fundamental_peak = snr_db, float(frequencies[peak_index])
+            if snr_db >= snr_threshold_db:
+                found += 1
+        fundamental_found = fundamental_snr is not None and fundamental_snr >= snr_threshold_db
+        matches.append(DefectFrequencyMatch(
+            name=name,
+            frequency_hz=round(frequency, 2),
+            detected=fundamental_found or found >= 2,
+            harmonics_detected=found,
+            peak_frequency_hz=round(fundamental_peak, 2) if fundamental_peak is not None else None,
+            snr_db=round(fundamental_snr, 1) if fundamental_snr is not None else None
+        ))
+    return matches
+
+
+def dominant_peaks(frequencies: np.ndarray, amplitudes: np.ndarray, count: int = 5) -> List[float]:
+    """Frequencies of the strongest local maxima, strongest first (DC leakage excluded)"""
+    if amplitudes.size < 6:
+        return []
+    inner = amplitudes[3:-1]
+    is_peak = (inner > amplitudes[2:-2]) & (inner >= amplitudes[4:])
+    indices = np.nonzero(is_peak)[0] + 3
+    strongest = indices[np.argsort(amplitudes[indices])[::-1][:count]]
+    return [round(float(frequencies[index]), 2) for index in strongest]
+
+
+def summarize(findings: VibrationFindings) -> str:
+    """One-paragraph reading of the findings, also used as prompt context"""
+    impulsive = findings.kurtosis > 4.0 or findings.crest_factor > 5.0
+    parts = [f"RMS {findings.rms:.3g}, crest factor {findings.crest_factor:.1f}, kurtosis {findings.kurtosis:.1f}"
+             f" ({'impulsive, typical of localized defects' if impulsive else 'not impulsive'})."]
+    detected = [match for match in findings.defect_frequencies if match.detected]
+    if detected:
+        parts.append("Envelope spectrum shows " + "; ".join(
+            f"{match.name} {match.frequency_hz:g} Hz ({DEFECT_DESCRIPTIONS[match.name]}, "
+            f"{match.harmonics_detected} harmonics, {match.snr_db:g} dB)" for match in detected) + ".")
+    else:
+        parts.append("No bearing defect frequency stands out in the envelope spectrum.")
+    return " ".join(parts)
+
+
+def analyze_vibration(chunks: Iterable[np.ndarray],
+                      sample_rate: Optional[float],
+                      shaft_speed_hz: float,
+                      geometry: BearingGeometry,
+                      geometry_source: str = "provided",
+                      envelope_band: Optional[Tuple[float, float]] = None,
+                      timestamps: Optional[List[float]] = None) -> VibrationFindings:
+    """
+    Spectra, statistics and defect-frequency matches of a capture
+
+    Args:
+        chunks: Signal samples in order, e.g. from iter_signal_chunks
+        sample_rate: Samples per second; None infers it from ``timestamps``
+        shaft_speed_hz: Shaft rotation frequency (rpm / 60)
+        geometry: Bearing geometry for the defect frequencies
+        geometry_source: Where the geometry came from, reported back
+        envelope_band: Demodulation band in Hz (default: 15-40% of the sample rate)
+        timestamps: List the chunk reader fills from a time column
+    """
+    start = time.perf_counter()
+    if shaft_speed_hz <= 0:
+        raise ValueError("Shaft speed must be positive")
+
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        raise ValueError("Vibration capture is empty")
+    if sample_rate is None:
+        sample_rate = infer_sample_rate(timestamps or [])
+        if sample_rate is None:
+            raise ValueError("Give the sample rate, or a CSV whose first column is time in seconds")
+
+    segment_size = settings.VIBRATION_SEGMENT_SIZE
+    accumulator = SpectrumAccumulator(sample_rate, segment_size, settings.VIBRATION_OVERLAP, envelope_band)
+    accumulator.add(first)
+    for chunk in chunks:
+        accumulator.add(chunk)
+    spectra = accumulator.finish()
+
+    defect_frequencies = geometry.defect_frequencies(shaft_speed_hz)
+    matches = match_defect_frequencies(
+        spectra["envelope_frequencies"], spectra["envelope"], defect_frequencies,
+        harmonics=settings.VIBRATION_HARMONICS,
+        tolerance=settings.VIBRATION_DEFECT_TOLERANCE,
+        snr_threshold_db=settings.VIBRATION_SNR_THRESHOLD_DB
+    )
+    rms = spectra["rms"]
+    findings = VibrationFindings(
+        sample_rate_hz=sample_rate,
+        samples=accumulator.samples,
+        duration_s=round(accumulator.samples / sample_rate, 3),
+        shaft_speed_hz=round(shaft_speed_hz, 3),
+        geometry_source=geometry_source,
+        rms=round(rms, 6),
+        peak=round(spectra["peak"], 6),
+        crest_factor=round(spectra["peak"] / rms, 2) if rms > 0 else 0.0,
+        kurtosis=round(spectra["kurtosis"], 2),
+        frequency_resolution_hz=round(sample_rate / segment_size, 4),
+        envelope_band_hz=[round(edge, 1) for edge in accumulator.envelope_band],
+        defect_frequencies=matches,
+        dominant_envelope_peaks_hz=dominant_peaks(spectra["envelope_frequencies"], spectra["envelope"]),
+        processing_time_ms=0.0,
+        summary=""
+    )
+    findings.summary = summarize(findings)
+    findings.processing_time_ms = round((time.perf_counter() - start) * 1000, 2)
+    return findings
+
+
+def resolve_geometry(bearing_type: Optional[str],
+                     rolling_elements: Optional[int] = None,
+                     element_diameter_mm: Optional[float] = None,
+                     pitch_diameter_mm: Optional[float] = None,
+                     contact_angle_deg: Optional[float] = None,
+                     designation: Optional[str] = None,
+                     catalog: Optional[BearingCatalog] = None) -> Tuple[BearingGeometry, str]:
+    """Geometry given by the caller, from the catalog by designation, or the default for the bearing type"""
+    given = (rolling_elements, element_diameter_mm, pitch_diameter_mm)
+    if all(value is not None for value in given):
+        return BearingGeometry(rolling_elements, element_diameter_mm, pitch_diameter_mm,
+                               contact_angle_deg or 0.0), "provided"
+    if any(value is not None for value in given):
+        raise ValueError("Give rolling_elements, element_diameter_mm and pitch_diameter_mm together")
+    if designation:
+        row = catalog.resolve(designation) if catalog is not None else None
+        if row is None:
+            raise ValueError(f"Unknown bearing designation: {designation}")
+        entry = catalog.entry(row)
+        geometry = BearingGeometry(entry["rolling_elements"], entry["element_diameter_mm"],
+                                   entry["pitch_diameter_mm"], entry["contact_angle_deg"])
+        return geometry, f"catalog {entry['designation']} ({entry['source']})"
+    bearing_type = bearing_type or "ball_bearing"
+    return DEFAULT_GEOMETRIES[bearing_type], f"typical {bearing_type} (approximate)"
+
+
+def infer_sample_rate(timestamps: List[float]) -> Optional[float]:
+    """Sample rate from a time column, or None if it is not usable"""
+    if len(timestamps) < 3:
+        return None
+    # Over the whole span, so rounding of the printed times averages out
+    step = (timestamps[-1] - timestamps[0]) / (len(timestamps) - 1)
+    return 1.0 / step if step > 0 else None
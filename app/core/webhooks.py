@@ -0,0 +1,414 @@
+"""
+Webhook Delivery
+Notifies callback URLs of finished analyses through a persistent outbox
+"""
+
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import DefaultResolver
+
+from app.core.config import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id TEXT NOT NULL UNIQUE,
+    event_type TEXT NOT NULL,
+    url TEXT NOT NULL,
+    payload_json TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    delivered_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at);
+"""
+
+PENDING = "pending"
+DELIVERED = "delivered"
+FAILED = "failed"
+
+
+class InvalidCallbackUrl(ValueError):
+    """Raised for callback URLs the API will not deliver to"""
+
+
+def is_public_address(address: str) -> bool:
+    """False for loopback, link-local, private, reserved and multicast addresses"""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])  # IPv6 scope ids are not part of the address
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def check_callback_host(host: str, port: int):
+    """Reject a host unless every address it resolves to is public"""
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)}
+    except (socket.gaierror, UnicodeError):
+        raise InvalidCallbackUrl(f"Callback host cannot be resolved: {host}")
+    blocked = sorted(address for address in addresses if not is_public_address(address))
+    if blocked:
+        raise InvalidCallbackUrl(f"Callback host {host} resolves to a non-public address ({blocked[0]})")
+
+
+def validate_callback_url(url: str) -> str:
+    """
+    Check a client-supplied callback URL
+
+    Only http(s) URLs to hosts that resolve to public addresses are
+    accepted, so callbacks cannot be aimed at the server itself, cloud
+    metadata endpoints or internal services. WEBHOOK_ALLOWED_HOSTS narrows
+    the hosts further; WEBHOOK_ALLOW_PRIVATE_ADDRESSES lifts the address
+    check for receivers on an internal network. Resolves the host, so it
+    blocks; call it off the event loop.
+    """
+    parts = urlsplit(url.strip())
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise InvalidCallbackUrl(f"Callback URL must be an absolute http(s) URL: {url}")
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError:
+        raise InvalidCallbackUrl(f"Callback URL has an invalid port: {url}")
+    allowed = [host.strip().lower() for host in settings.WEBHOOK_ALLOWED_HOSTS.split(",") if host.strip()]
+    if allowed and parts.hostname.lower() not in allowed:
+        raise InvalidCallbackUrl(f"Callback host not allowed: {parts.hostname}")
+    if not settings.WEBHOOK_ALLOW_PRIVATE_ADDRESSES:
+        check_callback_host(parts.hostname, port)
+    return url.strip()
+
+
+class PublicAddressResolver(AbstractResolver):
+    """
+    Resolver for deliveries that refuses hosts with non-public addresses.
+
+    URLs are checked when submitted, but a host can be re-pointed at an
+    internal address before delivery; resolving again here closes that gap.
+    """
+
+    def __init__(self):
+        self._resolver = DefaultResolver()
+
+    async def resolve(self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET):
+        results = await self._resolver.resolve(host, port, family)
+        for result in results:
+            if not is_public_address(result["host"]):
+                raise OSError(f"{host} resolves to a non-public address ({result['host']})")
+        return results
+
+    async def close(self):
+        await self._resolver.close()
+
+
+def sign_payload(body: bytes, secret: str) -> str:
+    """HMAC-SHA256 signature sent as X-Webhook-Signature"""
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+class WebhookOutbox:
+    """
+    Events waiting for delivery, in SQLite.
+
+    Events are written before the API moves on, so notifications survive a
+    restart. Claiming a batch pushes its next attempt out by a lease, which
+    keeps a second dispatcher (or a crashed one's leftovers) from sending the
+    same events twice while the first is still delivering them.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+        self._connection.commit()
+
+    def enqueue(self, url: str, event_type: str, data: Dict[str, Any]) -> str:
+        """Store one event for a URL and return its event id"""
+        event_id = uuid.uuid4().hex
+        now = time.time()
+        payload = {
+            "id": event_id,
+            "type": event_type,
+            "created_at": datetime.fromtimestamp(now, timezone.utc).isoformat(),
+            "data": data
+        }
+        with self._lock:
+            self._connection.execute(
+                """INSERT INTO outbox (event_id, event_type, url, payload_json, created_at, next_attempt_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (event_id, event_type, url, json.dumps(payload, default=str), now, now)
+            )
+            self._connection.commit()
+        return event_id
+
+    async def enqueue_async(self, *args, **kwargs) -> str:
+        return await asyncio.to_thread(self.enqueue, *args, **kwargs)
+
+    def claim(self, limit: int, lease_seconds: float) -> List[sqlite3.Row]:
+        """Take up to limit due events, oldest first, for lease_seconds"""
+        now = time.time()
+        with self._lock:
+            rows = self._connection.execute(
+                """SELECT id, url, payload_json, attempts FROM outbox
+                   WHERE status = ? AND next_attempt_at <= ?
+                   ORDER BY next_attempt_at, id LIMIT ?""",
+                (PENDING, now, limit)
+            ).fetchall()
+            if rows:
+                self._connection.executemany(
+                    "UPDATE outbox SET next_attempt_at = ? WHERE id = ?",
+                    [(now + lease_seconds, row["id"]) for row in rows]
+                )
+                self._connection.commit()
+        return rows
+
+    def mark_delivered(self, ids: List[int]):
+        now = time.time()
+        with self._lock:
+            self._connection.executemany(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, delivered_at = ?, last_error = NULL "
+                "WHERE id = ?",
+                [(DELIVERED, now, event_id) for event_id in ids]
+            )
+            self._connection.commit()
+
+    def mark_failed_attempt(self, ids: List[int], error: str, retry_at: Optional[float]):
+        """Record a failed attempt; retry_at None gives the events up"""
+        with self._lock:
+            if retry_at is None:
+                self._connection.executemany(
+                    "UPDATE outbox SET status = ?, attempts = attempts + 1, last_error = ? WHERE id = ?",
+                    [(FAILED, error, event_id) for event_id in ids]
+                )
+            else:
+                self._connection.executemany(
+                    "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                    [(retry_at, error, event_id) for event_id in ids]
+                )
+            self._connection.commit()
+
+    def purge_delivered(self, older_than_seconds: float) -> int:
+        """Delete delivered events older than the given age"""
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM outbox WHERE status = ? AND delivered_at < ?",
+                (DELIVERED, time.time() - older_than_seconds)
+            )
+            self._connection.commit()
+            return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._connection.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        counts = {PENDING: 0, DELIVERED: 0, FAILED: 0}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+
+class WebhookDispatcher:
+    """
+    Background delivery of outbox events.
+
+    Due events are claimed in batches and grouped by URL; each group is
+    POSTed as ``{"events": [...]}`` in chunks of ``batch_size``, so a burst
+    of finished jobs costs the receiver a few requests rather than one per
+    image. A pooled aiohttp session bounds concurrent connections. Failed
+    deliveries are retried with exponential backoff and jitter until
+    ``max_attempts``, then left in the outbox as failed. Redirects are not
+    followed, and unless ``allow_private_addresses`` only public addresses
+    are connected to.
+    """
+
+    def __init__(self,
+                 outbox: WebhookOutbox,
+                 batch_size: int = 20,
+                 max_attempts: int = 8,
+                 backoff_base: float = 2.0,
+                 backoff_max: float = 600.0,
+                 timeout: float = 10.0,
+                 concurrency: int = 16,
+                 poll_interval: float = 5.0,
+                 secret: Optional[str] = None,
+                 retention_seconds: float = 7 * 86400,
+                 allow_private_addresses: bool = False):
+        self.outbox = outbox
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.secret = secret
+        self.retention_seconds = retention_seconds
+        self.allow_private_addresses = allow_private_addresses
+        self._purged_at = 0.0
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self.requests_sent = 0
+        self.events_delivered = 0
+        self.delivery_errors = 0
+        self.events_given_up = 0
+
+    async def enqueue(self, url: str, event_type: str, data: Dict[str, Any]) -> str:
+        """Store an event and wake the dispatcher"""
+        event_id = await self.outbox.enqueue_async(url, event_type, data)
+        self._wake.set()
+        return event_id
+
+    def start(self):
+        """Start delivering on the running event loop"""
+        if self._task is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.concurrency,
+                    limit_per_host=max(1, self.concurrency // 2),
+                    resolver=None if self.allow_private_addresses else PublicAddressResolver()
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"User-Agent": "bearing-fault-analysis-webhooks/1.0"}
+            )
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop delivering; undelivered events stay in the outbox for the next start"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _run(self):
+        while True:
+            try:
+                delivered = await self.dispatch_once()
+            except Exception as e:
+                print(f"⚠️  Webhook dispatch failed: {e}")
+                delivered = 0
+            if time.monotonic() - self._purged_at > 3600:
+                self._purged_at = time.monotonic()
+                await asyncio.to_thread(self.outbox.purge_delivered, self.retention_seconds)
+            if delivered == 0:
+                # Idle: sleep until an event is enqueued or a retry may be due
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def dispatch_once(self) -> int:
+        """Claim due events and deliver them; returns the number of events handled"""
+        lease = self.timeout * 2 + 5.0
+        rows = await asyncio.to_thread(self.outbox.claim, self.batch_size * self.concurrency, lease)
+        if not rows:
+            return 0
+
+        by_url: Dict[str, List[sqlite3.Row]] = {}
+        for row in rows:
+            by_url.setdefault(row["url"], []).append(row)
+        chunks = [(url, events[i:i + self.batch_size])
+                  for url, events in by_url.items()
+                  for i in range(0, len(events), self.batch_size)]
+        await asyncio.gather(*(self._deliver(url, events) for url, events in chunks))
+        return len(rows)
+
+    async def _deliver(self, url: str, events: List[sqlite3.Row]):
+        """POST one chunk of events and record the outcome"""
+        body = ('{"events": [' + ", ".join(row["payload_json"] for row in events) + "]}").encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.secret:
+            headers["X-Webhook-Signature"] = sign_payload(body, self.secret)
+
+        error = None
+        try:
+            self.requests_sent += 1
+            # A redirect is a failure: following it could reach an internal address
+            async with self._session.post(url, data=body, headers=headers, allow_redirects=False) as response:
+                await response.read()
+                if not 200 <= response.status < 300:
+                    error = f"HTTP {response.status}"
+        except asyncio.TimeoutError:
+            error = "timeout"
+        except aiohttp.ClientError as e:
+            error = f"{type(e).__name__}: {e}"
+
+        ids = [row["id"] for row in events]
+        if error is None:
+            self.events_delivered += len(ids)
+            await asyncio.to_thread(self.outbox.mark_delivered, ids)
+            return
+
+        self.delivery_errors += 1
+        # Events of one chunk are claimed together, so they share an attempt count
+        attempts = max(row["attempts"] for row in events) + 1
+        if attempts >= self.max_attempts:
+            self.events_given_up += len(ids)
+            print(f"⚠️  Giving up on {len(ids)} webhook events for {url} after {attempts} attempts: {error}")
+            await asyncio.to_thread(self.outbox.mark_failed_attempt, ids, error, None)
+            return
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        retry_at = time.time() + delay * random.uniform(0.5, 1.0)
+        await asyncio.to_thread(self.outbox.mark_failed_attempt, ids, error, retry_at)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "outbox": self.outbox.counts(),
+            "requests_sent": self.requests_sent,
+            "events_delivered": self.events_delivered,
+            "delivery_errors": self.delivery_errors,
+            "events_given_up": self.events_given_up
+        }
+
+
+def create_webhook_dispatcher() -> Optional[WebhookDispatcher]:
+    """Build the dispatcher from settings; None when webhooks are disabled"""
+    if not settings.WEBHOOKS_ENABLED:
+        return None
+    try:
+        outbox = WebhookOutbox(settings.WEBHOOK_OUTBOX_PATH)
+    except Exception as e:
+        print(f"⚠️  Failed to open webhook outbox: {e}")
+        return None
+    return WebhookDispatcher(
+        outbox,
+        batch_size=settings.WEBHOOK_BATCH_SIZE,
+        max_attempts=settings.WEBHOOK_MAX_ATTEMPTS,
+        backoff_base=settings.WEBHOOK_BACKOFF_BASE_SECONDS,
+        backoff_max=settings.WEBHOOK_BACKOFF_MAX_SECONDS,
+        timeout=settings.WEBHOOK_TIMEOUT_SECONDS,
+        concurrency=settings.WEBHOOK_CONCURRENCY,
+        poll_interval=settings.WEBHOOK_POLL_INTERVAL_SECONDS,
+        secret=settings.WEBHOOK_SECRET,
+        retention_seconds=settings.WEBHOOK_RETENTION_HOURS * 3600,
+        allow_private_addresses=settings.WEBHOOK_ALLOW_PRIVATE_ADDRESSES
+    )
@@ -1,27 +1,92 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-from app.api.routes import health_router, analysis_router
+from app.api.middleware import ApiKeyMiddleware, CompressionMiddleware, SlowRequestMiddleware
+from app.api.responses import CompactJSONResponse, ContentNegotiationMiddleware
+from app.api.routes import (
+    health_router,
+    analysis_router,
+    history_router,
+    bearing_router,
+    admin_router,
+    asset_router,
+    usage_tracker,
+    api_key_store,
+    webhook_dispatcher,
+    image_store,
+    slow_request_log
+)
 from app.core.config import settings
 
 app = FastAPI(
     title="Bearing Fault Analysis API",
     description="Specialist-level bearing fault diagnosis using Google's Gemini AI",
-    version="2.0.0"
+    version="2.0.0",
+    # orjson rendering, and MessagePack for clients that ask for it
+    default_response_class=CompactJSONResponse
 )
 
-# Add CORS middleware
+# Let each request choose JSON or MessagePack (Accept header)
+app.add_middleware(ContentNegotiationMiddleware)
+
+# Require an API key on everything but the docs and health check
+if settings.AUTH_ENABLED:
+    app.add_middleware(
+        ApiKeyMiddleware,
+        key_store=api_key_store,
+        exempt_paths=["/", "/docs", "/docs/oauth2-redirect", "/redoc", "/openapi.json", "/api/v1/health"]
+    )
+
+# Compress large responses (history pages, batch results, exports)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY
+    )
+
+# Add CORS middleware (added last so it wraps authentication, and 401s carry CORS headers)
+cors_origins = [origin.strip() for origin in settings.CORS_ALLOW_ORIGINS.split(",") if origin.strip()]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
+    allow_origins=cors_origins,
+    # Browsers reject credentials with a wildcard origin
+    allow_credentials="*" not in cors_origins,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# Time every request and keep the slow ones (outermost, so the whole request is measured)
+if slow_request_log is not None:
+    app.add_middleware(SlowRequestMiddleware, log=slow_request_log, exempt_prefixes=["/api/v1/admin/"])
+
 # Include routers
 app.include_router(health_router, prefix="/api/v1")
 app.include_router(analysis_router, prefix="/api/v1")
+app.include_router(history_router, prefix="/api/v1")
+app.include_router(bearing_router, prefix="/api/v1")
+app.include_router(asset_router, prefix="/api/v1")
+# Admin endpoints expose other tenants' requests; they need an admin API key
+if settings.AUTH_ENABLED:
+    app.include_router(admin_router, prefix="/api/v1")
+
+@app.on_event("startup")
+async def start_background_tasks():
+    usage_tracker.start()
+    if webhook_dispatcher is not None:
+        # Also delivers events left in the outbox by the previous run
+        webhook_dispatcher.start()
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    # Write usage counted since the last periodic flush
+    await usage_tracker.stop()
+    if webhook_dispatcher is not None:
+        await webhook_dispatcher.stop()
+    if image_store is not None:
+        # Finish writing images of the last requests
+        await image_store.flush()
 
 @app.get("/")
 async def root():
@@ -30,7 +95,8 @@ async def root():
         "version": "2.0.0",
         "docs": "/docs",
         "health": "/api/v1/health",
-        "analyze": "/api/v1/analyze-image"
+        "analyze": "/api/v1/analyze-image",
+        "history": "/api/v1/analyses"
     }
 
 if __name__ == "__main__":
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
 from typing import List, Optional, Dict, Any
 from enum import Enum
 from datetime import datetime
@@ -11,6 +11,10 @@ class BearingType(str, Enum):
     SPHERICAL_BEARING = "spherical_bearing"
     TAPERED_ROLLER = "tapered_roller"
 
+class RequestPriority(str, Enum):
+    INTERACTIVE = "interactive"
+    BATCH = "batch"
+
 class ImageAnalysisRequest(BaseModel):
     """Request model for image analysis"""
     bearing_type: Optional[BearingType] = None
@@ -26,6 +30,113 @@ class BearingAnalysisResult(BaseModel):
     confidence_score: float = Field(ge=0.0, le=1.0)
     technical_notes: Optional[str] = None
     recommendations: List[str] = []
+    location_hints: List[str] = []  # Image regions the findings come from (tiled analysis)
+    failure_mode_code: Optional[str] = None  # Canonical taxonomy code (app.core.taxonomy)
+    root_cause_codes: List[str] = []
+
+class TokenUsage(BaseModel):
+    """Model tokens consumed by one analysis, summed over its model calls"""
+    prompt_tokens: int = 0  # Text part of the prompt
+    image_tokens: int = 0
+    output_tokens: int = 0
+    model_calls: int = 0
+    
+    @computed_field
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.image_tokens + self.output_tokens
+    
+    def add(self, other: Optional["TokenUsage"]) -> "TokenUsage":
+        """Accumulate another usage into this one"""
+        if other is not None:
+            self.prompt_tokens += other.prompt_tokens
+            self.image_tokens += other.image_tokens
+            self.output_tokens += other.output_tokens
+            self.model_calls += other.model_calls
+        return self
+
+class DefectFrequencyMatch(BaseModel):
+    """One bearing defect frequency looked up in the envelope spectrum"""
+    name: str  # BPFO, BPFI, BSF or FTF
+    frequency_hz: float
+    detected: bool
+    harmonics_detected: int = 0
+    peak_frequency_hz: Optional[float] = None
+    snr_db: Optional[float] = None
+
+class VibrationFindings(BaseModel):
+    """Compact results of a vibration capture analysis"""
+    sample_rate_hz: float
+    samples: int
+    duration_s: float
+    shaft_speed_hz: float
+    geometry_source: str
+    rms: float
+    peak: float
+    crest_factor: float
+    kurtosis: float
+    frequency_resolution_hz: float
+    envelope_band_hz: List[float]
+    defect_frequencies: List[DefectFrequencyMatch]
+    dominant_envelope_peaks_hz: List[float] = []
+    processing_time_ms: float
+    summary: str
+
+class BearingCatalogEntry(BaseModel):
+    """Geometry of one catalog bearing"""
+    designation: str
+    bearing_type: BearingType
+    rolling_elements: int
+    element_diameter_mm: float
+    pitch_diameter_mm: float
+    contact_angle_deg: float
+    source: str  # published, nominal (estimated from boundary dimensions) or provided
+    defect_orders: Dict[str, float]  # Defect frequencies per shaft revolution
+
+class DefectFrequencyRequest(BaseModel):
+    """Bearings and shaft speeds to compute defect frequencies for"""
+    designations: List[str] = Field(..., min_length=1)
+    shaft_rpm: List[float] = Field(..., min_length=1)
+    pairwise: bool = False  # Pair designations[i] with shaft_rpm[i] instead of every speed for every bearing
+
+class DefectFrequencyResponse(BaseModel):
+    """Defect frequencies in columns: one list per defect, indexed by bearing (then speed)"""
+    designations: List[str]  # Requested designations that were found, in request order
+    catalog_designations: List[str]
+    bearing_types: List[BearingType]
+    shaft_rpm: List[float]
+    pairwise: bool
+    frequencies_hz: Dict[str, List[Any]]
+    unknown: List[str] = []
+
+class SelfConsistency(BaseModel):
+    """Votes of the samples behind a low-confidence answer"""
+    samples: int  # Model answers considered, the first one included
+    agreement: float  # Share of samples with the returned failure mode
+    votes: Dict[str, int]  # Failure mode code -> samples
+    stopped_early: bool  # Two samples agreed before all were in
+
+class AssetStatus(str, Enum):
+    HEALTHY = "healthy"
+    WATCH = "watch"
+    WARNING = "warning"
+    CRITICAL = "critical"
+
+class AssetTrend(BaseModel):
+    """Degradation trend of one asset, kept up to date as its analyses arrive"""
+    asset_id: str
+    tenant: str
+    status: AssetStatus
+    degradation_index: float  # 0 (no damage) to 1 (fracture), smoothed over the asset's analyses
+    peak_index: float
+    trend_per_30_days: Optional[float] = None  # Fitted change in damage score; None before two scored analyses
+    days_to_critical: Optional[float] = None  # At the current trend, when it is rising
+    analyses: int
+    scored_analyses: int  # Analyses with a failure mode that says something about the bearing
+    first_seen: datetime
+    last_seen: datetime
+    last_failure_mode_code: Optional[str] = None
+    last_analysis_id: Optional[int] = None
 
 class AnalysisResponse(BaseModel):
     """Complete analysis response"""
@@ -33,11 +144,98 @@ class AnalysisResponse(BaseModel):
     processing_time: float
     model_used: str
     timestamp: datetime = Field(default_factory=datetime.now)
+    analysis_id: Optional[int] = None  # History store id, when history is enabled
+    prompt_variant: Optional[str] = None
+    usage: Optional[TokenUsage] = None
+    vibration: Optional[VibrationFindings] = None  # When a vibration capture was sent with the image
+    self_consistency: Optional[SelfConsistency] = None  # When a low-confidence answer was re-sampled
+    asset_trend: Optional[AssetTrend] = None  # Updated trend, when the image was sent with an asset_id
     
     model_config = {
         "protected_namespaces": ()
     }
 
+class AnalysisRecord(BaseModel):
+    """Stored analysis with the inputs it was run with"""
+    id: int
+    created_at: datetime
+    image_digest: str
+    bearing_type: Optional[BearingType] = None
+    mounted_on_motor: Optional[bool] = None
+    application: Optional[str] = None
+    tenant: Optional[str] = None
+    asset_id: Optional[str] = None
+    model_used: str
+    processing_time: float
+    analysis: BearingAnalysisResult
+    
+    model_config = {
+        "protected_namespaces": ()
+    }
+
+class AnalysisListResponse(BaseModel):
+    """One page of stored analyses"""
+    items: List[AnalysisRecord]
+    next_cursor: Optional[int] = None
+    limit: int
+
+class AnalysisSummaryGroup(BaseModel):
+    """Aggregate for one group of stored analyses"""
+    key: Optional[str] = None
+    count: int
+    mean_confidence: float
+
+class AnalysisSummaryResponse(BaseModel):
+    """Counts of stored analyses grouped by one field"""
+    group_by: str
+    total: int
+    groups: List[AnalysisSummaryGroup]
+
+class UsageGroup(BaseModel):
+    """Token usage for one tenant, prompt variant, model or period"""
+    key: Optional[str] = None
+    requests: int
+    model_calls: int
+    prompt_tokens: int
+    image_tokens: int
+    output_tokens: int
+    total_tokens: int
+    estimated_cost_usd: Optional[float] = None
+
+class UsageReportResponse(BaseModel):
+    """Token usage grouped by one field"""
+    group_by: str
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    groups: List[UsageGroup]
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class JobInfo(BaseModel):
+    """State of an asynchronous analysis job"""
+    job_id: str
+    batch_id: str
+    status: JobStatus = JobStatus.QUEUED
+    filename: Optional[str] = None
+    tenant: Optional[str] = None
+    callback_url: Optional[str] = None
+    submitted_at: datetime = Field(default_factory=datetime.now)
+    completed_at: Optional[datetime] = None
+    result: Optional[AnalysisResponse] = None
+    error: Optional[str] = None
+
+class BatchStatusResponse(BaseModel):
+    """Jobs submitted together in one request"""
+    batch_id: str
+    total: int
+    completed: int
+    failed: int
+    jobs: List[JobInfo]
+
 class HealthResponse(BaseModel):
     """Health check response"""
     status: str
@@ -47,4 +245,46 @@ class HealthResponse(BaseModel):
     
     model_config = {
         "protected_namespaces": ()
-    } 
\ No newline at end of file
+    } 
+class RequestStage(BaseModel):
+    """One timed stage of a request"""
+    name: str  # e.g. queue_wait, triage, model_call, parse, history_write
+    start_ms: float  # Offset from the start of the request
+    duration_ms: float
+
+class SlowRequestCapture(BaseModel):
+    """A request slower than SLOW_REQUEST_THRESHOLD_MS"""
+    started_at: datetime
+    method: str
+    path: str
+    status_code: Optional[int] = None
+    tenant: Optional[str] = None
+    duration_ms: float
+    stages: List[RequestStage]
+    notes: Dict[str, List[str]] = Field(default_factory=dict)  # e.g. model_response, truncated
+
+class SlowRequestListResponse(BaseModel):
+    """Captured slow requests, newest first"""
+    threshold_ms: float
+    captured: int  # Captured since start, including those dropped from the buffer
+    items: List[SlowRequestCapture]
+
+class AssetTrendPoint(BaseModel):
+    """One analysis on an asset's timeline"""
+    analysis_id: int
+    created_at: datetime
+    failure_mode_code: Optional[str] = None
+    confidence_score: float
+    damage_extent: Optional[float] = None  # 0-1, from the damage description and affected regions
+    damage_score: Optional[float] = None  # Severity of the failure mode scaled by extent; None when not scored
+    degradation_index: Optional[float] = None  # Index after this analysis
+
+class AssetTrendResponse(BaseModel):
+    """An asset's trend with its latest timeline points, oldest first"""
+    trend: AssetTrend
+    points: List[AssetTrendPoint]
+
+class AssetListResponse(BaseModel):
+    """Tracked assets, most degraded first"""
+    total: int  # Assets matching the filters
+    items: List[AssetTrend]
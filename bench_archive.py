@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Packed archive benchmark
+Compares images/sec reading and decoding loose image files against a packed archive
+
+Modes:
+    list         find every image (loose: directory walk; packed: open the archive, list digests)
+    read         get the image bytes (loose: open + read; packed: index lookup + memoryview)
+    decode       the above plus a full PIL decode, as in the pre-processing path
+
+Without --images, a synthetic set of small JPEGs is generated in a
+temporary directory. Images are visited in random order, as in a
+re-analysis that resumes or samples; the page cache is warm after the first
+pass, so the numbers show per-file overhead rather than disk speed.
+
+Examples:
+    # 20000 synthetic 256 px JPEGs
+    python bench_archive.py --count 20000
+
+    # A real image tree, JSON report
+    python bench_archive.py --images archive/ --output bench_archive.json
+
+    # Generate the synthetic set on the filesystem under test (e.g. an NFS mount)
+    python bench_archive.py --workdir /mnt/nfs/scratch
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+# Add current directory to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+
+from app.core.image_archive import ArchiveWriter, ImageArchive
+from app.core.image_pipeline import decode_image
+from reanalyze_archive import find_images
+
+
+def synthesize(directory: Path, count: int, size: int, seed: int) -> List[Path]:
+    """Small noisy JPEGs, 100 per sub-directory like a camera export"""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 256, (size // 8, size // 8, 3), dtype=np.uint8)
+    paths = []
+    for index in range(count):
+        # Upscaled coarse noise plus fine noise: realistic JPEG sizes, every file distinct
+        pixels = np.kron(base, np.ones((8, 8, 1), dtype=np.uint8))
+        pixels = (pixels + rng.integers(0, 24, pixels.shape, dtype=np.uint8)).astype(np.uint8)
+        path = directory / f"{index // 100:04d}" / f"image_{index:06d}.jpg"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        Image.fromarray(pixels).save(path, "JPEG", quality=85)
+        paths.append(path)
+    return paths
+
+
+def runners(directory: Path, paths: List[Path], digests: List[str],
+            archive: ImageArchive) -> Dict[str, Callable[[], int]]:
+    """(mode, source) name -> function visiting every image once"""
+
+    def loose_list() -> int:
+        return len(find_images(directory))
+
+    def packed_list() -> int:
+        with ImageArchive(archive.path) as reopened:
+            return len(reopened.digests())
+
+    def loose_read() -> int:
+        return sum(len(path.read_bytes()) for path in paths)
+
+    def packed_read() -> int:
+        total = 0
+        for digest in digests:
+            view = archive.get(digest)
+            # Touch both ends so the pages are really mapped in
+            view[0], view[-1]
+            total += len(view)
+            view.release()
+        return total
+
+    def loose_decode() -> int:
+        return sum(decode_image(path.read_bytes()).size[0] for path in paths)
+
+    def packed_decode() -> int:
+        total = 0
+        for digest in digests:
+            view = archive.get(digest)
+            total += decode_image(view).size[0]
+            view.release()
+        return total
+
+    return {
+        "list loose": loose_list,
+        "list packed": packed_list,
+        "read loose": loose_read,
+        "read packed": packed_read,
+        "decode loose": loose_decode,
+        "decode packed": packed_decode
+    }
+
+
+def run(args: argparse.Namespace, workdir: Path) -> List[Dict]:
+    if args.images:
+        directory = args.images
+        paths = find_images(directory)[:args.count]
+        print(f"📸 {len(paths)} images from {directory}")
+    else:
+        directory = workdir / "images"
+        print(f"📸 Generating {args.count} {args.size}px JPEGs")
+        paths = synthesize(directory, args.count, args.size, args.seed)
+
+    start = time.perf_counter()
+    digests = []
+    with ArchiveWriter(workdir / "bench.pack") as writer:
+        for path in paths:
+            digests.append(writer.add(path.read_bytes(), {"path": str(path)})[0])
+    print(f"📦 Packed in {time.perf_counter() - start:.1f}s")
+
+    # Same random visiting order for both sources
+    order = list(range(len(paths)))
+    random.Random(args.seed).shuffle(order)
+    paths = [paths[i] for i in order]
+    digests = [digests[i] for i in order]
+
+    rows = []
+    with ImageArchive(workdir / "bench.pack") as archive:
+        for name, visit in runners(directory, paths, digests, archive).items():
+            mode = name.split()[0]
+            if mode not in args.modes:
+                continue
+            best = float("inf")
+            for _ in range(args.repeat):
+                begin = time.perf_counter()
+                visit()
+                best = min(best, time.perf_counter() - begin)
+            rows.append({"mode": mode, "source": name.split()[1], "images": len(paths),
+                         "seconds": best, "images_per_sec": len(paths) / best if best else 0.0})
+    return rows
+
+
+def print_table(rows: List[Dict]):
+    header = f"{'mode':<8} {'source':<8} {'images':>8} {'seconds':>9} {'img/s':>10}"
+    print(header)
+    print("-" * len(header))
+    baseline = {}
+    for row in rows:
+        if row["source"] == "loose":
+            baseline[row["mode"]] = row["seconds"]
+        line = (f"{row['mode']:<8} {row['source']:<8} {row['images']:>8} "
+                f"{row['seconds']:>9.3f} {row['images_per_sec']:>10,.0f}")
+        speedup = baseline.get(row["mode"], 0) / row["seconds"] if row["seconds"] else 0
+        print(line + (f"  ({speedup:.1f}x)" if row["source"] == "packed" and speedup else ""))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark a packed image archive against loose files")
+    parser.add_argument("--images", type=Path, help="Image directory to use instead of synthetic images")
+    parser.add_argument("--count", type=int, default=5000, help="Images (synthetic count, or a cap on --images)")
+    parser.add_argument("--size", type=int, default=256, help="Edge of synthetic images in pixels")
+    parser.add_argument("--modes", nargs="+", choices=["list", "read", "decode"], default=["list", "read", "decode"])
+    parser.add_argument("--workdir", type=Path, help="Where to put the synthetic images and the archive")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes per measurement (best is reported)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, help="Write the results as JSON here")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.images and not args.images.is_dir():
+        print(f"❌ Not a directory: {args.images}")
+        return 1
+
+    with tempfile.TemporaryDirectory(prefix="bench_archive_", dir=args.workdir) as workdir:
+        rows = run(args, Path(workdir))
+    print_table(rows)
+
+    if args.output:
+        args.output.write_text(json.dumps(rows, indent=2))
+        print(f"💾 Results written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+History summary benchmark
+Times the /analyses/summary queries on a large synthetic history database
+
+Each query runs through AnalysisHistoryStore.summarize, as the endpoint does,
+and is reported with the best of --repeat runs and SQLite's query plan, so
+a query that falls back to a table scan or a temporary sort shows up.
+
+Examples:
+    # 1M synthetic analyses in a temporary database
+    python bench_history.py --rows 1000000
+
+    # Keep the database for later runs (it is reused when it exists)
+    python bench_history.py --rows 1000000 --db /tmp/history_1m.db
+
+    # JSON report
+    python bench_history.py --output bench_history.json
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Add current directory to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+
+from app.core.history_store import GROUP_BY_COLUMNS, AnalysisFilters, AnalysisHistoryStore
+from app.core.taxonomy import TAXONOMY
+from app.models.fault_models import BearingType
+
+# Two years of analyses ending at this time
+END = datetime(2025, 1, 1)
+SPAN_DAYS = 730
+
+# (name, filters, group_by)
+QUERIES: List[Tuple[str, AnalysisFilters, str]] = [
+    ("all by failure_mode", AnalysisFilters(), "failure_mode"),
+    ("all by failure_mode_code", AnalysisFilters(), "failure_mode_code"),
+    ("all by month", AnalysisFilters(), "month"),
+    ("all by day", AnalysisFilters(), "day"),
+    ("fatigue by bearing_type", AnalysisFilters(failure_mode_code="fatigue"), "bearing_type"),
+    ("fatigue by month", AnalysisFilters(failure_mode_code="fatigue"), "month"),
+    ("roller+motor quarter by failure_mode",
+     AnalysisFilters(bearing_type="roller_bearing", mounted_on_motor=True, since=END - timedelta(days=91)),
+     "failure_mode"),
+    ("quarter by day", AnalysisFilters(since=END - timedelta(days=91)), "day"),
+    ("contamination quarter by bearing_type",
+     AnalysisFilters(failure_mode_code="contamination", since=END - timedelta(days=91)), "bearing_type")
+]
+
+
+def synthesize(db: Path, rows: int, seed: int):
+    """Insert synthetic analyses straight into the store's table"""
+    store = AnalysisHistoryStore(str(db))
+    existing = store.summarize(AnalysisFilters(), limit=1)[0]
+    if existing >= rows:
+        print(f"📂 Reusing {existing} analyses in {db}")
+        return
+    rng = random.Random(seed)
+    codes = list(TAXONOMY)
+    bearing_types = [bearing_type.value for bearing_type in BearingType]
+    start = END.timestamp() - SPAN_DAYS * 86400
+    print(f"📝 Generating {rows - existing} analyses in {db}")
+    connection = sqlite3.connect(str(db))
+    batch = []
+    for _ in range(rows - existing):
+        code = rng.choice(codes)
+        created_at = start + rng.random() * SPAN_DAYS * 86400
+        batch.append((
+            created_at,
+            datetime.utcfromtimestamp(created_at).strftime("%Y-%m-%d"),
+            datetime.utcfromtimestamp(created_at).strftime("%Y-%m"),
+            f"{rng.getrandbits(256):064x}",
+            rng.choice(bearing_types),
+            rng.randint(0, 1),
+            "synthetic",
+            "gemini-1.5-pro",
+            TAXONOMY[code],
+            round(rng.random(), 2),
+            1.0,
+            json.dumps({"observed_damage": "", "failure_mode": TAXONOMY[code], "root_cause_analysis": [],
+                        "confidence_score": 0.5, "failure_mode_code": code}),
+            code
+        ))
+        if len(batch) == 50000:
+            insert(connection, batch)
+            batch = []
+    insert(connection, batch)
+    connection.execute("ANALYZE")
+    connection.commit()
+    connection.close()
+
+
+def insert(connection: sqlite3.Connection, batch: List[Tuple]):
+    connection.executemany(
+        """INSERT INTO analyses (created_at, created_day, created_month, image_digest, bearing_type,
+           mounted_on_motor, application, model_used, failure_mode, confidence_score, processing_time,
+           result_json, failure_mode_code)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        batch
+    )
+    connection.commit()
+
+
+def query_plan(store: AnalysisHistoryStore, filters: AnalysisFilters, group_by: str) -> str:
+    where, params = filters.to_sql()
+    column = GROUP_BY_COLUMNS[group_by]
+    rows = sqlite3.connect(store.db_path).execute(
+        f"""EXPLAIN QUERY PLAN SELECT {column} AS key, COUNT(*), AVG(confidence_score)
+            FROM analyses WHERE {where} GROUP BY key""",
+        params
+    ).fetchall()
+    return "; ".join(row[-1] for row in rows)
+
+
+def run(args: argparse.Namespace, db: Path) -> List[Dict]:
+    synthesize(db, args.rows, args.seed)
+    store = AnalysisHistoryStore(str(db))
+    results = []
+    for name, filters, group_by in QUERIES:
+        best = float("inf")
+        for _ in range(args.repeat):
+            begin = time.perf_counter()
+            total, _ = store.summarize(filters, group_by=group_by, limit=1000)
+            best = min(best, time.perf_counter() - begin)
+        results.append({"query": name, "matched": total, "ms": best * 1000.0,
+                        "plan": query_plan(store, filters, group_by)})
+    return results
+
+
+def print_table(results: List[Dict], target_ms: float):
+    header = f"{'query':<40} {'matched':>9} {'ms':>8}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        flag = "" if result["ms"] < target_ms else "  ⚠️  over target"
+        print(f"{result['query']:<40} {result['matched']:>9} {result['ms']:>8.1f}{flag}")
+        print(f"    {result['plan']}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark history summary queries")
+    parser.add_argument("--rows", type=int, default=1000000, help="Synthetic analyses")
+    parser.add_argument("--db", type=Path, help="Database to create or reuse (default: temporary)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query (best is reported)")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="Flag queries slower than this")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, help="Write the results as JSON here")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.db:
+        results = run(args, args.db)
+    else:
+        with tempfile.TemporaryDirectory(prefix="bench_history_") as workdir:
+            results = run(args, Path(workdir) / "history.db")
+    print_table(results, args.target_ms)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+        print(f"💾 Results written to {args.output}")
+    return 0 if all(result["ms"] < args.target_ms for result in results) else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
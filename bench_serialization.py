@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Response serialization benchmark
+Compares encoding time and payload size of analysis responses per encoder and compression
+
+Encoders:
+    stdlib       model_dump(mode="json") + json.dumps (FastAPI's default JSONResponse)
+    pydantic     model_dump_json via a TypeAdapter (pydantic-core, no Python dicts)
+    orjson       model_dump(mode="json") + orjson.dumps (CompactJSONResponse)
+    msgpack      model_dump(mode="json") + msgpack.packb (Accept: application/msgpack)
+
+Examples:
+    # Default sizes: 1, 100 and 10000 results
+    python bench_serialization.py
+
+    # Other sizes, more repetitions, JSON report
+    python bench_serialization.py --sizes 1 1000 50000 --repeat 5 --output bench.json
+"""
+
+import argparse
+import gzip
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from pydantic import TypeAdapter
+
+# Add current directory to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+
+from app.api.responses import ORJSON_AVAILABLE, MSGPACK_AVAILABLE, encode_json, encode_msgpack
+from app.api.middleware import BROTLI_AVAILABLE
+from app.core.fake_model import FAKE_RESPONSES
+from app.core.taxonomy import normalize_result
+from app.models.fault_models import AnalysisResponse, BearingAnalysisResult, TokenUsage
+
+if BROTLI_AVAILABLE:
+    import brotli
+
+
+def bullets(text: str) -> List[str]:
+    return [line.lstrip("- ").strip() for line in text.splitlines() if line.strip()]
+
+
+def make_responses(count: int, seed: int) -> List[AnalysisResponse]:
+    """Realistic responses built from the fake model's canned answers"""
+    rng = random.Random(seed)
+    responses = []
+    for index in range(count):
+        answer = rng.choice(FAKE_RESPONSES)
+        analysis = normalize_result(BearingAnalysisResult(
+            observed_damage=" ".join(bullets(answer["damage"])),
+            failure_mode=answer["mode"],
+            root_cause_analysis=bullets(answer["causes"]),
+            confidence_score=answer["confidence"] / 100.0,
+            technical_notes="Analysis based on visual inspection of the uploaded image",
+            recommendations=bullets(answer["recommendations"])
+        ))
+        responses.append(AnalysisResponse(
+            analysis=analysis,
+            processing_time=rng.uniform(1.0, 4.0),
+            model_used="models/gemini-2.5-flash",
+            analysis_id=index + 1,
+            prompt_variant="expert-v1",
+            usage=TokenUsage(prompt_tokens=605, image_tokens=258, output_tokens=rng.randint(90, 140), model_calls=1)
+        ))
+    return responses
+
+
+def encoders(responses: List[AnalysisResponse]) -> Dict[str, Callable[[], bytes]]:
+    """Encoder name -> function producing the response body"""
+    adapter = TypeAdapter(List[AnalysisResponse])
+
+    def as_content():
+        return {"results": [response.model_dump(mode="json") for response in responses]}
+
+    available = {
+        "stdlib": lambda: json.dumps(as_content(), ensure_ascii=False).encode("utf-8"),
+        "pydantic": lambda: b'{"results":' + adapter.dump_json(responses) + b"}"
+    }
+    if ORJSON_AVAILABLE:
+        available["orjson"] = lambda: encode_json(as_content())
+    if MSGPACK_AVAILABLE:
+        available["msgpack"] = lambda: encode_msgpack(as_content())
+    return available
+
+
+def timed(function: Callable[[], bytes], repeat: int):
+    """Best time of several runs, and the last result"""
+    best = float("inf")
+    result = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def compressions(level_gzip: int, quality_brotli: int) -> Dict[str, Callable[[bytes], bytes]]:
+    available = {"gzip": lambda body: gzip.compress(body, compresslevel=level_gzip)}
+    if BROTLI_AVAILABLE:
+        available["br"] = lambda body: brotli.compress(body, quality=quality_brotli)
+    return available
+
+
+def run(args: argparse.Namespace) -> List[Dict]:
+    rows = []
+    compressors = compressions(args.gzip_level, args.brotli_quality)
+    for size in args.sizes:
+        responses = make_responses(size, args.seed)
+        for name, encode in encoders(responses).items():
+            encode_time, body = timed(encode, args.repeat)
+            row = {"results": size, "encoder": name, "encode_ms": encode_time * 1000, "bytes": len(body)}
+            for compression, compress in compressors.items():
+                compress_time, compressed = timed(lambda: compress(body), args.repeat)
+                row[f"{compression}_bytes"] = len(compressed)
+                row[f"{compression}_ms"] = compress_time * 1000
+            rows.append(row)
+    return rows
+
+
+def print_table(rows: List[Dict]):
+    compression_names = [key[:-6] for key in rows[0] if key.endswith("_bytes") and key != "bytes"]
+    header = f"{'results':>8} {'encoder':<9} {'encode ms':>10} {'bytes':>12}"
+    for name in compression_names:
+        header += f" {name + ' bytes':>12} {name + ' ms':>9}"
+    print(header)
+    print("-" * len(header))
+    baseline = {}
+    for row in rows:
+        if row["encoder"] == "stdlib":
+            baseline[row["results"]] = row["encode_ms"]
+        line = f"{row['results']:>8} {row['encoder']:<9} {row['encode_ms']:>10.2f} {row['bytes']:>12,}"
+        for name in compression_names:
+            line += f" {row[name + '_bytes']:>12,} {row[name + '_ms']:>9.2f}"
+        speedup = baseline.get(row["results"], 0) / row["encode_ms"] if row["encode_ms"] else 0
+        print(line + (f"  ({speedup:.1f}x)" if row["encoder"] != "stdlib" and speedup else ""))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark response serialization and compression")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10000], help="Results per response")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    parser.add_argument("--gzip-level", type=int, default=6)
+    parser.add_argument("--brotli-quality", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, help="Write the results as JSON here")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    missing = [name for name, available in
+               (("orjson", ORJSON_AVAILABLE), ("msgpack", MSGPACK_AVAILABLE), ("brotli", BROTLI_AVAILABLE))
+               if not available]
+    if missing:
+        print(f"⚠️  Not installed, skipped: {', '.join(missing)}")
+
+    print(f"📊 Serializing {', '.join(str(size) for size in args.sizes)}-result responses")
+    rows = run(args)
+    print_table(rows)
+
+    if args.output:
+        args.output.write_text(json.dumps(rows, indent=2))
+        print(f"💾 Results written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Prompt and model A/B evaluation harness
+Scores prompt variants and Gemini models against a labeled bearing image set
+
+Every (image, prompt, model) answer is cached by content: the image digest,
+a hash of the exact prompt text and the model name. Re-running an unchanged
+variant makes no model calls, and because the raw answer is cached, parser
+changes are re-scored for free.
+
+Labeled data is either a directory with one sub-directory per failure-mode
+code (see app/core/taxonomy.py) or a CSV with columns
+path,label[,bearing_type,mounted_on_motor].
+
+Examples:
+    # Compare both prompt variants on two models
+    python evaluate_prompts.py --data labeled/ --variants expert-v1 concise-v1 \\
+        --models models/gemini-2.5-flash models/gemini-2.5-pro --output eval_report.json
+
+    # Token prices (USD per million tokens) for the cost column
+    python evaluate_prompts.py --labels labels.csv --price-input 0.30 --price-output 2.50
+"""
+
+import argparse
+import asyncio
+import contextlib
+import csv
+import hashlib
+import io
+import json
+import sqlite3
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from PIL import Image
+
+# Add current directory to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+
+from app.core.config import settings
+from app.core.gemini_fault_analyzer import GeminiFaultAnalyzer
+from app.core.taxonomy import TAXONOMY
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    image_digest TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    text TEXT NOT NULL,
+    prompt_tokens INTEGER,
+    output_tokens INTEGER,
+    latency_ms REAL NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+
+class LabeledImage(NamedTuple):
+    path: str
+    label: str
+    bearing_type: Optional[str] = None
+    mounted_on_motor: Optional[bool] = None
+
+
+class Outcome(NamedTuple):
+    """Scored answer of one variant and model for one image"""
+    image: LabeledImage
+    predicted: Optional[str]
+    confidence: float
+    latency_ms: float
+    prompt_tokens: int
+    output_tokens: int
+    cached: bool
+    error: Optional[str] = None
+
+
+class ResponseCache:
+    """SQLite cache of raw model answers keyed by image, prompt and model"""
+
+    def __init__(self, path: str):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(CACHE_SCHEMA)
+        self.connection.commit()
+
+    @staticmethod
+    def key(image_digest: str, prompt_hash: str, model: str) -> str:
+        return hashlib.sha256(f"{image_digest}|{prompt_hash}|{model}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[tuple]:
+        cursor = self.connection.execute(
+            "SELECT text, prompt_tokens, output_tokens, latency_ms FROM responses WHERE key = ?", (key,)
+        )
+        return cursor.fetchone()
+
+    def put(self, key: str, image_digest: str, variant: str, prompt_hash: str, model: str,
+            text: str, prompt_tokens: int, output_tokens: int, latency_ms: float):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, image_digest, variant, prompt_hash, model, text, prompt_tokens, output_tokens,
+             latency_ms, time.time())
+        )
+        self.connection.commit()
+
+
+def parse_bool(value: str) -> Optional[bool]:
+    if value.strip().lower() in ("true", "yes", "1"):
+        return True
+    if value.strip().lower() in ("false", "no", "0"):
+        return False
+    return None
+
+
+def load_labeled_images(args: argparse.Namespace) -> List[LabeledImage]:
+    """Read the labeled set from a CSV or a directory per label"""
+    if args.labels:
+        images = []
+        with open(args.labels, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                path = Path(row["path"])
+                if not path.is_absolute():
+                    path = args.labels.parent / path
+                images.append(LabeledImage(
+                    path=str(path),
+                    label=row["label"].strip(),
+                    bearing_type=row.get("bearing_type") or None,
+                    mounted_on_motor=parse_bool(row.get("mounted_on_motor") or "")
+                ))
+        return images
+
+    images = []
+    for class_dir in sorted(path for path in args.data.iterdir() if path.is_dir()):
+        for path in sorted(class_dir.rglob("*")):
+            if path.suffix.lower() in IMAGE_SUFFIXES:
+                images.append(LabeledImage(path=str(path), label=class_dir.name))
+    return images
+
+
+def usage_tokens(response: Any) -> tuple:
+    """(prompt, output) token counts, 0 when the backend does not report them"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return 0, 0
+    return (getattr(usage, "prompt_token_count", 0) or 0,
+            getattr(usage, "candidates_token_count", 0) or 0)
+
+
+class Evaluator:
+    """Runs variants and models over the labeled set through the cache"""
+
+    def __init__(self, analyzer: GeminiFaultAnalyzer, cache: ResponseCache,
+                 concurrency: int, verbose: bool = False):
+        self.analyzer = analyzer
+        self.cache = cache
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.verbose = verbose
+        self._digests: Dict[str, str] = {}
+
+    def _digest(self, path: str) -> str:
+        if path not in self._digests:
+            self._digests[path] = hashlib.sha256(Path(path).read_bytes()).hexdigest()
+        return self._digests[path]
+
+    def _parse(self, text: str, variant: str):
+        """Parse and normalize an answer, silencing the parser's debug output"""
+        if self.verbose:
+            return self.analyzer.parse_answer(text, variant)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.analyzer.parse_answer(text, variant)
+
+    async def evaluate_one(self, image: LabeledImage, variant: str, model_name: str) -> Outcome:
+        prompt = self.analyzer.build_prompt(variant, image.bearing_type, image.mounted_on_motor)
+        prompt_hash = hashlib.sha256(prompt.encode()).hexdigest()[:16]
+        image_digest = self._digest(image.path)
+        key = self.cache.key(image_digest, prompt_hash, model_name)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            text, prompt_tokens, output_tokens, latency_ms = cached
+        else:
+            try:
+                async with self.semaphore:
+                    model = self.analyzer.get_model(model_name)
+                    with Image.open(image.path) as source:
+                        source.load()
+                        start = time.perf_counter()
+                        response = await model.generate_content_async([prompt, source])
+                        latency_ms = (time.perf_counter() - start) * 1000.0
+                text = response.text
+            except Exception as e:
+                return Outcome(image, None, 0.0, 0.0, 0, 0, False, f"{type(e).__name__}: {e}")
+            prompt_tokens, output_tokens = usage_tokens(response)
+            self.cache.put(key, image_digest, variant, prompt_hash, model_name,
+                           text, prompt_tokens, output_tokens, latency_ms)
+
+        result = self._parse(text, variant)
+        return Outcome(image, result.failure_mode_code, result.confidence_score, latency_ms,
+                       prompt_tokens or 0, output_tokens or 0, cached is not None)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def calibration(outcomes: List[Outcome], bins: int = 10) -> Dict[str, float]:
+    """Expected calibration error and Brier score of confidence vs correctness"""
+    if not outcomes:
+        return {"ece": 0.0, "brier": 0.0}
+    binned: Dict[int, List[Outcome]] = defaultdict(list)
+    brier = 0.0
+    for outcome in outcomes:
+        correct = float(outcome.predicted == outcome.image.label)
+        brier += (outcome.confidence - correct) ** 2
+        binned[min(bins - 1, int(outcome.confidence * bins))].append(outcome)
+    ece = 0.0
+    for members in binned.values():
+        accuracy = sum(outcome.predicted == outcome.image.label for outcome in members) / len(members)
+        confidence = sum(outcome.confidence for outcome in members) / len(members)
+        ece += len(members) / len(outcomes) * abs(accuracy - confidence)
+    return {"ece": round(ece, 4), "brier": round(brier / len(outcomes), 4)}
+
+
+def score(outcomes: List[Outcome], price_input: float, price_output: float) -> Dict[str, Any]:
+    """Accuracy, calibration, latency and cost of one variant/model pair"""
+    answered = [outcome for outcome in outcomes if outcome.error is None]
+    correct = [outcome for outcome in answered if outcome.predicted == outcome.image.label]
+    latencies = [outcome.latency_ms for outcome in answered]
+    prompt_tokens = sum(outcome.prompt_tokens for outcome in answered)
+    output_tokens = sum(outcome.output_tokens for outcome in answered)
+
+    per_label: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+    confusions: Counter = Counter()
+    for outcome in answered:
+        per_label[outcome.image.label][1] += 1
+        if outcome.predicted == outcome.image.label:
+            per_label[outcome.image.label][0] += 1
+        else:
+            confusions[f"{outcome.image.label} -> {outcome.predicted}"] += 1
+
+    return {
+        "images": len(outcomes),
+        "answered": len(answered),
+        "errors": len(outcomes) - len(answered),
+        "cache_hits": sum(1 for outcome in outcomes if outcome.cached),
+        "accuracy": round(len(correct) / len(answered), 4) if answered else 0.0,
+        "per_label_accuracy": {label: round(hits / total, 4) for label, (hits, total) in sorted(per_label.items())},
+        "top_confusions": dict(confusions.most_common(5)),
+        "calibration": calibration(answered),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.5), 1),
+            "p95": round(percentile(latencies, 0.95), 1)
+        },
+        "tokens_per_image": {
+            "prompt": round(prompt_tokens / len(answered), 1) if answered else 0.0,
+            "output": round(output_tokens / len(answered), 1) if answered else 0.0
+        },
+        "cost_per_1k_images_usd": round(
+            (prompt_tokens * price_input + output_tokens * price_output) / 1e6 / len(answered) * 1000, 4
+        ) if answered else 0.0
+    }
+
+
+def recommend(report: Dict[str, Dict[str, Any]], tolerance: float) -> Optional[str]:
+    """Cheapest, then fastest, variant within tolerance of the best accuracy"""
+    if not report:
+        return None
+    best = max(entry["accuracy"] for entry in report.values())
+    eligible = [name for name, entry in report.items() if entry["accuracy"] >= best - tolerance]
+    return min(eligible, key=lambda name: (report[name]["cost_per_1k_images_usd"],
+                                           report[name]["latency_ms"]["p50"]))
+
+
+def print_report(report: Dict[str, Dict[str, Any]], choice: Optional[str]):
+    print(f"\n{'variant @ model':<48} {'acc':>6} {'ECE':>6} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'tok in':>7} {'tok out':>7} {'$/1k':>7} {'cached':>7}")
+    print("-" * 108)
+    for name, entry in report.items():
+        print(f"{name:<48} {entry['accuracy']:>6.1%} {entry['calibration']['ece']:>6.3f} "
+              f"{entry['latency_ms']['p50']:>8.0f} {entry['latency_ms']['p95']:>8.0f} "
+              f"{entry['tokens_per_image']['prompt']:>7.0f} {entry['tokens_per_image']['output']:>7.0f} "
+              f"{entry['cost_per_1k_images_usd']:>7.3f} {entry['cache_hits']:>4}/{entry['images']:<3}")
+    if choice:
+        print(f"\n🏆 Cheapest variant within tolerance of the best accuracy: {choice}")
+
+
+async def run(args: argparse.Namespace, images: List[LabeledImage]) -> Dict[str, Dict[str, Any]]:
+    analyzer = GeminiFaultAnalyzer()
+    if not analyzer.is_ready():
+        raise RuntimeError("Analyzer not ready; set GOOGLE_API_KEY or MODEL_BACKEND=fake")
+    for variant in args.variants:
+        if variant not in analyzer.PROMPT_VARIANTS:
+            raise RuntimeError(f"Unknown prompt variant {variant}; "
+                               f"registered: {', '.join(analyzer.PROMPT_VARIANTS)}")
+
+    evaluator = Evaluator(analyzer, ResponseCache(str(args.cache)), args.concurrency, args.verbose)
+    pairs = [(variant, model) for variant in args.variants for model in args.models]
+
+    start = time.time()
+    results = await asyncio.gather(*(
+        asyncio.gather(*(evaluator.evaluate_one(image, variant, model) for image in images))
+        for variant, model in pairs
+    ))
+    print(f"⏱️  Evaluated {len(pairs)} variant/model pairs on {len(images)} images in {time.time() - start:.1f}s")
+
+    return {f"{variant} @ {model}": score(outcomes, args.price_input, args.price_output)
+            for (variant, model), outcomes in zip(pairs, results)}
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Evaluate prompt variants and models on labeled images")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data", type=Path, help="Directory with one sub-directory per failure-mode code")
+    source.add_argument("--labels", type=Path, help="CSV with path,label[,bearing_type,mounted_on_motor]")
+    parser.add_argument("--variants", nargs="+", default=[settings.PROMPT_VARIANT], help="Prompt variants")
+    parser.add_argument("--models", nargs="+", default=[settings.GEMINI_MODEL], help="Model names")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent model calls")
+    parser.add_argument("--cache", type=Path, default=Path("eval_cache.db"), help="Response cache database")
+    parser.add_argument("--price-input", type=float, default=0.0, help="USD per million input tokens")
+    parser.add_argument("--price-output", type=float, default=0.0, help="USD per million output tokens")
+    parser.add_argument("--tolerance", type=float, default=0.02,
+                        help="Accuracy a cheaper variant may give up and still be recommended")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here")
+    parser.add_argument("--verbose", action="store_true", help="Show the parser's debug output")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    images = load_labeled_images(args)
+    if not images:
+        print("❌ No labeled images found")
+        return 1
+
+    unknown = sorted({image.label for image in images} - set(TAXONOMY))
+    if unknown:
+        print(f"⚠️  Labels outside the taxonomy can never match: {', '.join(unknown)}")
+    print(f"📸 {len(images)} labeled images: {dict(Counter(image.label for image in images))}")
+
+    try:
+        report = asyncio.run(run(args, images))
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+
+    choice = recommend(report, args.tolerance)
+    print_report(report, choice)
+    if args.output:
+        args.output.write_text(json.dumps({"pairs": report, "recommended": choice}, indent=2))
+        print(f"💾 Report written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,102 +1,269 @@
 #!/usr/bin/env python3
 """
-Simple client for Gemini-based Bearing Fault Analysis API
-Demonstrates how to use the new simplified API
+Load-testing client for the Gemini-based Bearing Fault Analysis API
+Drives /analyze-image with a configurable rate and concurrency and reports
+latency percentiles, throughput and errors as JSON and HDR histograms
+
+Examples:
+    # Closed loop: 32 workers, 60 s, synthetic images, after a 10 s warm-up
+    python gemini_client.py --synthetic 20 --concurrency 32 --duration 60 --warmup 10
+
+    # Open loop at 25 requests/s over a directory of photos
+    python gemini_client.py --images ./samples --rate 25 --requests 2000 --output report.json
+
+Start the server with MODEL_BACKEND=fake to measure the API without Gemini costs.
 """
 
+import argparse
 import asyncio
-import aiohttp
+import io
 import json
-import sys
+import math
 import os
+import random
+import sys
+import time
+from collections import Counter
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+class LatencyHistogram:
+    """
+    HDR-style latency histogram.
+
+    Values are bucketed to a fixed number of significant digits, so memory
+    stays bounded however many samples are recorded while percentiles keep
+    the configured relative precision.
+    """
+
+    def __init__(self, significant_digits: int = 3):
+        self.significant_digits = significant_digits
+        self.counts: Counter = Counter()
+        self.total_count = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.max_value = 0.0
+
+    def _bucket(self, value: float) -> float:
+        """Round a value down to the histogram precision"""
+        if value <= 0:
+            return 0.0
+        magnitude = math.floor(math.log10(value)) - self.significant_digits + 1
+        step = 10.0 ** magnitude
+        return math.floor(value / step) * step
+
+    def record(self, value_ms: float):
+        """Record one latency sample in milliseconds"""
+        self.counts[self._bucket(value_ms)] += 1
+        self.total_count += 1
+        self.total += value_ms
+        self.total_squares += value_ms * value_ms
+        self.max_value = max(self.max_value, value_ms)
+
+    def percentile(self, percentile: float) -> float:
+        """Get the value at a percentile (0-100)"""
+        if not self.total_count:
+            return 0.0
+        target = max(1, math.ceil(self.total_count * percentile / 100.0))
+        seen = 0
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            if seen >= target:
+                return value
+        return self.max_value
+
+    def mean(self) -> float:
+        return self.total / self.total_count if self.total_count else 0.0
+
+    def stddev(self) -> float:
+        if not self.total_count:
+            return 0.0
+        mean = self.mean()
+        return math.sqrt(max(0.0, self.total_squares / self.total_count - mean * mean))
+
+    def to_hgrm(self) -> str:
+        """Render the percentile distribution in HdrHistogram .hgrm format"""
+        lines = [f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>14}", ""]
+        seen = 0
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            fraction = seen / self.total_count
+            inverse = "inf" if fraction >= 1.0 else f"{1.0 / (1.0 - fraction):.2f}"
+            lines.append(f"{value:12.3f} {fraction:14.12f} {seen:10d} {inverse:>14}")
+        lines.append(f"#[Mean    = {self.mean():12.3f}, StdDeviation   = {self.stddev():12.3f}]")
+        lines.append(f"#[Max     = {self.max_value:12.3f}, Total count    = {self.total_count:12d}]")
+        lines.append(f"#[Buckets = {len(self.counts):12d}, SubBuckets     = {10 ** self.significant_digits:12d}]")
+        return "\n".join(lines) + "\n"
+
+
+class PhaseStats:
+    """Latency, throughput and error accounting for one test phase"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.histogram = LatencyHistogram()
+        self.errors: Counter = Counter()
+        self.successes = 0
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+
+    def record(self, latency_ms: float, error: Optional[str]):
+        self.histogram.record(latency_ms)
+        if error:
+            self.errors[error] += 1
+        else:
+            self.successes += 1
+
+    def finish(self):
+        self.finished_at = time.monotonic()
+
+    def report(self) -> Dict:
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        total = self.histogram.total_count
+        return {
+            "phase": self.name,
+            "duration_seconds": round(elapsed, 3),
+            "requests": total,
+            "successes": self.successes,
+            "errors": sum(self.errors.values()),
+            "error_rate": round(sum(self.errors.values()) / total, 4) if total else 0.0,
+            "error_breakdown": dict(self.errors),
+            "throughput_rps": round(total / elapsed, 3) if elapsed > 0 else 0.0,
+            "latency_ms": {
+                "mean": round(self.histogram.mean(), 3),
+                "p50": round(self.histogram.percentile(50), 3),
+                "p95": round(self.histogram.percentile(95), 3),
+                "p99": round(self.histogram.percentile(99), 3),
+                "max": round(self.histogram.max_value, 3)
+            }
+        }
+
+
+def load_image_directory(directory: Path) -> List[Tuple[str, bytes, str]]:
+    """Read every image in a directory into memory"""
+    images = []
+    for path in sorted(directory.rglob("*")):
+        if path.suffix.lower() in IMAGE_SUFFIXES and path.is_file():
+            content_type = "image/png" if path.suffix.lower() == ".png" else "image/jpeg"
+            images.append((path.name, path.read_bytes(), content_type))
+    return images
+
+
+def generate_synthetic_images(count: int, size: int, seed: int) -> List[Tuple[str, bytes, str]]:
+    """Generate distinct noisy ring images so server-side caches do not hide latency"""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    images = []
+    for index in range(count):
+        image = Image.new("RGB", (size, size), tuple(rng.randint(90, 140) for _ in range(3)))
+        draw = ImageDraw.Draw(image)
+        margin = size // 10
+        draw.ellipse([margin, margin, size - margin, size - margin], outline=(40, 40, 40), width=size // 12)
+        for _ in range(rng.randint(5, 40)):
+            x, y = rng.randint(0, size - 1), rng.randint(0, size - 1)
+            radius = rng.randint(1, max(2, size // 60))
+            draw.ellipse([x - radius, y - radius, x + radius, y + radius], fill=(20, 20, 20))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=90)
+        images.append((f"synthetic_{index:05d}.jpg", buffer.getvalue(), "image/jpeg"))
+    return images
+
+
+class LoadGenerator:
+    """Sends analysis requests at a target rate with bounded concurrency"""
+
+    def __init__(self, args: argparse.Namespace, images: List[Tuple[str, bytes, str]]):
+        self.args = args
+        self.images = images
+        self.analyze_url = f"{args.url.rstrip('/')}/api/v1/analyze-image"
+        self.semaphore = asyncio.Semaphore(args.concurrency)
+        self.headers = {"X-Request-Priority": args.priority}
+        if args.api_key:
+            self.headers["X-API-Key"] = args.api_key
+        self._next_image = 0
+
+    def _form(self) -> aiohttp.FormData:
+        """Build the multipart body for the next image in rotation"""
+        filename, content, content_type = self.images[self._next_image % len(self.images)]
+        self._next_image += 1
 
-# Add current directory to Python path
-current_dir = Path(__file__).parent
-sys.path.insert(0, str(current_dir))
-
-async def test_api_analysis():
-    """Test the API with a bearing image"""
-    
-    # API endpoint
-    api_url = "http://localhost:8001/api/v1/analyze-image"
-    
-    # Test image path
-    image_path = "/home/cimcom/Desktop/RCFA/testing_samples/image2.jpeg"
-    
-    if not os.path.exists(image_path):
-        print(f"❌ Image not found: {image_path}")
-        print("   Please update the image_path variable with a valid bearing image")
-        return
-    
-    print("🔍 TESTING GEMINI-BASED API")
-    print("="*60)
-    print(f"📸 Analyzing: {image_path}")
-    
-    try:
-        # Prepare form data
         data = aiohttp.FormData()
-        data.add_field('image', 
-                      open(image_path, 'rb'),
-                      filename=os.path.basename(image_path),
-                      content_type='image/png')
-        data.add_field('bearing_type', 'roller_bearing')
-        data.add_field('mounted_on_motor', 'false')  # NEW FIELD
-        data.add_field('application', 'Industrial machinery')
-        data.add_field('additional_context', 'High-speed operation, 24/7 usage')
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.post(api_url, data=data) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    
-                    print(f"\n✅ API Analysis Successful!")
-                    print(f"   Processing time: {result['processing_time']:.2f} seconds")
-                    print(f"   Model used: {result['model_used']}")
-                    print(f"   Confidence: {result['analysis']['confidence_score']:.1%}")
-                    
-                    print(f"\n📷 OBSERVED DAMAGE:")
-                    print(f"   {result['analysis']['observed_damage']}")
-                    
-                    print(f"\n⚙️ FAILURE MODE:")
-                    print(f"   {result['analysis']['failure_mode']}")
-                    
-                    print(f"\n🧠 ROOT CAUSE ANALYSIS (Focused):")
-                    if len(result['analysis']['root_cause_analysis']) == 1:
-                        print(f"   Primary Cause: {result['analysis']['root_cause_analysis'][0]}")
-                    else:
-                        for i, cause in enumerate(result['analysis']['root_cause_analysis'], 1):
-                            priority = "Primary" if i == 1 else "Secondary"
-                            print(f"   {priority} Cause {i}: {cause}")
-                    
-                    if result['analysis']['technical_notes']:
-                        print(f"\n📝 TECHNICAL NOTES:")
-                        print(f"   {result['analysis']['technical_notes']}")
-                    
-                    if result['analysis']['recommendations']:
-                        print(f"\n💡 DYNAMIC RECOMMENDATIONS:")
-                        print("   (Generated based on specific fault and root cause)")
-                        for i, rec in enumerate(result['analysis']['recommendations'], 1):
-                            print(f"   {i}. {rec}")
-                    
-                else:
-                    error_text = await response.text()
-                    print(f"❌ API Error: {response.status}")
-                    print(f"   {error_text}")
-                    
-    except aiohttp.ClientConnectorError:
-        print("❌ Could not connect to API server")
-        print("   Make sure the server is running: python -m app.main")
-    except Exception as e:
-        print(f"❌ Error: {e}")
+        data.add_field("image", content, filename=filename, content_type=content_type)
+        if self.args.bearing_type:
+            data.add_field("bearing_type", self.args.bearing_type)
+        if self.args.mounted_on_motor is not None:
+            data.add_field("mounted_on_motor", self.args.mounted_on_motor)
+        return data
+
+    async def _request(self, session: aiohttp.ClientSession, stats: PhaseStats, scheduled_at: float):
+        """Send one request; latency is measured from its scheduled start"""
+        error = None
+        try:
+            async with session.post(self.analyze_url, data=self._form(),
+                                    headers=self.headers) as response:
+                await response.read()
+                if response.status != 200:
+                    error = f"http_{response.status}"
+        except asyncio.TimeoutError:
+            error = "timeout"
+        except aiohttp.ClientError as e:
+            error = type(e).__name__
+        finally:
+            self.semaphore.release()
+        stats.record((time.monotonic() - scheduled_at) * 1000.0, error)
 
-async def check_api_health():
+    async def run_phase(self, session: aiohttp.ClientSession, name: str,
+                        duration: Optional[float], max_requests: Optional[int]) -> PhaseStats:
+        """Run one phase until its duration or request budget is used up"""
+        stats = PhaseStats(name)
+        tasks = set()
+        interval = 1.0 / self.args.rate if self.args.rate > 0 else 0.0
+        deadline = time.monotonic() + duration if duration else None
+        next_start = time.monotonic()
+        sent = 0
+
+        while True:
+            if max_requests is not None and sent >= max_requests:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+
+            if interval:
+                # Open loop: requests are due on a fixed schedule, and time spent
+                # waiting for a free connection counts towards their latency
+                delay = next_start - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                scheduled_at = next_start
+                next_start += interval
+            else:
+                scheduled_at = None
+
+            await self.semaphore.acquire()
+            task = asyncio.create_task(self._request(session, stats, scheduled_at or time.monotonic()))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            sent += 1
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        stats.finish()
+        return stats
+
+
+async def check_api_health(base_url: str, timeout: float = 10.0) -> bool:
     """Check if the API is healthy"""
-    
-    health_url = "http://localhost:8001/api/v1/health"
-    
+
+    health_url = f"{base_url.rstrip('/')}/api/v1/health"
+
     try:
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
             async with session.get(health_url) as response:
                 if response.status == 200:
                     health = await response.json()
@@ -107,29 +274,102 @@ async def check_api_health():
                 else:
                     print(f"❌ Health check failed: {response.status}")
                     return False
-    except aiohttp.ClientConnectorError:
+    except (aiohttp.ClientConnectorError, asyncio.TimeoutError):
         print("❌ Could not connect to API server")
         return False
 
-async def main():
-    """Main function to test the API"""
-    
-    print("🚀 GEMINI-BASED BEARING ANALYSIS API CLIENT")
+
+def print_phase(report: Dict):
+    """Print a short human-readable summary of a phase"""
+    latency = report["latency_ms"]
+    print(f"\n📊 {report['phase'].upper()}: {report['requests']} requests in {report['duration_seconds']:.1f}s "
+          f"({report['throughput_rps']:.2f} req/s)")
+    print(f"   Latency ms  p50={latency['p50']:.1f}  p95={latency['p95']:.1f}  "
+          f"p99={latency['p99']:.1f}  max={latency['max']:.1f}")
+    if report["errors"]:
+        print(f"   Errors: {report['errors']} ({report['error_rate']:.1%}) {report['error_breakdown']}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load generator for the bearing analysis API")
+    parser.add_argument("--url", default="http://localhost:8001", help="API base URL")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--images", type=Path, help="Directory of images to send in rotation")
+    source.add_argument("--synthetic", type=int, metavar="N", help="Generate N synthetic images")
+    parser.add_argument("--synthetic-size", type=int, default=1024, help="Synthetic image edge length in pixels")
+    parser.add_argument("--seed", type=int, default=7, help="Seed for synthetic images")
+    parser.add_argument("--concurrency", type=int, default=16, help="Maximum in-flight requests (connection pool size)")
+    parser.add_argument("--rate", type=float, default=0.0, help="Target requests/s (0 = closed loop at full concurrency)")
+    parser.add_argument("--duration", type=float, help="Measured phase length in seconds")
+    parser.add_argument("--requests", type=int, help="Measured phase request count")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Warm-up seconds excluded from the report")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--priority", choices=["interactive", "batch"], default="batch", help="X-Request-Priority to send")
+    parser.add_argument("--api-key", default=os.environ.get("API_KEY"), help="API key when the server requires one (default: $API_KEY)")
+    parser.add_argument("--bearing-type", default="roller_bearing", help="bearing_type form field")
+    parser.add_argument("--mounted-on-motor", choices=["true", "false"], help="mounted_on_motor form field")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here")
+    parser.add_argument("--hdr-output", type=Path, help="Write the measured latency histogram (.hgrm) here")
+    parser.add_argument("--skip-health-check", action="store_true", help="Do not call /health first")
+    args = parser.parse_args(argv)
+
+    if args.duration is None and args.requests is None:
+        args.duration = 30.0
+    return args
+
+
+async def main(argv: Optional[List[str]] = None) -> int:
+    """Run warm-up and measured phases and write the reports"""
+    args = parse_args(argv)
+
+    print("🚀 BEARING ANALYSIS API LOAD GENERATOR")
     print("="*60)
-    
-    # Check API health first
-    print("🔍 Checking API health...")
-    if not await check_api_health():
-        print("\n❌ API is not healthy. Please:")
-        print("   1. Start the server: python -m app.main")
-        print("   2. Set GOOGLE_API_KEY environment variable")
-        print("   3. Try again")
-        return
-    
-    print("\n✅ API is healthy, proceeding with analysis...")
-    
-    # Test the analysis
-    await test_api_analysis()
+
+    if not args.skip_health_check and not await check_api_health(args.url):
+        print("\n❌ API is not healthy. Start the server (MODEL_BACKEND=fake for load tests) and retry.")
+        return 1
+
+    if args.images:
+        images = load_image_directory(args.images)
+        if not images:
+            print(f"❌ No images found in {args.images}")
+            return 1
+    else:
+        images = generate_synthetic_images(args.synthetic, args.synthetic_size, args.seed)
+    print(f"📸 {len(images)} images, concurrency {args.concurrency}, "
+          f"rate {'closed loop' if args.rate <= 0 else f'{args.rate:g} req/s'}")
+
+    generator = LoadGenerator(args, images)
+    connector = aiohttp.TCPConnector(limit=args.concurrency, limit_per_host=args.concurrency)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        if args.warmup > 0:
+            print(f"\n🔥 Warming up for {args.warmup:g}s...")
+            print_phase((await generator.run_phase(session, "warmup", args.warmup, None)).report())
+
+        print("\n⏱️  Measuring...")
+        measured = await generator.run_phase(session, "measured", args.duration, args.requests)
+
+    report = measured.report()
+    print_phase(report)
+
+    report["config"] = {
+        "url": args.url,
+        "images": len(images),
+        "concurrency": args.concurrency,
+        "rate": args.rate,
+        "priority": args.priority,
+        "warmup_seconds": args.warmup
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\n💾 JSON report written to {args.output}")
+    if args.hdr_output:
+        args.hdr_output.write_text(measured.histogram.to_hgrm())
+        print(f"💾 HDR histogram written to {args.hdr_output}")
+
+    return 0 if not report["errors"] else 2
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    sys.exit(asyncio.run(main()))
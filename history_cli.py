@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Analysis history tooling
+Exports stored analyses for fleet analytics and maintains their taxonomy codes and asset trends
+
+Examples:
+    # Everything, partitioned by date and bearing type
+    python history_cli.py export --output exports/analyses
+
+    # Motor-mounted roller bearings since July, as CSV
+    python history_cli.py export --output exports/q3 --format csv \\
+        --bearing-type roller_bearing --mounted-on-motor true --since 2024-07-01
+
+    # Recompute failure-mode and root-cause codes after a taxonomy change
+    python history_cli.py renormalize
+
+    # Replay every analysis with an asset id into fresh asset trends
+    python history_cli.py rebuild-trends
+
+    # Read it back in a notebook
+    import pyarrow.dataset as ds
+    table = ds.dataset("exports/analyses", format="parquet", partitioning="hive").to_table()
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+# Add current directory to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+
+from app.core.asset_trends import AssetTrendTracker
+from app.core.config import settings
+from app.core.exporter import PYARROW_AVAILABLE, export_dataset
+from app.core.history_store import AnalysisFilters, AnalysisHistoryStore
+
+
+def parse_bool(value: str) -> bool:
+    if value.lower() in ("true", "yes", "1"):
+        return True
+    if value.lower() in ("false", "no", "0"):
+        return False
+    raise argparse.ArgumentTypeError(f"Expected true or false, got {value}")
+
+
+def filters_from_args(args: argparse.Namespace) -> AnalysisFilters:
+    return AnalysisFilters(
+        bearing_type=args.bearing_type,
+        mounted_on_motor=args.mounted_on_motor,
+        application=args.application,
+        failure_mode=args.failure_mode,
+        failure_mode_code=args.failure_mode_code,
+        model_used=args.model_used,
+        since=args.since,
+        until=args.until,
+        min_confidence=args.min_confidence,
+        tenant=args.tenant,
+        asset_id=args.asset_id
+    )
+
+
+def add_filter_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--bearing-type", help="Bearing type value, e.g. roller_bearing")
+    parser.add_argument("--mounted-on-motor", type=parse_bool, help="true or false")
+    parser.add_argument("--application", help="Exact application")
+    parser.add_argument("--failure-mode", help="Text contained in the failure mode")
+    parser.add_argument("--failure-mode-code", help="Canonical failure mode code, e.g. fatigue")
+    parser.add_argument("--model-used", help="Model that produced the result")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="ISO date or time, inclusive")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="ISO date or time, exclusive")
+    parser.add_argument("--min-confidence", type=float, help="Minimum confidence score")
+    parser.add_argument("--tenant", help="Only analyses of this tenant")
+    parser.add_argument("--asset-id", help="Only analyses of this asset")
+
+
+def export(args: argparse.Namespace) -> int:
+    """Write the partitioned dataset"""
+    if not Path(args.db).exists():
+        print(f"❌ History database not found: {args.db}")
+        return 1
+
+    export_format = args.format
+    if export_format == "parquet" and not PYARROW_AVAILABLE:
+        print("⚠️  pyarrow is not installed; falling back to CSV")
+        export_format = "csv"
+
+    store = AnalysisHistoryStore(args.db)
+    print(f"📦 Exporting analyses from {args.db} to {args.output} ({export_format})")
+    start = time.time()
+    exporter = export_dataset(
+        store,
+        filters_from_args(args),
+        args.output,
+        export_format=export_format,
+        batch_size=args.batch_size,
+        max_open_files=args.max_open_files
+    )
+    elapsed = time.time() - start
+    rate = exporter.rows_written / elapsed if elapsed > 0 else 0.0
+    print(f"✅ {exporter.rows_written} rows in {exporter.files_written} files "
+          f"({elapsed:.1f}s, {rate:,.0f} rows/s)")
+    return 0
+
+
+def renormalize(args: argparse.Namespace) -> int:
+    """Recompute taxonomy codes for every stored analysis"""
+    if not Path(args.db).exists():
+        print(f"❌ History database not found: {args.db}")
+        return 1
+
+    store = AnalysisHistoryStore(args.db)
+    print(f"🔄 Re-normalizing analyses in {args.db}")
+    start = time.time()
+    updated = store.renormalize(batch_size=args.batch_size)
+    print(f"✅ {updated} analyses updated ({time.time() - start:.1f}s)")
+    return 0
+
+
+def rebuild_trends(args: argparse.Namespace) -> int:
+    """Recompute every asset's trend from its stored analyses"""
+    if not Path(args.db).exists():
+        print(f"❌ History database not found: {args.db}")
+        return 1
+
+    store = AnalysisHistoryStore(args.db)
+    tracker = AssetTrendTracker(store, settings.ASSET_TREND_SMOOTHING, settings.ASSET_TREND_HALF_LIFE_DAYS)
+    print(f"📈 Rebuilding asset trends in {args.db}")
+    start = time.time()
+    replayed = tracker.rebuild(batch_size=args.batch_size)
+    print(f"✅ {replayed} analyses of {tracker.stats()['assets']} assets replayed ({time.time() - start:.1f}s)")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Analysis history tooling")
+    parser.add_argument("--db", default=settings.HISTORY_DB_PATH, help="History database path")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Export analyses as a partitioned dataset")
+    export_parser.add_argument("--output", type=Path, required=True, help="Dataset directory")
+    export_parser.add_argument("--format", choices=["parquet", "csv"], default="parquet")
+    export_parser.add_argument("--batch-size", type=int, default=10000, help="Rows read per chunk")
+    export_parser.add_argument("--max-open-files", type=int, default=32,
+                               help="Partition files kept open at once")
+    add_filter_arguments(export_parser)
+
+    renormalize_parser = commands.add_parser("renormalize", help="Recompute taxonomy codes")
+    renormalize_parser.add_argument("--batch-size", type=int, default=5000, help="Rows per transaction")
+
+    rebuild_parser = commands.add_parser("rebuild-trends", help="Recompute asset degradation trends")
+    rebuild_parser.add_argument("--batch-size", type=int, default=5000, help="Rows read per chunk")
+
+    args = parser.parse_args(argv)
+    handlers = {"export": export, "renormalize": renormalize, "rebuild-trends": rebuild_trends}
+    return handlers[args.command](args)
+
+if __name__ == "__main__":
+    sys.exit(main())
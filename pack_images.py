@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Pack bearing images into a memory-mapped archive
+Builds the packed format read by reanalyze_archive.py and bench_archive.py
+
+Each image file is stored unchanged, once per distinct content, with its
+bearing metadata: the source path, plus label, bearing_type,
+mounted_on_motor and application from a labels CSV or the command line.
+Packing into an existing archive appends to it.
+
+Examples:
+    # Pack a directory tree
+    python pack_images.py archive/ --output archive.pack
+
+    # Labeled set: CSV with columns path,label[,bearing_type,mounted_on_motor,application]
+    python pack_images.py --labels labels.csv --output labeled.pack
+
+    # Same metadata for every image
+    python pack_images.py plant3/ --output plant3.pack --bearing-type ball_bearing --mounted-on-motor true
+"""
+
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Add current directory to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+
+from app.core.image_archive import ArchiveWriter, ImageArchive
+from reanalyze_archive import BEARING_TYPES, find_images, parse_bool
+
+METADATA_FIELDS = ("label", "bearing_type", "mounted_on_motor", "application")
+
+
+def labeled_images(labels: Path) -> List[Tuple[Path, Dict[str, Any]]]:
+    """Images and their metadata from a labels CSV; paths are relative to the CSV"""
+    images = []
+    with open(labels, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            path = Path(row["path"])
+            if not path.is_absolute():
+                path = labels.parent / path
+            metadata = {field: row[field].strip() for field in METADATA_FIELDS if (row.get(field) or "").strip()}
+            if metadata.get("bearing_type") not in (None, *BEARING_TYPES):
+                print(f"⚠️  {path}: unknown bearing type {metadata.pop('bearing_type')!r} left out")
+            if "mounted_on_motor" in metadata:
+                try:
+                    metadata["mounted_on_motor"] = parse_bool(metadata["mounted_on_motor"])
+                except argparse.ArgumentTypeError:
+                    del metadata["mounted_on_motor"]
+            images.append((path, metadata))
+    return images
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Pack bearing images into a memory-mapped archive")
+    parser.add_argument("directory", type=Path, nargs="?", help="Image directory, searched recursively")
+    parser.add_argument("--labels", type=Path, help="CSV of path,label[,bearing_type,mounted_on_motor,application]")
+    parser.add_argument("--output", type=Path, required=True, help="Archive file (.pack); appended to if it exists")
+    parser.add_argument("--bearing-type", choices=BEARING_TYPES, help="Bearing type of images without one")
+    parser.add_argument("--mounted-on-motor", type=parse_bool, help="true or false, for images without a value")
+    parser.add_argument("--application", help="Application of images without one")
+    args = parser.parse_args(argv)
+    if (args.directory is None) == (args.labels is None):
+        parser.error("give either an image directory or --labels")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.labels:
+        images = labeled_images(args.labels)
+    elif args.directory.is_dir():
+        images = [(path, {}) for path in find_images(args.directory)]
+    else:
+        print(f"❌ Not a directory: {args.directory}")
+        return 1
+
+    defaults = {"bearing_type": args.bearing_type, "mounted_on_motor": args.mounted_on_motor,
+                "application": args.application}
+    print(f"📸 Packing {len(images)} images into {args.output}")
+    start = time.time()
+    failed = 0
+    with ArchiveWriter(args.output) as writer:
+        for path, metadata in images:
+            try:
+                data = path.read_bytes()
+            except OSError as e:
+                print(f"⚠️  Skipped {path}: {e}")
+                failed += 1
+                continue
+            for field, value in defaults.items():
+                if value is not None:
+                    metadata.setdefault(field, value)
+            writer.add(data, {"path": str(path), **metadata})
+
+    elapsed = time.time() - start
+    with ImageArchive(args.output) as archive:
+        stats = archive.stats()
+    print(f"✅ {writer.added} added, {writer.duplicates} duplicates, {failed} unreadable "
+          f"in {elapsed:.1f}s ({len(images) / elapsed if elapsed else 0:.0f} img/s)")
+    print(f"💾 {args.output}: {stats['images']} images, {stats['file_bytes'] / 1e6:.1f} MB")
+    return 0 if failed == 0 else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
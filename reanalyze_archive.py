@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Bulk offline re-analysis of a bearing image archive
+Re-runs every image through GeminiFaultAnalyzer after a model or prompt change
+
+Decoding and pre-processing run in a process pool; model calls run
+concurrently on the event loop. Progress is checkpointed to a manifest next
+to the output, so an interrupted run picks up where it stopped.
+
+The source is a directory of image files or a packed archive built with
+pack_images.py. Packed images are decoded straight from the memory-mapped
+archive, and their stored bearing metadata fills in the prompt options not
+given on the command line.
+
+Examples:
+    # Re-analyze the archive with 16 concurrent model calls
+    python reanalyze_archive.py archive/ --output results/gemini-1.5-pro.jsonl --concurrency 16
+
+    # Resume after a crash (same command); --retry-failed also redoes failed images
+    python reanalyze_archive.py archive/ --output results/gemini-1.5-pro.jsonl --retry-failed
+
+    # Read a packed archive instead of loose files
+    python reanalyze_archive.py archive.pack --output results/gemini-1.5-pro.jsonl
+
+Use MODEL_BACKEND=fake to dry-run the pipeline without Gemini calls.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+# Add current directory to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+
+from app.core.image_archive import ImageArchive
+from app.core.image_pipeline import ImageData, open_image
+from app.models.fault_models import BearingType
+
+BEARING_TYPES = [bearing_type.value for bearing_type in BearingType]
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"}
+
+OK = "ok"
+FAILED = "failed"
+
+
+def find_images(directory: Path) -> List[Path]:
+    """All images below a directory, in a stable order"""
+    return sorted(path for path in directory.rglob("*")
+                  if path.is_file() and path.suffix.lower() in IMAGE_SUFFIXES)
+
+
+def prepare_image(name: str, digest: str, raw: ImageData, max_edge: int,
+                  jpeg_quality: int) -> Tuple[str, str, Optional[bytes], Optional[str]]:
+    """Orient and downscale one image file's bytes (or a buffer) into the JPEG to analyze"""
+    try:
+        image = open_image(raw)
+        is_jpeg = image.format == "JPEG"
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        if max_edge and max(image.size) > max_edge:
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        elif is_jpeg:
+            # Already a JPEG within the size limit: send the original bytes
+            return name, digest, bytes(raw), None
+
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=jpeg_quality)
+        return name, digest, buffer.getvalue(), None
+    except Exception as e:
+        return name, digest, None, f"{type(e).__name__}: {e}"
+
+
+def preprocess_image(path: str, max_edge: int, jpeg_quality: int) -> Tuple[str, str, Optional[bytes], Optional[str]]:
+    """
+    Decode, orient and downscale one image (runs in a worker process)
+
+    The digest is taken over the original file so results can be joined with
+    the history store, which hashes the uploaded bytes.
+
+    Returns:
+        (path, sha256 of the file, JPEG bytes to analyze or None, error or None)
+    """
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except OSError as e:
+        return path, "", None, f"{type(e).__name__}: {e}"
+    return prepare_image(path, hashlib.sha256(raw).hexdigest(), raw, max_edge, jpeg_quality)
+
+
+# Archive opened once in each worker process by open_worker_archive
+worker_archive: Optional[ImageArchive] = None
+
+
+def open_worker_archive(path: str):
+    global worker_archive
+    worker_archive = ImageArchive(path)
+
+
+def preprocess_archived(digest: str, max_edge: int, jpeg_quality: int) -> Tuple[str, str, Optional[bytes], Optional[str]]:
+    """Pre-process one packed image, decoding it in place from the archive mapping"""
+    view = worker_archive.get(digest)
+    if view is None:
+        return digest, digest, None, "Not in archive"
+    try:
+        return prepare_image(digest, digest, view, max_edge, jpeg_quality)
+    finally:
+        view.release()
+
+
+class Manifest:
+    """
+    Append-only checkpoint of processed images.
+
+    One JSON line per finished image; on load the last status of each path
+    wins, so retried images simply append a newer line.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.status: Dict[str, str] = {}
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # A line cut short by a crash
+                    self.status[entry["path"]] = entry["status"]
+        self._file = open(path, "a", encoding="utf-8")
+
+    def pending(self, paths: List[str], retry_failed: bool) -> List[str]:
+        redo = {FAILED} if retry_failed else set()
+        return [path for path in paths if path not in self.status or self.status[path] in redo]
+
+    def mark(self, path: str, status: str, error: Optional[str] = None):
+        entry = {"path": path, "status": status}
+        if error:
+            entry["error"] = error
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        self.status[path] = status
+
+    def close(self):
+        self._file.close()
+
+
+class Progress:
+    """Throughput and ETA reporting"""
+
+    def __init__(self, total: int, interval: float = 10.0):
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.failed = 0
+        self.start = time.time()
+        self._last_report = self.start
+
+    def record(self, ok: bool):
+        self.done += 1
+        if not ok:
+            self.failed += 1
+        now = time.time()
+        if now - self._last_report >= self.interval or self.done == self.total:
+            self._last_report = now
+            self.report()
+
+    def report(self):
+        elapsed = time.time() - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.done
+        eta = remaining / rate if rate > 0 else float("inf")
+        eta_text = time.strftime("%H:%M:%S", time.gmtime(eta)) if eta != float("inf") else "--:--:--"
+        print(f"📊 {self.done}/{self.total} ({self.done / self.total:.1%}) | "
+              f"{rate:.2f} img/s | {self.failed} failed | ETA {eta_text}", flush=True)
+
+
+def image_options(args: argparse.Namespace, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Prompt options of one image: command-line values, else its archive metadata"""
+    mounted_on_motor = args.mounted_on_motor
+    if mounted_on_motor is None and metadata.get("mounted_on_motor") is not None:
+        try:
+            mounted_on_motor = parse_bool(str(metadata["mounted_on_motor"]))
+        except argparse.ArgumentTypeError:
+            mounted_on_motor = None
+    bearing_type = args.bearing_type or metadata.get("bearing_type")
+    # Metadata is free-form: values that are not a bearing type stay out of the prompt and the history
+    if bearing_type not in BEARING_TYPES:
+        bearing_type = None
+    return {
+        "bearing_type": bearing_type,
+        "mounted_on_motor": mounted_on_motor,
+        "application": args.application or metadata.get("application")
+    }
+
+
+async def reanalyze(args: argparse.Namespace, pending: List[str], manifest: Manifest,
+                    archive: Optional[ImageArchive] = None) -> Progress:
+    """
+    Run the decode -> pre-process -> analyze pipeline over the pending images
+
+    Pending images are file paths, or digests when reading a packed archive.
+    """
+    from app.core.gemini_fault_analyzer import GeminiFaultAnalyzer
+    from app.core.history_store import create_history_store, is_failed_result
+
+    analyzer = GeminiFaultAnalyzer()
+    if not analyzer.is_ready():
+        raise RuntimeError("Analyzer not ready; set GOOGLE_API_KEY or MODEL_BACKEND=fake")
+    analyze = analyzer.analyze_bearing_image_tiled if args.tiled else analyzer.analyze_bearing_image
+    history = create_history_store() if args.record_history else None
+
+    progress = Progress(len(pending), args.report_interval)
+    loop = asyncio.get_running_loop()
+    # Bounded so decoding runs only a little ahead of the model calls
+    queue: asyncio.Queue = asyncio.Queue(maxsize=args.concurrency * 2)
+
+    if archive is not None:
+        pool = ProcessPoolExecutor(max_workers=args.workers, initializer=open_worker_archive,
+                                   initargs=(str(archive.path),))
+        preprocess = preprocess_archived
+    else:
+        pool = ProcessPoolExecutor(max_workers=args.workers)
+        preprocess = preprocess_image
+
+    with open(args.output, "a", encoding="utf-8") as output, pool as executor:
+
+        async def produce():
+            for item in pending:
+                await queue.put(loop.run_in_executor(
+                    executor, preprocess, item, args.max_edge, args.jpeg_quality
+                ))
+            for _ in range(args.concurrency):
+                await queue.put(None)
+
+        async def consume():
+            while True:
+                prepared = await queue.get()
+                if prepared is None:
+                    return
+                item, digest, image_data, error = await prepared
+                if image_data is None:
+                    manifest.mark(item, FAILED, error)
+                    progress.record(ok=False)
+                    continue
+
+                metadata = archive.metadata(digest) if archive is not None else {}
+                options = image_options(args, metadata)
+                response = await analyze(image_data, **options)
+                if is_failed_result(response.analysis):
+                    manifest.mark(item, FAILED, response.analysis.technical_notes)
+                    progress.record(ok=False)
+                    continue
+
+                if history is not None:
+                    response.analysis_id = await history.record_async(
+                        response,
+                        image_digest=digest,
+                        **options
+                    )
+                # The result line is written before the manifest entry: a crash
+                # in between re-analyzes one image rather than losing it
+                output.write(json.dumps({
+                    "path": metadata.get("path", item),
+                    "image_digest": digest,
+                    **json.loads(response.model_dump_json())
+                }) + "\n")
+                output.flush()
+                manifest.mark(item, OK)
+                progress.record(ok=True)
+
+        await asyncio.gather(produce(), *(consume() for _ in range(args.concurrency)))
+
+    return progress
+
+
+def parse_bool(value: str) -> bool:
+    if value.lower() in ("true", "yes", "1"):
+        return True
+    if value.lower() in ("false", "no", "0"):
+        return False
+    raise argparse.ArgumentTypeError(f"Expected true or false, got {value}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Re-analyze an archive of bearing images")
+    parser.add_argument("source", type=Path,
+                        help="Archive directory, searched recursively, or a packed archive (.pack)")
+    parser.add_argument("--output", type=Path, required=True, help="Results file (JSON lines, appended)")
+    parser.add_argument("--manifest", type=Path, help="Checkpoint file (default: <output>.manifest)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent model calls")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Pre-processing processes")
+    parser.add_argument("--max-edge", type=int, default=3072,
+                        help="Downscale images whose longest edge exceeds this (0 keeps full size)")
+    parser.add_argument("--jpeg-quality", type=int, default=92)
+    parser.add_argument("--tiled", action="store_true", help="Use tiled full-resolution analysis")
+    parser.add_argument("--bearing-type", choices=BEARING_TYPES, help="Bearing type passed to the prompt")
+    parser.add_argument("--mounted-on-motor", type=parse_bool, help="true or false")
+    parser.add_argument("--application", help="Application passed to the prompt")
+    parser.add_argument("--retry-failed", action="store_true", help="Re-run images that failed before")
+    parser.add_argument("--record-history", action="store_true", help="Also store results in the history database")
+    parser.add_argument("--limit", type=int, help="Process at most this many pending images")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="Seconds between progress lines")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    archive = None
+    if args.source.is_file():
+        try:
+            archive = ImageArchive(args.source)
+        except (OSError, ValueError) as e:
+            print(f"❌ Cannot open archive {args.source}: {e}")
+            return 1
+        images = archive.digests()
+    elif args.source.is_dir():
+        images = [str(path) for path in find_images(args.source)]
+    else:
+        print(f"❌ Not a directory or archive: {args.source}")
+        return 1
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    manifest = Manifest(args.manifest or args.output.with_name(args.output.name + ".manifest"))
+
+    pending = manifest.pending(images, args.retry_failed)
+    if args.limit:
+        pending = pending[:args.limit]
+    print(f"📸 {len(images)} images found, {len(images) - len(pending)} already processed, "
+          f"{len(pending)} to analyze")
+    if not pending:
+        print("✅ Nothing to do")
+        manifest.close()
+        return 0
+
+    try:
+        progress = asyncio.run(reanalyze(args, pending, manifest, archive))
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrupted; run the same command again to resume")
+        return 130
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        manifest.close()
+        if archive is not None:
+            archive.close()
+
+    elapsed = time.time() - progress.start
+    print(f"✅ Done: {progress.done - progress.failed} analyzed, {progress.failed} failed "
+          f"in {elapsed:.1f}s ({progress.done / elapsed if elapsed else 0:.2f} img/s)")
+    print(f"💾 Results appended to {args.output}")
+    return 0 if progress.failed == 0 else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
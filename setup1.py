@@ -114,7 +114,7 @@ def main():
         print("✅ Ready to use! You can now:")
         print("   1. Start the server: python -m app.main")
         print("   2. Test analysis: python test_gemini_analysis.py")
-        print("   3. Use API client: python gemini_client.py")
+        print("   3. Load-test the API: python gemini_client.py --synthetic 10 --requests 50")
     else:
         print("⚠️  Almost ready! Please:")
         print("   1. Set your Google API key: export GOOGLE_API_KEY='your-key'")
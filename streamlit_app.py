@@ -1,9 +1,92 @@
+import hashlib
+import io
+import os
+import time
+
 import streamlit as st
 import requests
 from PIL import Image
 
 # --- CONFIGURATION ---
-API_URL = "http://localhost:8001/api/v1/analyze-image"  # Update to actual endpoint
+API_BASE_URL = "http://localhost:8001/api/v1"
+JOBS_URL = f"{API_BASE_URL}/jobs"
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) seconds for each API call
+ANALYSIS_TIMEOUT = 300  # Give up waiting on a job after this many seconds
+POLL_INTERVAL = 1.0
+PREVIEW_SIZE = (480, 480)
+API_KEY = os.environ.get("API_KEY")  # Needed when the API runs with AUTH_ENABLED
+AUTH_HEADERS = {"X-API-Key": API_KEY} if API_KEY else {}
+INTERACTIVE_HEADERS = {"X-Request-Priority": "interactive", **AUTH_HEADERS}  # Scheduled ahead of bulk traffic
+
+
+class JobPending(Exception):
+    """Raised while a submitted job has not finished, so the result is not cached"""
+
+
+class JobFailed(Exception):
+    """Raised when a submitted job failed or is no longer known to the API"""
+
+
+def file_digest(data: bytes) -> str:
+    """Content digest used as the cache key for previews and results"""
+    return hashlib.sha256(data).hexdigest()
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def load_preview(digest: str, _data: bytes) -> bytes:
+    """Decode and downscale an upload once per file digest"""
+    image = Image.open(io.BytesIO(_data))
+    image.thumbnail(PREVIEW_SIZE)
+    buffer = io.BytesIO()
+    image.convert("RGB").save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def submit_analysis(digest: str, bearing_type: str, mounted_on_motor: bool, attempt: int,
+                    _filename: str, _mime: str, _data: bytes) -> str:
+    """Submit one image as an async job and return its job id"""
+    response = requests.post(
+        JOBS_URL,
+        files={"images": (_filename, _data, _mime)},
+        data={"bearing_type": bearing_type, "mounted_on_motor": str(mounted_on_motor).lower()},
+        headers=INTERACTIVE_HEADERS,
+        timeout=REQUEST_TIMEOUT
+    )
+    response.raise_for_status()
+    return response.json()["jobs"][0]["job_id"]
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def get_analysis(digest: str, bearing_type: str, mounted_on_motor: bool, attempt: int,
+                 _job_id: str) -> dict:
+    """Fetch a finished job result; pending or failed jobs raise and are not cached"""
+    response = requests.get(f"{JOBS_URL}/{_job_id}", headers=AUTH_HEADERS, timeout=REQUEST_TIMEOUT)
+    if response.status_code == 404:
+        raise JobFailed("Job expired on the server")
+    response.raise_for_status()
+
+    job = response.json()
+    if job["status"] == "failed":
+        raise JobFailed(job.get("error") or "Analysis failed")
+    if job["status"] != "completed":
+        raise JobPending(job["status"])
+    return job["result"]
+
+
+def render_report(filename: str, result: dict):
+    """Render one analysis report card"""
+    analysis = result.get("analysis", {})
+    st.markdown('<div class="result-card">', unsafe_allow_html=True)
+    st.markdown(f'<div class="result-title">📝 Analysis Report — {filename}</div>', unsafe_allow_html=True)
+    st.markdown(f'<span class="result-label">Observed Damage:</span>{analysis.get("observed_damage", "-")}', unsafe_allow_html=True)
+    st.markdown(f'<span class="result-label">Failure Mode:</span>{analysis.get("failure_mode", "-")}', unsafe_allow_html=True)
+    st.markdown(f'<span class="result-label">Root Cause(s):</span>{"<br>".join(analysis.get("root_cause_analysis", []))}', unsafe_allow_html=True)
+    st.markdown(f'<span class="result-label">Confidence Score:</span>{round(analysis.get("confidence_score", 0)*100)}%', unsafe_allow_html=True)
+    st.markdown('<span class="result-label">Recommendations:</span>', unsafe_allow_html=True)
+    st.markdown('<ul class="recommendation-list">' + ''.join(f"<li>{rec}</li>" for rec in analysis.get("recommendations", [])) + '</ul>', unsafe_allow_html=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+
 
 # --- PAGE STYLE ---
 st.set_page_config(page_title="CIMCON Digital - Bearing RCFA", layout="centered")
@@ -92,15 +175,35 @@ st.markdown("""
 st.markdown('<div class="title">🛠️ CIMCON Digital - Bearing RCFA</div>', unsafe_allow_html=True)
 st.markdown('<div class="subtitle">Root Cause Failure Analysis for Bearings using AI</div>', unsafe_allow_html=True)
 
+# --- SESSION STATE ---
+if "attempts" not in st.session_state:
+    st.session_state.attempts = {}  # digest -> resubmission counter after failures
+if "analysis_request" not in st.session_state:
+    st.session_state.analysis_request = None  # Inputs the last Analyze click was made with
+
 # --- INPUT SECTION ---
-st.markdown('<div class="section"><b>1️⃣ Upload Bearing Image</b></div>', unsafe_allow_html=True)
-image_file = st.file_uploader("Upload Bearing Image", type=["jpg", "jpeg", "png"], label_visibility="collapsed")
+st.markdown('<div class="section"><b>1️⃣ Upload Bearing Images</b></div>', unsafe_allow_html=True)
+image_files = st.file_uploader(
+    "Upload Bearing Images",
+    type=["jpg", "jpeg", "png"],
+    accept_multiple_files=True,
+    label_visibility="collapsed"
+)
+
+uploads = []
+for image_file in image_files or []:
+    data = image_file.getvalue()
+    uploads.append((image_file.name, image_file.type, data, file_digest(data)))
 
-if image_file:
-    st.image(Image.open(image_file), caption="Uploaded Image", use_container_width=True)
+if uploads:
+    preview_columns = st.columns(min(len(uploads), 3))
+    for index, (name, _, data, digest) in enumerate(uploads):
+        with preview_columns[index % len(preview_columns)]:
+            st.image(load_preview(digest, data), caption=name, use_container_width=True)
 
 st.markdown('<div class="section"><b>2️⃣ Select Motor Mounting</b></div>', unsafe_allow_html=True)
 motor_mounted = st.radio("Select Motor Mounting", ("Yes", "No"), horizontal=True, label_visibility="collapsed")
+mounted_on_motor = motor_mounted == "Yes"
 
 st.markdown('<div class="section"><b>3️⃣ Select Bearing Type</b></div>', unsafe_allow_html=True)
 bearing_type = st.selectbox(
@@ -118,34 +221,51 @@ bearing_type = st.selectbox(
 
 # --- ANALYZE BUTTON ---
 st.markdown('<div class="section"></div>', unsafe_allow_html=True)
-analyze_btn = st.button("🔍 Analyze Bearing", use_container_width=True)
-
-if analyze_btn:
-    if image_file and bearing_type:
-        with st.spinner("Analyzing image and generating report..."):
-            files = {"image": (image_file.name, image_file.getvalue(), image_file.type)}
-            data = {
-                "motor_mounted": motor_mounted,
-                "bearing_type": bearing_type
-            }
+current_request = (tuple(upload[3] for upload in uploads), bearing_type, mounted_on_motor)
+if st.button("🔍 Analyze Bearing", use_container_width=True):
+    st.session_state.analysis_request = current_request
+
+# Keep showing reports across reruns until the inputs change
+if st.session_state.analysis_request == current_request:
+    if uploads and bearing_type:
+        # Submit every image up front; cached submissions are not sent again on rerun
+        pending = {}
+        for name, mime, data, digest in uploads:
+            attempt = st.session_state.attempts.get(digest, 0)
             try:
-                response = requests.post(API_URL, files=files, data=data)
-                if response.status_code == 200:
-                    result = response.json()
-                    analysis = result.get("analysis", {})
-                    st.markdown('<div class="result-card">', unsafe_allow_html=True)
-                    st.markdown('<div class="result-title">📝 Analysis Report</div>', unsafe_allow_html=True)
-                    st.markdown(f'<span class="result-label">Observed Damage:</span>{analysis.get("observed_damage", "-")}', unsafe_allow_html=True)
-                    st.markdown(f'<span class="result-label">Failure Mode:</span>{analysis.get("failure_mode", "-")}', unsafe_allow_html=True)
-                    st.markdown(f'<span class="result-label">Root Cause(s):</span>{"<br>".join(analysis.get("root_cause_analysis", []))}', unsafe_allow_html=True)
-                    st.markdown(f'<span class="result-label">Confidence Score:</span>{round(analysis.get("confidence_score", 0)*100)}%', unsafe_allow_html=True)
-                    st.markdown('<span class="result-label">Recommendations:</span>', unsafe_allow_html=True)
-                    st.markdown('<ul class="recommendation-list">' + ''.join(f"<li>{rec}</li>" for rec in analysis.get("recommendations", [])) + '</ul>', unsafe_allow_html=True)
-                    st.markdown('</div>', unsafe_allow_html=True)
-                else:
-                    st.error(f"API Error: {response.status_code} - {response.text}")
-            except Exception as e:
-                st.error(f"Request failed: {e}")
+                job_id = submit_analysis(digest, bearing_type, mounted_on_motor, attempt, name, mime, data)
+                pending[digest] = (name, attempt, job_id)
+            except requests.RequestException as e:
+                st.error(f"Could not submit {name}: {e}")
+
+        progress = st.progress(0.0, text="Analyzing images and generating reports...")
+        report_slots = {digest: st.empty() for digest in pending}
+        total = len(pending)
+        deadline = time.monotonic() + ANALYSIS_TIMEOUT
+
+        # Poll all jobs together and render each report as soon as it is ready
+        while pending:
+            for digest, (name, attempt, job_id) in list(pending.items()):
+                try:
+                    result = get_analysis(digest, bearing_type, mounted_on_motor, attempt, job_id)
+                    with report_slots[digest].container():
+                        render_report(name, result)
+                    del pending[digest]
+                except JobPending:
+                    continue
+                except (JobFailed, requests.RequestException) as e:
+                    st.session_state.attempts[digest] = attempt + 1
+                    report_slots[digest].error(f"Analysis of {name} failed: {e}")
+                    del pending[digest]
+
+            done = total - len(pending)
+            progress.progress(done / total if total else 1.0, text=f"Completed {done} of {total} analyses")
+            if not pending:
+                break
+            if time.monotonic() > deadline:
+                st.warning(f"{len(pending)} analyses are still running. Press Analyze again to check on them.")
+                break
+            time.sleep(POLL_INTERVAL)
     else:
         st.error("Please provide all required information.")
 
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Tenant and API key administration
+Manages the tenant file read by the API when AUTH_ENABLED is set
+
+Keys are printed once when issued and only their SHA-256 is stored. The
+running API picks up changes within a few seconds, without a restart.
+
+Examples:
+    # A plant limited to 30 requests/min, 2 concurrent analyses and 2M tokens a day
+    python tenant_admin.py add plant-a --name "Plant A" --rpm 30 --max-concurrent 2 --daily-tokens 2000000
+
+    # Issue a key (shown once) and list tenants
+    python tenant_admin.py issue-key plant-a
+    python tenant_admin.py list
+
+    # Revoke every key of a tenant
+    python tenant_admin.py revoke-keys plant-a
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+# Add current directory to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+
+from app.core.config import settings
+from app.core.tenants import ApiKeyStore, TenantConfig, generate_api_key, hash_api_key
+
+
+def limit_text(value: Optional[int], default: int) -> str:
+    limit = default if value is None else value
+    text = "unlimited" if limit == 0 else str(limit)
+    return text if value is not None else f"{text} (default)"
+
+
+def add_tenant(store: ApiKeyStore, args: argparse.Namespace) -> int:
+    """Create a tenant or update its limits"""
+    tenants = {tenant.tenant_id: tenant for tenant in store.tenants()}
+    tenant = tenants.get(args.tenant_id)
+    if tenant is None:
+        tenant = TenantConfig(args.tenant_id)
+        tenants[tenant.tenant_id] = tenant
+        print(f"✅ Tenant {args.tenant_id} created")
+    else:
+        print(f"🔄 Tenant {args.tenant_id} updated")
+
+    if args.name is not None:
+        tenant.name = args.name
+    if args.rpm is not None:
+        tenant.requests_per_minute = args.rpm
+    if args.max_concurrent is not None:
+        tenant.max_concurrent = args.max_concurrent
+    if args.daily_tokens is not None:
+        tenant.daily_token_limit = args.daily_tokens
+    if args.admin is not None:
+        tenant.admin = args.admin
+    if args.enabled is not None:
+        tenant.enabled = args.enabled
+
+    store.save(list(tenants.values()))
+    return 0
+
+
+def issue_key(store: ApiKeyStore, args: argparse.Namespace) -> int:
+    """Add a new API key to a tenant and print it"""
+    tenants = store.tenants()
+    tenant = next((tenant for tenant in tenants if tenant.tenant_id == args.tenant_id), None)
+    if tenant is None:
+        print(f"❌ Unknown tenant: {args.tenant_id}")
+        return 1
+
+    api_key = generate_api_key()
+    tenant.api_keys.append(hash_api_key(api_key))
+    store.save(tenants)
+    print(f"🔑 API key for {tenant.tenant_id} (store it now, it is not shown again):")
+    print(api_key)
+    return 0
+
+
+def revoke_keys(store: ApiKeyStore, args: argparse.Namespace) -> int:
+    """Remove every API key of a tenant"""
+    tenants = store.tenants()
+    tenant = next((tenant for tenant in tenants if tenant.tenant_id == args.tenant_id), None)
+    if tenant is None:
+        print(f"❌ Unknown tenant: {args.tenant_id}")
+        return 1
+
+    revoked = len(tenant.api_keys)
+    tenant.api_keys = []
+    store.save(tenants)
+    print(f"✅ {revoked} keys of {tenant.tenant_id} revoked")
+    return 0
+
+
+def list_tenants(store: ApiKeyStore, args: argparse.Namespace) -> int:
+    """Print tenants and their limits"""
+    tenants = store.tenants()
+    if not tenants:
+        print(f"⚠️  No tenants in {store.path}")
+        return 0
+
+    print(f"📊 {len(tenants)} tenants in {store.path}")
+    for tenant in sorted(tenants, key=lambda tenant: tenant.tenant_id):
+        flags = [flag for flag, on in (("admin", tenant.admin), ("disabled", not tenant.enabled)) if on]
+        print(f"  {tenant.tenant_id} ({tenant.name}){' [' + ', '.join(flags) + ']' if flags else ''}")
+        print(f"    keys: {len(tenant.api_keys)} | "
+              f"requests/min: {limit_text(tenant.requests_per_minute, settings.DEFAULT_TENANT_RPM)} | "
+              f"concurrent: {limit_text(tenant.max_concurrent, settings.DEFAULT_TENANT_MAX_CONCURRENT)} | "
+              f"tokens/day: {limit_text(tenant.daily_token_limit, settings.DEFAULT_TENANT_DAILY_TOKENS)}")
+    return 0
+
+
+def parse_bool(value: str) -> bool:
+    if value.lower() in ("true", "yes", "1"):
+        return True
+    if value.lower() in ("false", "no", "0"):
+        return False
+    raise argparse.ArgumentTypeError(f"Expected true or false, got {value}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Tenant and API key administration")
+    parser.add_argument("--file", default=settings.TENANTS_FILE, help="Tenant file path")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add_parser = commands.add_parser("add", help="Create a tenant or update its limits")
+    add_parser.add_argument("tenant_id")
+    add_parser.add_argument("--name", help="Display name")
+    add_parser.add_argument("--rpm", type=int, help="Requests per minute (0 = unlimited)")
+    add_parser.add_argument("--max-concurrent", type=int, help="Concurrent analyses (0 = unlimited)")
+    add_parser.add_argument("--daily-tokens", type=int, help="Model tokens per UTC day (0 = unlimited)")
+    add_parser.add_argument("--admin", type=parse_bool, help="May see every tenant's data (true or false)")
+    add_parser.add_argument("--enabled", type=parse_bool, help="Disabled tenants are rejected (true or false)")
+
+    for name, help_text in (("issue-key", "Issue a new API key"), ("revoke-keys", "Revoke all API keys")):
+        command_parser = commands.add_parser(name, help=help_text)
+        command_parser.add_argument("tenant_id")
+
+    commands.add_parser("list", help="List tenants and limits")
+
+    args = parser.parse_args(argv)
+    store = ApiKeyStore(args.file)
+    handlers = {"add": add_tenant, "issue-key": issue_key, "revoke-keys": revoke_keys, "list": list_tenants}
+    return handlers[args.command](store, args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+import pytest
+
+from app.core.bearing_catalog import BUNDLED_CATALOG, BearingCatalog
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return BearingCatalog.from_csv([BUNDLED_CATALOG])
+
+
+@pytest.mark.parametrize("designation, base", [
+    ("6205", "6205"),
+    ("6205-2RS C3", "6205"),
+    ("6205/C3", "6205"),
+    ("6205zz", "6205"),
+    ("62052RS", "6205"),
+    ("6205-2RSH/C3", "6205"),
+    ("6205ZZC3", "6205"),
+    ("6302RS", "6302"),
+    ("NU205ECP", "NU205"),
+    ("NU205ECP/C3", "NU205"),
+    ("7205BECP", "7205B"),
+    ("22205EK", "22205"),
+    ("30205J", "30205"),
+])
+def test_suffixes_resolve_to_the_base_designation(catalog, designation, base):
+    assert catalog.designations[catalog.resolve(designation)] == base
+
+
+@pytest.mark.parametrize("designation", ["63005", "63006", "62052", "60012", "6205X", "NU2055", "7205", "ZZ", ""])
+def test_unknown_bases_are_not_truncated(catalog, designation):
+    assert catalog.resolve(designation) is None
+    assert designation not in catalog
+
+
+def test_lookup_marks_unknown_designations(catalog):
+    rows = catalog.lookup(["6205-2RS", "63005", "6300"])
+    assert rows[1] == -1
+    assert catalog.designations[rows[[0, 2]]].tolist() == ["6205", "6300"]
@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+import io
+
+import pytest
+from PIL import Image
+
+from app.core.blob_store import LocalBlobStore, S3BlobStore, image_key, sniff_content_type, thumbnail_key
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+BUCKET = "bearing-images"
+
+
+def png_image(width=64, height=48, color=(200, 40, 40)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture(params=["local", "s3"])
+def store(request, tmp_path, monkeypatch):
+    if request.param == "local":
+        yield LocalBlobStore(str(tmp_path / "images"))
+        return
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield S3BlobStore(BUCKET, prefix="uploads", client=client)
+
+
+def test_put_get_exists_delete(store):
+    data = png_image()
+    digest = store.put(data)
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert store.exists(digest)
+    assert bytes(store.get(digest)) == data
+    assert sniff_content_type(bytes(store.get(digest))[:16]) == "image/png"
+
+    store.delete(digest)
+    assert not store.exists(digest)
+    assert store.get(digest) is None
+
+
+def test_same_image_is_stored_once(store):
+    data = png_image()
+    assert store.put(data) == store.put(data, hashlib.sha256(data).hexdigest())
+    assert store.counts["stored"] == 1
+    assert store.counts["deduplicated"] == 1
+    assert store.counts["bytes_stored"] == len(data)
+
+
+def test_missing_image(store):
+    digest = "0" * 64
+    assert not store.exists(digest)
+    assert store.get(digest) is None
+    assert asyncio.run(store.thumbnail(digest, 64)) is None
+
+
+def test_digest_mismatch_is_rejected(store):
+    data = png_image()
+    wrong = hashlib.sha256(b"other bytes").hexdigest()
+    with pytest.raises(ValueError):
+        store.put(data, wrong)
+    assert not store.exists(wrong)
+    assert not store.exists(hashlib.sha256(data).hexdigest())
+    assert store.counts["stored"] == 0
+
+
+def test_background_put_counts_digest_mismatch(store):
+    async def put_and_flush():
+        store.put_background(png_image(), "f" * 64)
+        await store.flush()
+
+    asyncio.run(put_and_flush())
+    assert store.counts["failed"] == 1
+    assert not store.exists("f" * 64)
+
+
+def test_thumbnail_is_generated_once_and_cached(store):
+    digest = store.put(png_image(400, 200))
+
+    first = bytes(asyncio.run(store.thumbnail(digest, 100)))
+    with Image.open(io.BytesIO(first)) as thumbnail:
+        assert thumbnail.format == "JPEG"
+        assert thumbnail.size == (100, 50)
+    assert store.counts["thumbnails_generated"] == 1
+
+    assert bytes(asyncio.run(store.thumbnail(digest, 100))) == first
+    assert store.counts["thumbnails_generated"] == 1
+    assert store.counts["thumbnail_hits"] == 1
+
+    store.delete(digest, thumbnail_sizes=[100])
+    assert store.get(digest) is None
+    assert store._get(thumbnail_key(digest, 100)) is None
+
+
+def test_s3_keys_carry_the_prefix(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        digest = S3BlobStore(BUCKET, prefix="/uploads/", client=client).put(png_image())
+        head = client.head_object(Bucket=BUCKET, Key="uploads/" + image_key(digest))
+        assert head["ContentType"] == "image/png"
@@ -0,0 +1,56 @@
+import csv
+from datetime import datetime
+
+import pytest
+
+from app.core.exporter import EXPORT_COLUMNS, CsvExporter, PartitionedExporter
+
+
+def record(number, date, bearing_type):
+    values = dict.fromkeys(EXPORT_COLUMNS)
+    values.update(id=number, created_at=datetime.fromisoformat(f"{date}T12:00:00"), date=date,
+                  bearing_type=bearing_type, failure_mode="Fatigue", root_causes=["Overload", "Misalignment"],
+                  root_cause_codes=[], recommendations=[])
+    return values
+
+
+def test_incomplete_exporter_fails_when_created(tmp_path):
+    class NoClose(PartitionedExporter):
+        def _open_writer(self, path):
+            return open(path, "w")
+
+        def _write_group(self, writer, records):
+            writer.write(str(len(records)))
+
+    with pytest.raises(TypeError, match="_close_writer"):
+        NoClose(tmp_path)
+
+
+def test_csv_export_is_partitioned_by_date_and_bearing_type(tmp_path):
+    exporter = CsvExporter(tmp_path, max_open_files=1)
+    exporter.write([record(1, "2025-01-01", "ball_bearing"), record(2, "2025-01-01", None)])
+    # Reopening an evicted partition starts a new part file
+    exporter.write([record(3, "2025-01-01", "ball_bearing")])
+    exporter.close()
+
+    assert (exporter.rows_written, exporter.files_written) == (3, 3)
+    ball = tmp_path / "date=2025-01-01" / "bearing_type=ball_bearing"
+    assert sorted(path.name for path in ball.iterdir()) == ["part-00000.csv", "part-00001.csv"]
+    with open(ball / "part-00000.csv", newline="", encoding="utf-8") as handle:
+        rows = list(csv.DictReader(handle))
+    assert [row["id"] for row in rows] == ["1"]
+    assert "date" not in rows[0] and "bearing_type" not in rows[0]
+    assert rows[0]["root_causes"] == "Overload; Misalignment"
+    assert (tmp_path / "date=2025-01-01" / "bearing_type=unknown" / "part-00000.csv").exists()
+
+
+def test_parquet_export_reads_back(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    from app.core.exporter import ParquetExporter
+
+    exporter = ParquetExporter(tmp_path)
+    exporter.write([record(1, "2025-01-01", "ball_bearing"), record(2, "2025-01-02", "ball_bearing")])
+    exporter.close()
+    table = pq.read_table(tmp_path, partitioning="hive")
+    assert sorted(table.column("id").to_pylist()) == [1, 2]
+    assert table.column("root_causes").to_pylist()[0] == ["Overload", "Misalignment"]
@@ -0,0 +1,52 @@
+import sqlite3
+
+from app.core.config import settings
+from app.core.history_store import DATA_MIGRATIONS, AnalysisHistoryStore
+
+# analyses as the first release created it, before tenants
+FIRST_RELEASE_SCHEMA = """
+CREATE TABLE analyses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    image_digest TEXT NOT NULL,
+    bearing_type TEXT,
+    mounted_on_motor INTEGER,
+    application TEXT,
+    model_used TEXT,
+    failure_mode TEXT,
+    confidence_score REAL,
+    processing_time REAL,
+    result_json TEXT NOT NULL
+)
+"""
+
+
+def insert_untenanted(db, digest):
+    with sqlite3.connect(db) as connection:
+        connection.execute("INSERT INTO analyses (created_at, image_digest, result_json) VALUES (86400, ?, '{}')",
+                           (digest,))
+
+
+def tenants(db):
+    with sqlite3.connect(db) as connection:
+        return dict(connection.execute("SELECT image_digest, tenant FROM analyses"))
+
+
+def test_untenanted_rows_join_the_default_tenant_once(tmp_path, monkeypatch):
+    db = str(tmp_path / "history.db")
+    with sqlite3.connect(db) as connection:
+        connection.execute(FIRST_RELEASE_SCHEMA)
+    insert_untenanted(db, "legacy")
+
+    monkeypatch.setattr(settings, "DEFAULT_TENANT", "plant-a")
+    AnalysisHistoryStore(db)
+    assert tenants(db) == {"legacy": "plant-a"}
+    with sqlite3.connect(db) as connection:
+        assert connection.execute("PRAGMA user_version").fetchone()[0] == len(DATA_MIGRATIONS)
+        assert connection.execute("SELECT created_day, created_month FROM analyses").fetchone() == ("1970-01-02", "1970-01")
+
+    # A later default moves nothing that was already assigned
+    insert_untenanted(db, "later")
+    monkeypatch.setattr(settings, "DEFAULT_TENANT", "plant-b")
+    AnalysisHistoryStore(db)
+    assert tenants(db) == {"legacy": "plant-a", "later": None}
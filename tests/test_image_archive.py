@@ -0,0 +1,80 @@
+import hashlib
+import json
+
+import pytest
+
+from app.core.image_archive import ArchiveWriter, ImageArchive, archive_paths
+
+FIRST = b"\xff\xd8\xff first image"
+SECOND = b"\x89PNG\r\n\x1a\n second image"
+THIRD = b"GIF89a third image"
+
+
+def digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def archive_path(tmp_path):
+    path = tmp_path / "images.pack"
+    with ArchiveWriter(path) as writer:
+        writer.add(FIRST, {"path": "first.jpg", "label": "fatigue"})
+        writer.add(SECOND, {"path": "second.png"})
+    return path
+
+
+def crash_mid_write(path, data: bytes, torn_line: str):
+    """What a writer killed while adding an image leaves behind"""
+    _, journal_path, _ = archive_paths(path)
+    with open(path, "ab") as handle:
+        handle.write(data)
+    with open(journal_path, "a", encoding="utf-8") as handle:
+        handle.write(torn_line)
+
+
+def assert_holds_all(path):
+    with ImageArchive(path) as archive:
+        assert len(archive) == 3
+        assert archive.digests() == [digest(FIRST), digest(SECOND), digest(THIRD)]
+        assert bytes(archive.get(digest(FIRST))) == FIRST
+        assert bytes(archive.get(digest(THIRD))) == THIRD
+        assert archive.metadata(digest(FIRST)) == {"path": "first.jpg", "label": "fatigue"}
+        assert archive.metadata(digest(THIRD)) == {"path": "third.gif"}
+
+
+@pytest.mark.parametrize("torn_line", [
+    '{"digest": "ab12", "offs',
+    # Complete JSON whose newline never made it
+    json.dumps({"digest": "ab" * 32, "offset": 1, "length": 2}),
+    '\xe9\xe9 not json\n',
+])
+def test_reopen_repairs_torn_journal(archive_path, torn_line):
+    crash_mid_write(archive_path, b"partial bytes of an image", torn_line)
+
+    with ArchiveWriter(archive_path) as writer:
+        assert digest(SECOND) in writer
+        assert writer.add(THIRD, {"path": "third.gif"}) == (digest(THIRD), True)
+        # Readers see the new image before the index is written
+        assert_holds_all(archive_path)
+
+    _, journal_path, _ = archive_paths(archive_path)
+    lines = journal_path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["digest"] for line in lines] == [digest(FIRST), digest(SECOND), digest(THIRD)]
+    assert_holds_all(archive_path)
+
+
+def test_reopen_drops_bytes_of_unjournaled_image(archive_path):
+    size = archive_path.stat().st_size
+    crash_mid_write(archive_path, b"image whose entry was never written", "")
+    ArchiveWriter(archive_path).close()
+    assert archive_path.stat().st_size == size
+
+
+def test_duplicates_are_skipped(archive_path):
+    with ArchiveWriter(archive_path) as writer:
+        assert writer.add(FIRST) == (digest(FIRST), False)
+        assert (writer.added, writer.duplicates) == (0, 1)
+    with ImageArchive(archive_path) as archive:
+        assert len(archive) == 2
+        assert archive.get(digest(THIRD)) is None
+        assert archive.get("not a digest") is None
@@ -0,0 +1,67 @@
+import pytest
+
+from app.core.recommendations import (
+    CAUSE_RECOMMENDATIONS, DIAGNOSIS_CODES, LIBRARY_VERSION, expand_codes, recommend
+)
+from app.core.taxonomy import OTHER, describe, normalize_failure_mode, normalize_result
+from app.models.fault_models import BearingAnalysisResult
+
+
+def codes_only_answer(failure_mode, root_causes):
+    """A parsed codes-only answer, normalized as parse_answer does before expanding it"""
+    return normalize_result(BearingAnalysisResult(
+        observed_damage="Marks on the raceway",
+        failure_mode=failure_mode,
+        root_cause_analysis=list(root_causes),
+        confidence_score=0.8
+    ))
+
+
+@pytest.mark.parametrize("code", DIAGNOSIS_CODES)
+def test_every_diagnosis_code_round_trips(code):
+    result = expand_codes(codes_only_answer(code, []))
+    assert result.failure_mode_code == code
+    assert result.failure_mode == describe(code)
+    # The label stored in history normalizes back to the same code
+    assert normalize_failure_mode(result.failure_mode) == code
+    assert result.recommendations == recommend(code, result.root_cause_codes)
+    assert LIBRARY_VERSION in result.technical_notes
+
+
+@pytest.mark.parametrize("cause", sorted(CAUSE_RECOMMENDATIONS))
+def test_every_cause_code_round_trips(cause):
+    result = expand_codes(codes_only_answer("fatigue", [cause]))
+    assert result.root_cause_codes == [cause]
+    assert result.root_cause_analysis == [describe(cause)]
+    assert result.recommendations[0] == CAUSE_RECOMMENDATIONS[cause][0]
+
+
+def test_code_spelling_is_forgiving():
+    result = expand_codes(codes_only_answer("Electrical-Erosion.", ["false brinelling"]))
+    assert result.failure_mode_code == "electrical_erosion"
+    assert result.root_cause_codes == ["false_brinelling"]
+
+
+def test_unknown_failure_mode_code_is_rejected():
+    result = codes_only_answer("gremlin_damage", [])
+    result.failure_mode_code = "gremlin_damage"
+    expand_codes(result)
+    assert result.failure_mode_code == OTHER
+    assert result.failure_mode == describe(OTHER)
+    assert result.recommendations == recommend(OTHER)
+
+
+def test_unknown_cause_codes_are_rejected():
+    result = codes_only_answer("corrosion", ["bad_vibes", "lubrication", "bad_vibes"])
+    result.root_cause_codes.append("made_up")
+    expand_codes(result)
+    assert result.root_cause_codes == ["lubrication"]
+    assert result.root_cause_analysis == [describe("lubrication")]
+
+
+def test_only_unknown_cause_codes_leave_no_causes():
+    result = codes_only_answer("corrosion", ["bad_vibes"])
+    result.root_cause_codes = ["made_up"]
+    expand_codes(result)
+    assert result.root_cause_codes == []
+    assert result.recommendations == recommend("corrosion")
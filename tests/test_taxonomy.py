@@ -0,0 +1,67 @@
+import pytest
+
+from app.core.taxonomy import OTHER, match_codes, normalize_failure_mode, normalize_root_causes
+
+
+@pytest.mark.parametrize("text, codes", [
+    ("Edmund bearing housing", ()),
+    ("Angular contact bearing with spalling", ("fatigue",)),
+    ("Worn cage", ("abrasion",)),
+    ("Cracks in the inner ring", ("fracture",)),
+    ("Dents from debris", ("overload", "contamination")),
+])
+def test_keywords_match_whole_words(text, codes):
+    assert match_codes(text) == codes
+
+
+@pytest.mark.parametrize("text, code", [
+    ("Corroded raceway", "corrosion"),
+    ("Spalled outer ring", "fatigue"),
+    ("Smearing on rollers", "adhesive_wear"),
+    ("Misaligned shaft", "misalignment"),
+])
+def test_stems_match_inflections(text, code):
+    assert match_codes(text) == (code,)
+
+
+@pytest.mark.parametrize("text, codes", [
+    ("No signs of contamination", ()),
+    ("Without any visible wear", ()),
+    ("Absence of corrosion on the rings", ()),
+    ("No contamination or corrosion", ()),
+    ("No contamination, but heavy spalling", ("fatigue",)),
+    ("No corrosion. Fatigue spalling on the raceway", ("fatigue",)),
+    ("Contamination-free raceway", ()),
+    ("Rust-free but worn", ("abrasion",)),
+    ("Normal wear on the cage", ()),
+])
+def test_negated_mentions_are_skipped(text, codes):
+    assert match_codes(text) == codes
+
+
+@pytest.mark.parametrize("text, codes", [
+    ("Sealed bearing with spalling", ("fatigue",)),
+    ("Normal operating temperature", ()),
+    ("Burnished raceway", ()),
+    ("Heat treatment defect", ()),
+    ("Seal failure let dirt in", ("contamination",)),
+    ("Temper colours on the rings", ("overheating",)),
+    ("Burn marks on the rollers", ("overheating",)),
+    ("Dented raceway", ("overload",)),
+])
+def test_incidental_words_do_not_imply_a_mechanism(text, codes):
+    assert match_codes(text) == codes
+
+
+def test_outcome_phrases_keep_their_own_negation():
+    assert normalize_failure_mode("No visible damage") == "no_damage"
+    assert normalize_failure_mode("Not applicable - no bearing detected") == "not_bearing"
+
+
+def test_unmatched_failure_mode_is_other():
+    assert normalize_failure_mode("No signs of contamination") == OTHER
+
+
+def test_root_causes_are_deduplicated_in_order():
+    causes = ["Contamination ingress through a damaged seal", "Inadequate lubrication", "Dirt in the grease"]
+    assert normalize_root_causes(causes) == ["contamination", "lubrication"]
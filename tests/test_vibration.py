@@ -0,0 +1,43 @@
+import io
+
+import numpy as np
+import pytest
+
+from app.core.vibration import iter_signal_chunks
+
+
+def npy_file(array: np.ndarray) -> io.BytesIO:
+    buffer = io.BytesIO()
+    np.save(buffer, array)
+    buffer.seek(0)
+    return buffer
+
+
+def signal(fileobj, filename, column=None) -> np.ndarray:
+    return np.concatenate(list(iter_signal_chunks(fileobj, filename, chunk_samples=64, column=column)))
+
+
+CAPTURE = np.column_stack([np.arange(200) / 1000.0, np.arange(200) * 2.0, np.arange(200) * 3.0])
+
+
+@pytest.mark.parametrize("make_file, filename", [
+    (lambda: io.BytesIO("\n".join(",".join(str(v) for v in row) for row in CAPTURE).encode()), "capture.csv"),
+    (lambda: io.BytesIO(("time,x,y\n" + "\n".join(";".join(str(v) for v in row) for row in CAPTURE)).encode()),
+     "capture.csv"),
+    (lambda: npy_file(CAPTURE), "capture.npy"),
+    (lambda: npy_file(np.asfortranarray(CAPTURE)), "capture.npy"),
+])
+def test_signal_column_selection(make_file, filename):
+    assert np.array_equal(signal(make_file(), filename), CAPTURE[:, 2])
+    assert np.array_equal(signal(make_file(), filename, column=1), CAPTURE[:, 1])
+    with pytest.raises(ValueError, match="out of range"):
+        signal(make_file(), filename, column=3)
+
+
+def test_single_column_capture_rejects_other_columns():
+    csv = "\n".join(str(value) for value in range(100)).encode()
+    assert np.array_equal(signal(io.BytesIO(csv), "capture.csv", column=0), np.arange(100))
+    with pytest.raises(ValueError, match="out of range"):
+        signal(io.BytesIO(csv), "capture.csv", column=3)
+    with pytest.raises(ValueError, match="out of range"):
+        signal(npy_file(np.arange(100.0)), "capture.npy", column=1)
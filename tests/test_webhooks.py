@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from app.core import webhooks
+from app.core.config import settings
+from app.core.webhooks import (
+    InvalidCallbackUrl, PublicAddressResolver, WebhookDispatcher, WebhookOutbox, is_public_address,
+    validate_callback_url
+)
+
+
+@pytest.fixture(autouse=True)
+def default_webhook_settings(monkeypatch):
+    monkeypatch.setattr(settings, "WEBHOOK_ALLOWED_HOSTS", "")
+    monkeypatch.setattr(settings, "WEBHOOK_ALLOW_PRIVATE_ADDRESSES", False)
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1:9000/hooks",
+    "http://localhost/hooks",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://10.0.0.5/hooks",
+    "http://172.16.3.4/hooks",
+    "https://192.168.1.10/hooks",
+    "http://[::1]/hooks",
+    "http://[::ffff:127.0.0.1]/hooks",
+    "http://0.0.0.0/hooks",
+    "http://240.0.0.1/hooks",
+])
+def test_non_public_hosts_are_rejected_by_default(url):
+    with pytest.raises(InvalidCallbackUrl, match="non-public"):
+        validate_callback_url(url)
+
+
+@pytest.mark.parametrize("url", ["ftp://example.com/hooks", "/hooks", "http://93.184.216.34:99999/hooks"])
+def test_malformed_urls_are_rejected(url):
+    with pytest.raises(InvalidCallbackUrl):
+        validate_callback_url(url)
+
+
+def test_public_address_is_accepted():
+    assert validate_callback_url(" https://93.184.216.34/hooks ") == "https://93.184.216.34/hooks"
+
+
+def test_hosts_resolving_to_any_private_address_are_rejected(monkeypatch):
+    def getaddrinfo(host, port, **kwargs):
+        return [(2, 1, 6, "", ("93.184.216.34", port)), (2, 1, 6, "", ("10.1.2.3", port))]
+
+    monkeypatch.setattr(webhooks.socket, "getaddrinfo", getaddrinfo)
+    with pytest.raises(InvalidCallbackUrl, match="10.1.2.3"):
+        validate_callback_url("https://cmms.example.com/hooks")
+
+
+def test_allowlist_narrows_but_does_not_open_private_addresses(monkeypatch):
+    monkeypatch.setattr(settings, "WEBHOOK_ALLOWED_HOSTS", "93.184.216.34, localhost")
+    assert validate_callback_url("https://93.184.216.34/hooks")
+    with pytest.raises(InvalidCallbackUrl, match="not allowed"):
+        validate_callback_url("https://93.184.216.35/hooks")
+    with pytest.raises(InvalidCallbackUrl, match="non-public"):
+        validate_callback_url("http://localhost/hooks")
+
+
+def test_private_addresses_can_be_allowed(monkeypatch):
+    monkeypatch.setattr(settings, "WEBHOOK_ALLOW_PRIVATE_ADDRESSES", True)
+    assert validate_callback_url("http://127.0.0.1:9000/hooks") == "http://127.0.0.1:9000/hooks"
+
+
+@pytest.mark.parametrize("address, public", [
+    ("93.184.216.34", True), ("2606:2800:220:1::1", True), ("fe80::1%eth0", False),
+    ("100.64.0.1", False), ("224.0.0.1", False), ("::ffff:10.0.0.1", False),
+])
+def test_is_public_address(address, public):
+    assert is_public_address(address) is public
+
+
+def test_resolver_refuses_hosts_repointed_after_validation():
+    class Rebound:
+        async def resolve(self, host, port, family):
+            return [{"hostname": host, "host": "169.254.169.254", "port": port, "family": family,
+                     "proto": 0, "flags": 0}]
+
+    async def resolve():
+        resolver = PublicAddressResolver()
+        resolver._resolver = Rebound()
+        await resolver.resolve("cmms.example.com", 443)
+
+    with pytest.raises(OSError, match="non-public"):
+        asyncio.run(resolve())
+
+
+def test_redirects_are_not_followed(tmp_path):
+    hits = []
+
+    async def redirect(request):
+        hits.append(request.path)
+        raise web.HTTPFound("/internal")
+
+    async def internal(request):
+        hits.append(request.path)
+        return web.Response()
+
+    async def deliver():
+        app = web.Application()
+        app.add_routes([web.post("/hooks", redirect), web.post("/internal", internal), web.get("/internal", internal)])
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        outbox = WebhookOutbox(str(tmp_path / "outbox.db"))
+        dispatcher = WebhookDispatcher(outbox, allow_private_addresses=True, poll_interval=60)
+        outbox.enqueue(f"http://127.0.0.1:{port}/hooks", "analysis.completed", {})
+        dispatcher.start()
+        try:
+            await dispatcher.dispatch_once()
+        finally:
+            await dispatcher.stop()
+            await runner.cleanup()
+        return dispatcher
+
+    dispatcher = asyncio.run(deliver())
+    assert hits == ["/hooks"]
+    assert dispatcher.delivery_errors == 1
+    assert dispatcher.events_delivered == 0
+
+
+def test_dispatcher_refuses_loopback_by_default(tmp_path):
+    async def deliver():
+        outbox = WebhookOutbox(str(tmp_path / "outbox.db"))
+        dispatcher = WebhookDispatcher(outbox, poll_interval=60)
+        outbox.enqueue("http://localhost:9/hooks", "analysis.completed", {})
+        dispatcher.start()
+        try:
+            await dispatcher.dispatch_once()
+        finally:
+            await dispatcher.stop()
+        return outbox
+
+    outbox = asyncio.run(deliver())
+    # The resolver refuses the name; a closed port would be a connection error instead
+    assert "DNSError" in outbox._connection.execute("SELECT last_error FROM outbox").fetchone()[0]
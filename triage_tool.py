@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Train and evaluate the local triage classifier
+The triage model answers obvious non-bearing and undamaged images before Gemini
+
+Training data is a directory with one sub-directory per class:
+    data/not_bearing/*.jpg   data/no_damage/*.jpg   data/needs_analysis/*.jpg
+
+Examples:
+    # Train on 80% of the images and keep 20% as the held-out set
+    python triage_tool.py train --data data --output triage_model.json --holdout holdout.json
+
+    # Measure short-circuit rate and agreement with Gemini on the held-out set
+    python triage_tool.py evaluate --model triage_model.json --holdout holdout.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Add current directory to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+
+from app.core.triage import (
+    TRIAGE_CLASSES,
+    LinearTriageModel,
+    TriageClassifier,
+    extract_features,
+    load_triage_model,
+    triage_label_for_result
+)
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+def collect_labeled_images(data_dir: Path) -> List[Tuple[str, str]]:
+    """List (path, label) pairs from class sub-directories"""
+    samples = []
+    for label in TRIAGE_CLASSES:
+        class_dir = data_dir / label
+        if not class_dir.is_dir():
+            continue
+        for path in sorted(class_dir.rglob("*")):
+            if path.suffix.lower() in IMAGE_SUFFIXES:
+                samples.append((str(path), label))
+    return samples
+
+
+def features_for(paths: List[str]) -> np.ndarray:
+    """Extract triage features for every image"""
+    return np.vstack([extract_features(Image.open(path)) for path in paths])
+
+
+def train(args: argparse.Namespace) -> int:
+    """Fit the linear triage model and write it with the held-out split"""
+    samples = collect_labeled_images(args.data)
+    if not samples:
+        print(f"❌ No labeled images found under {args.data}")
+        return 1
+
+    random.Random(args.seed).shuffle(samples)
+    holdout_count = int(len(samples) * args.holdout_fraction)
+    holdout, training = samples[:holdout_count], samples[holdout_count:]
+    print(f"📸 {len(training)} training images, {len(holdout)} held out")
+    print(f"   Classes: {dict(Counter(label for _, label in training))}")
+
+    X = features_for([path for path, _ in training])
+    labels = [label for _, label in training]
+    model = LinearTriageModel.fit(X, labels, epochs=args.epochs)
+
+    accuracy = float((model.predict(X) == np.array(labels)).mean())
+    print(f"✅ Training accuracy: {accuracy:.1%}")
+
+    args.output.write_text(json.dumps(model.to_dict(), indent=2))
+    print(f"💾 Model written to {args.output}")
+    if args.holdout:
+        args.holdout.write_text(json.dumps([{"path": path, "label": label} for path, label in holdout], indent=2))
+        print(f"💾 Held-out set written to {args.holdout}")
+    return 0
+
+
+async def gemini_labels(paths: List[str], concurrency: int) -> Dict[str, Optional[str]]:
+    """Run the full Gemini analysis (without triage) and map results to triage classes"""
+    from app.core.gemini_fault_analyzer import GeminiFaultAnalyzer
+
+    analyzer = GeminiFaultAnalyzer()
+    if not analyzer.is_ready():
+        print("❌ Analyzer not ready; set GOOGLE_API_KEY or MODEL_BACKEND=fake")
+        return {}
+    analyzer.triage.model = None  # Always ask the model itself
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def label(path: str) -> Tuple[str, Optional[str]]:
+        async with semaphore:
+            response = await analyzer.analyze_bearing_image(Path(path).read_bytes())
+        if response.analysis.confidence_score == 0.0 and "Error" in (response.analysis.technical_notes or ""):
+            return path, None
+        return path, triage_label_for_result(response.analysis)
+
+    return dict(await asyncio.gather(*(label(path) for path in paths)))
+
+
+def evaluate(args: argparse.Namespace) -> int:
+    """Report short-circuit rate, accuracy and agreement with Gemini"""
+    if args.holdout:
+        samples = [(item["path"], item["label"]) for item in json.loads(args.holdout.read_text())]
+    else:
+        samples = collect_labeled_images(args.data)
+    if not samples:
+        print("❌ No evaluation images")
+        return 1
+
+    classifier = TriageClassifier(
+        model=load_triage_model(str(args.model)),
+        confidence_threshold=args.threshold,
+        latency_budget_ms=args.latency_budget_ms
+    )
+
+    decisions = {}
+    for path, _ in samples:
+        with open(path, "rb") as f:
+            decisions[path] = classifier.classify(Image.open(io.BytesIO(f.read())))
+
+    short_circuited = [(path, label) for path, label in samples if decisions[path].short_circuit]
+    correct = sum(1 for path, label in short_circuited if decisions[path].label == label)
+    latencies = sorted(decision.elapsed_ms for decision in decisions.values())
+
+    report = {
+        "images": len(samples),
+        "threshold": args.threshold,
+        "short_circuited": len(short_circuited),
+        "short_circuit_rate": round(len(short_circuited) / len(samples), 4),
+        "short_circuit_precision_vs_labels": round(correct / len(short_circuited), 4) if short_circuited else None,
+        "triage_accuracy_vs_labels": round(
+            sum(1 for path, label in samples if decisions[path].label == label) / len(samples), 4),
+        "latency_ms": {
+            "p50": round(latencies[len(latencies) // 2], 3),
+            "p95": round(latencies[int(len(latencies) * 0.95)], 3),
+            "max": round(latencies[-1], 3)
+        }
+    }
+
+    if not args.skip_gemini:
+        print(f"🔍 Running Gemini on {len(samples)} held-out images for agreement...")
+        start = time.time()
+        labels = asyncio.run(gemini_labels([path for path, _ in samples], args.concurrency))
+        answered = [path for path, _ in samples if labels.get(path)]
+        agreed = [path for path in answered if labels[path] == decisions[path].label]
+        short_answered = [path for path, _ in short_circuited if labels.get(path)]
+        report["gemini"] = {
+            "answered": len(answered),
+            "elapsed_seconds": round(time.time() - start, 2),
+            "agreement_all": round(len(agreed) / len(answered), 4) if answered else None,
+            "agreement_short_circuited": round(
+                sum(1 for path in short_answered if labels[path] == decisions[path].label) / len(short_answered), 4
+            ) if short_answered else None,
+            "gemini_label_counts": dict(Counter(labels[path] for path in answered))
+        }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"💾 Report written to {args.output}")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Local triage model tooling")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train", help="Fit the triage model")
+    train_parser.add_argument("--data", type=Path, required=True, help="Directory with one sub-directory per class")
+    train_parser.add_argument("--output", type=Path, default=Path("triage_model.json"))
+    train_parser.add_argument("--holdout", type=Path, help="Write the held-out image list here")
+    train_parser.add_argument("--holdout-fraction", type=float, default=0.2)
+    train_parser.add_argument("--epochs", type=int, default=2000)
+    train_parser.add_argument("--seed", type=int, default=7)
+
+    eval_parser = commands.add_parser("evaluate", help="Measure short-circuit rate and Gemini agreement")
+    eval_parser.add_argument("--model", type=Path, required=True)
+    source = eval_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--holdout", type=Path, help="Held-out list written by train")
+    source.add_argument("--data", type=Path, help="Directory with one sub-directory per class")
+    eval_parser.add_argument("--threshold", type=float, default=0.9)
+    eval_parser.add_argument("--latency-budget-ms", type=float, default=8.0)
+    eval_parser.add_argument("--concurrency", type=int, default=4, help="Concurrent Gemini calls")
+    eval_parser.add_argument("--skip-gemini", action="store_true", help="Only compare against the labels")
+    eval_parser.add_argument("--output", type=Path, help="Write the JSON report here")
+
+    args = parser.parse_args(argv)
+    return train(args) if args.command == "train" else evaluate(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Local webhook receiver for testing callback delivery
+Prints the events the API sends and can fail on purpose to exercise retries
+
+Examples:
+    # Listen on port 9000, verifying signatures made with WEBHOOK_SECRET
+    python webhook_receiver.py --port 9000 --secret "$WEBHOOK_SECRET"
+
+    # Reject 30% of deliveries to watch retries and backoff
+    python webhook_receiver.py --port 9000 --fail-rate 0.3
+
+    # Then submit with a callback (the API needs WEBHOOK_ALLOW_PRIVATE_ADDRESSES=true for localhost)
+    curl -X POST http://localhost:8001/api/v1/jobs -F "images=@bearing.jpg" \\
+        -F "callback_url=http://localhost:9000/hooks"
+"""
+
+import argparse
+import hmac
+import json
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional
+
+from aiohttp import web
+
+# Add current directory to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+
+from app.core.webhooks import sign_payload
+
+
+class Receiver:
+    """Counts, prints and optionally records received events"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.requests = 0
+        self.rejected = 0
+        self.event_ids = set()
+        self.events = Counter()
+        self.duplicates = 0
+        self.output = open(args.output, "a", encoding="utf-8") if args.output else None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        self.requests += 1
+
+        if self.args.secret:
+            expected = sign_payload(body, self.args.secret)
+            if not hmac.compare_digest(expected, request.headers.get("X-Webhook-Signature", "")):
+                print("❌ Bad signature, rejected")
+                return web.json_response({"error": "bad signature"}, status=401)
+
+        if random.random() < self.args.fail_rate:
+            self.rejected += 1
+            print(f"⚠️  Failing delivery {self.requests} on purpose")
+            return web.json_response({"error": "simulated failure"}, status=503)
+
+        events = json.loads(body).get("events", [])
+        for event in events:
+            # Delivery is at-least-once; receivers de-duplicate by event id
+            if event["id"] in self.event_ids:
+                self.duplicates += 1
+                continue
+            self.event_ids.add(event["id"])
+            self.events[event["type"]] += 1
+            data = event.get("data", {})
+            analysis = (data.get("result") or {}).get("analysis") or {}
+            print(f"📨 {event['type']} {data.get('job_id') or data.get('batch_id') or ''} "
+                  f"{analysis.get('failure_mode_code') or data.get('status') or ''}")
+            if self.output:
+                self.output.write(json.dumps(event) + "\n")
+        if self.output:
+            self.output.flush()
+        print(f"📊 {self.requests} requests, {len(events)} events in this one, "
+              f"{dict(self.events)}, {self.duplicates} duplicates, {self.rejected} rejected")
+        return web.json_response({"received": len(events)})
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Local webhook receiver")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--secret", help="Verify X-Webhook-Signature with this secret")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of deliveries answered with 503")
+    parser.add_argument("--output", type=Path, help="Append received events here (JSON lines)")
+    parser.add_argument("--seed", type=int, default=int(time.time()), help="Seed for simulated failures")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    random.seed(args.seed)
+    receiver = Receiver(args)
+    app = web.Application()
+    app.router.add_post("/{tail:.*}", receiver.handle)
+    print(f"✅ Receiving webhooks on http://{args.host}:{args.port}/")
+    web.run_app(app, host=args.host, port=args.port, print=None)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())